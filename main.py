@@ -1,11 +1,36 @@
 from PyQt5.QtWidgets import QApplication
-from src.statswing_utils import load_data
+from src.statswing_query import load, DEFAULT_DATA_PATH
 from src.statswing_gui import StatSwingApp
+from src import statswing_instrument
+import argparse
 import sys
 
 if __name__ == "__main__":
-    data = load_data("data/player_data.csv")
-    app = QApplication(sys.argv)
-    window = StatSwingApp(data)
+    parser = argparse.ArgumentParser(description = 'StatSwing MLB analytics')
+    parser.add_argument('--profile', nargs = '?', const = statswing_instrument.DEFAULT_OUTPUT, metavar = 'PATH',
+                        help = f'time every GUI slot and data-layer call and write latency histograms to PATH on exit or {statswing_instrument.DUMP_SHORTCUT} (also enabled by {statswing_instrument.ENV_VAR})')
+    parser.add_argument('--partitioned', action = 'store_true', help = 'answer season-range queries from the season-partitioned copy of the data (written next to the CSV on first use)')
+    parser.add_argument('--seasons', metavar = 'START-END', help = 'with --partitioned, only keep these seasons in memory for the other tabs')
+    parser.add_argument('--profile-op', metavar = 'NAME', help = 'also run this operation (e.g. StatSwingApp.draw_bar_graph) under cProfile')
+    # Anything else is left for Qt
+    args, qt_args = parser.parse_known_args()
+
+    if args.profile or args.profile_op:
+        instrumentation = statswing_instrument.enable(args.profile, args.profile_op)
+    else:
+        instrumentation = statswing_instrument.from_environment()
+
+    dataset = None
+    if args.partitioned:
+        from src.statswing_partitions import open_partitions
+        dataset = open_partitions(DEFAULT_DATA_PATH)
+        start_season, end_season = map(int, args.seasons.split('-')) if args.seasons else (None, None)
+        store = dataset.load_store(start_season, end_season)
+    else:
+        store = load(DEFAULT_DATA_PATH)
+    app = QApplication(sys.argv[:1] + qt_args)
+    window = StatSwingApp(store, dataset)
+    if instrumentation is not None:
+        instrumentation.attach_shortcut(window)
     window.show()
-    sys.exit(app.exec_())
\ No newline at end of file
+    sys.exit(app.exec_())
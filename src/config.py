@@ -55,6 +55,145 @@ STAT_MAPPING = {
     'TotalStat': 'TotalStat'
 }
 
+# How each stat combines across seasons: 'counting' stats are summed, 'rate' stats are averaged
+# weighted by plate appearances, and 'non-additive' stats are only shown for a single season
+STAT_TYPES = {
+    'G': 'counting',
+    'PA': 'counting',
+    'HR': 'counting',
+    'R': 'counting',
+    'RBI': 'counting',
+    'SB': 'counting',
+    'BB%': 'rate',
+    'K%': 'rate',
+    'ISO': 'rate',
+    'BABIP': 'rate',
+    'AVG': 'rate',
+    'OBP': 'rate',
+    'SLG': 'rate',
+    'wOBA': 'rate',
+    'xwOBA': 'rate',
+    'wRC+': 'rate',
+    'BsR': 'counting',
+    'Off': 'counting',
+    'Def': 'counting',
+    'WAR': 'counting'
+}
+
+RATE_WEIGHT_COLUMN = 'PA'
+
+# Stats where a lower value ranks higher
+LOWER_IS_BETTER = ['K%']
+
+# Rate stats that describe a hitter's profile for the similar-players search (playing time and
+# value stats like PA or WAR would match players on role rather than on how they hit)
+SIMILARITY_STATS = ['BB%', 'K%', 'ISO', 'BABIP', 'AVG', 'OBP', 'SLG', 'wOBA', 'xwOBA', 'wRC+']
+
+# In-memory column types for player_data.csv; columns not listed here (e.g. the '#' row number)
+# are dropped at load time. Counting stats are float32 like the rate stats: the 'Career Average'
+# and 'Season N Average' rows hold their means, which an integer type would round
+PLAYER_DATA_SCHEMA = {
+    'Name': 'category',
+    'Team': 'category',
+    'G': 'float32',
+    'PA': 'float32',
+    'HR': 'float32',
+    'R': 'float32',
+    'RBI': 'float32',
+    'SB': 'float32',
+    'BB%': 'float32',
+    'K%': 'float32',
+    'ISO': 'float32',
+    'BABIP': 'float32',
+    'AVG': 'float32',
+    'OBP': 'float32',
+    'SLG': 'float32',
+    'wOBA': 'float32',
+    'xwOBA': 'float32',
+    'wRC+': 'float32',
+    'BsR': 'float32',
+    'Off': 'float32',
+    'Def': 'float32',
+    'WAR': 'float32',
+    'Season Year': 'int16'
+}
+
+# Column types for play-by-play input files (one row per plate appearance, Statcast-style names);
+# only 'game_pk', 'game_year', 'batter_name' and 'events' are required
+PA_SCHEMA = {
+    'game_pk': 'int64',
+    'game_year': 'int16',
+    'batter_name': 'category',
+    'team': 'category',
+    'events': 'category',
+    'rbi': 'int8',
+    'runs_scored': 'int8',
+    'stolen_bases': 'int8',
+    'woba_value': 'float32',
+    'woba_denom': 'float32',
+    'estimated_woba_using_speedangle': 'float32'
+}
+
+# Further play-by-play columns read for situational splits (statswing_splits); all optional.
+# on_1b/on_2b/on_3b hold the runner's id, or nothing when the base is empty
+PA_SPLIT_SCHEMA = {
+    'pitcher_name': 'category',
+    'home_team': 'category',
+    'inning': 'float32',
+    'outs_when_up': 'float32',
+    'on_1b': 'float64',
+    'on_2b': 'float64',
+    'on_3b': 'float64',
+    'stand': 'category',
+    'p_throws': 'category'
+}
+
+# Split dimension -> play-by-play column; 'bases' is derived from on_1b/on_2b/on_3b and the home
+# team stands in for the park
+SPLIT_DIMENSIONS = {
+    'batter': 'batter_name',
+    'pitcher': 'pitcher_name',
+    'park': 'home_team',
+    'inning': 'inning',
+    'bases': None,
+    'outs': 'outs_when_up',
+    'batter_hand': 'stand',
+    'pitcher_hand': 'p_throws',
+    'season': 'game_year'
+}
+
+# Base states in bit order (runner on 1st = 1, 2nd = 2, 3rd = 4), labelled as on a scorecard
+BASE_STATES = ['___', '1__', '_2_', '12_', '__3', '1_3', '_23', '123']
+
+# How each play-by-play event counts toward the season totals; any other event is an out in play
+PA_EVENT_OUTCOMES = {
+    'single': 'single',
+    'double': 'double',
+    'triple': 'triple',
+    'home_run': 'home_run',
+    'walk': 'walk',
+    'intent_walk': 'walk',
+    'hit_by_pitch': 'hit_by_pitch',
+    'strikeout': 'strikeout',
+    'strikeout_double_play': 'strikeout',
+    'sac_fly': 'sac_fly',
+    'sac_fly_double_play': 'sac_fly',
+    'sac_bunt': 'sac_bunt',
+    'sac_bunt_double_play': 'sac_bunt',
+    'catcher_interf': 'interference'
+}
+
+# Stat groups plotted side by side in the Compare Players tab
+COMPARE_STAT_GROUPS = {
+    'Power Stats': ['HR', 'R', 'RBI', 'SB'],
+    'High-Range Stats': ['PA'],
+    'Advanced Stats': ['WAR', 'Def'],
+    'Percentage Stats': ['BB%', 'K%']
+}
+
+# Stats shown in the Compare Players heatmap and table, one column each
+COMPARE_HEATMAP_STATS = ['PA', 'HR', 'R', 'RBI', 'SB', 'BB%', 'K%', 'ISO', 'AVG', 'OBP', 'SLG', 'wOBA', 'WAR']
+
 STAT_DESCRIPTIONS = {
     'Games Played': 'Games played by the player',
     'Plate Appearances': 'The total number of times the player has come up to bat, including walks and sacrifices',
@@ -0,0 +1,315 @@
+import argparse
+import json
+import os
+import platform
+import resource
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+# Headless by default: Qt draws offscreen and matplotlib never needs a display
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+os.environ.setdefault('MPLBACKEND', 'Agg')
+
+import numpy as np
+import pandas as pd
+from src.statswing_query import DEFAULT_DATA_PATH
+
+SCALES = [1, 10, 100, 1000]
+DEFAULT_SCALES = [1, 10, 100]
+DEFAULT_REPEAT = 5
+DEFAULT_THRESHOLD = 0.2
+# Differences below this are timer noise, whatever the ratio
+DEFAULT_MIN_MS = 1.0
+
+def make_dataset(scale: int, out_path: str, source_path: str = DEFAULT_DATA_PATH) -> int:
+    '''
+
+    Writes a synthetic player_data.csv with scale times as many players as the source file
+
+    Every copy of the source players gets its own names (and jittered stats so copies don't sort
+    or aggregate identically); the average rows are rebuilt over the whole synthetic set.
+    Returns the number of rows written
+
+    '''
+    from src.statswing_utils import build_average_rows, is_average_row
+
+    source = pd.read_csv(source_path)
+    players = source[~is_average_row(source['Name'])].drop(columns = ['#'], errors = 'ignore')
+    stat_cols = [col for col in players.columns if col not in ('Name', 'Team', 'Season Year')]
+    rng = np.random.default_rng(scale)
+
+    copies = []
+    for i in range(scale):
+        copy = players.copy()
+        if i:
+            copy['Name'] = copy['Name'] + f' {i}'
+            noise = rng.normal(1.0, 0.05, size = (len(copy), len(stat_cols)))
+            copy[stat_cols] = (copy[stat_cols].to_numpy(dtype = float) * noise).round(3)
+        copies.append(copy)
+    data = pd.concat(copies, ignore_index = True)
+    data = pd.concat([data, build_average_rows(data)], ignore_index = True)
+    data.insert(0, '#', np.arange(1, len(data) + 1))
+    data.to_csv(out_path, index = False)
+    return len(data)
+
+def _time_call(fn, repeat: int) -> dict:
+    '''
+
+    Times one cold call, then the median of repeat warm calls, then one traced call for peak memory
+
+    '''
+    start = time.perf_counter()
+    fn()
+    cold = time.perf_counter() - start
+
+    warm = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        warm.append(time.perf_counter() - start)
+
+    tracemalloc.start()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {
+        'cold_ms': cold * 1000,
+        'warm_ms': statistics.median(warm) * 1000,
+        'warm_min_ms': min(warm) * 1000,
+        'peak_alloc_mb': peak / 2**20
+    }
+
+def run_scale(scale: int, data_dir: str, repeat: int = DEFAULT_REPEAT) -> dict:
+    '''
+
+    Benchmarks every hot path on one dataset size (meant to run in its own process, so the
+    process peak RSS belongs to this scale alone)
+
+    '''
+    from src.statswing_utils import load_data, find_player
+    from src.statswing_cache import cache_dir_for
+    from src.statswing_memo import result_cache
+
+    file_path = os.path.join(data_dir, f'player_data_{scale}x.csv')
+    start = time.perf_counter()
+    rows = make_dataset(scale, file_path)
+    generate_s = time.perf_counter() - start
+    results = {'scale': scale, 'rows': rows, 'generate_s': generate_s, 'paths': {}}
+    paths = results['paths']
+
+    # Cold load parses the CSV and writes the columnar cache; warm loads memory-map the cache
+    shutil.rmtree(cache_dir_for(file_path), ignore_errors = True)
+    start = time.perf_counter()
+    store = load_data(file_path)
+    cold = time.perf_counter() - start
+    paths['load_data'] = _time_call(lambda: load_data(file_path), repeat)
+    paths['load_data']['cold_ms'] = cold * 1000
+    paths['load_data (no cache)'] = _time_call(lambda: load_data(file_path, use_cache = False), max(1, repeat // 2))
+
+    name = store.player_names[len(store.player_names) // 2]
+    paths['find_player'] = _time_call(lambda: find_player(store, name), repeat)
+
+    from PyQt5.QtWidgets import QApplication
+    app = QApplication.instance() or QApplication(sys.argv[:1])
+    from src.statswing_gui import MAX_COMPARE_PLAYERS, StatSwingApp
+
+    def settle():
+        window.workers.wait_for_done()
+        app.processEvents()
+        window.scheduler.flush()
+        window.workers.wait_for_done()
+        app.processEvents()
+
+    start = time.perf_counter()
+    window = StatSwingApp(store)
+    window.resize(1000, 800)
+    window.show()
+    app.processEvents()
+    paths['StatSwingApp'] = {'cold_ms': (time.perf_counter() - start) * 1000}
+    # Only the first tab is built before the window paints, so this should not grow with the roster
+    paths['first_paint'] = {'cold_ms': window.first_paint * 1000}
+    start = time.perf_counter()
+    window.build_all_tabs()
+    app.processEvents()
+    paths['build_all_tabs'] = {'cold_ms': (time.perf_counter() - start) * 1000}
+
+    # Select a player with several seasons so every view has real work to do
+    seasons = {player: store.player_seasons(player) for player in store.player_names[:200]}
+    name = max(seasons, key = lambda player: len(seasons[player]))
+    other = next(player for player in store.player_names if player != name)
+    with window.scheduler.blocked(window.player_dropdown, window.career_player_dropdown):
+        window.player_dropdown.setCurrentText(name)
+        window.career_player_dropdown.setCurrentText(name)
+    window.set_compare_players([name, other])
+    window.update_season_dropdowns()
+    window.end_season_dropdown.setCurrentIndex(window.end_season_dropdown.count() - 1)
+    settle()
+
+    def timed_view(method):
+        def run():
+            method()
+            settle()
+        return run
+
+    paths['update_player_table'] = _time_call(timed_view(window.update_player_table), repeat)
+    paths['compare_to_average'] = _time_call(timed_view(lambda: window.compare_to_average('Home Runs')), repeat)
+    paths['update_career_table'] = _time_call(timed_view(lambda: window.update_career_table(name)), repeat)
+    paths['update_bar_graph'] = _time_call(timed_view(window.update_bar_graph), repeat)
+
+    # Full-size comparisons with a new selection on every call, so neither the query result nor
+    # the rendered image is cached
+    roster = list(store.player_names)
+    def compare_many(view, first):
+        window.compare_view_dropdown.setCurrentText(view)
+        calls = iter(range(first, first + 1000))
+        def run():
+            offset = next(calls) * MAX_COMPARE_PLAYERS
+            window.set_compare_players([roster[(offset + i) % len(roster)] for i in range(MAX_COMPARE_PLAYERS)])
+            settle()
+        return run
+    paths[f'update_bar_graph ({MAX_COMPARE_PLAYERS} players)'] = _time_call(compare_many('Grouped Bars', 0), repeat)
+    # The heatmap's cold call includes building its figure, which happens once per window
+    paths[f'update_bar_graph ({MAX_COMPARE_PLAYERS} players, heatmap)'] = _time_call(compare_many('Heatmap', repeat + 2), repeat)
+    results['result_cache'] = result_cache(store).stats()
+
+    # The warm calls above are answered by the query result cache; these recompute every time
+    cache = result_cache(store)
+    budget, cache.max_bytes = cache.max_bytes, 0
+    paths['update_player_table (uncached)'] = _time_call(timed_view(window.update_player_table), repeat)
+    paths['compare_to_average (uncached)'] = _time_call(timed_view(lambda: window.compare_to_average('Home Runs')), repeat)
+    cache.max_bytes = budget
+
+    window.close()
+    if window.chart_window is not None:
+        window.chart_window.close()
+    results['peak_rss_mb'] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    return results
+
+def run(scales: list, repeat: int = DEFAULT_REPEAT, data_dir: str = None) -> dict:
+    '''
+
+    Benchmarks each scale in a fresh subprocess and collects the results
+
+    A scale that fails (for example by running out of memory) is recorded with its error
+    instead of stopping the run
+
+    '''
+    own_dir = data_dir is None
+    data_dir = data_dir or tempfile.mkdtemp(prefix = 'statswing_bench_')
+    report = {
+        'meta': {
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'numpy': np.__version__,
+            'pandas': pd.__version__,
+            'repeat': repeat
+        },
+        'scales': {}
+    }
+    try:
+        for scale in scales:
+            print(f'Benchmarking {scale}x...', file = sys.stderr)
+            proc = subprocess.run(
+                [sys.executable, '-m', 'src.statswing_bench', '_scale', str(scale), '--repeat', str(repeat), '--data-dir', data_dir],
+                capture_output = True, text = True
+            )
+            if proc.returncode == 0:
+                report['scales'][f'{scale}x'] = json.loads(proc.stdout)
+            else:
+                error = proc.stderr.strip().splitlines()[-1] if proc.stderr.strip() else f'exit code {proc.returncode}'
+                print(f'{scale}x failed: {error}', file = sys.stderr)
+                report['scales'][f'{scale}x'] = {'scale': scale, 'error': error}
+    finally:
+        if own_dir:
+            shutil.rmtree(data_dir, ignore_errors = True)
+    return report
+
+def compare(baseline: dict, current: dict, threshold: float = DEFAULT_THRESHOLD, min_ms: float = DEFAULT_MIN_MS) -> list:
+    '''
+
+    Returns (scale, path, metric, baseline ms, current ms, ratio, regressed) for every timing the
+    two runs share; a timing regressed when it is more than threshold slower and min_ms slower
+
+    '''
+    rows = []
+    for scale, base in baseline['scales'].items():
+        cur = current['scales'].get(scale)
+        if cur is None or 'error' in base or 'error' in cur:
+            continue
+        for path, base_timings in base['paths'].items():
+            cur_timings = cur['paths'].get(path, {})
+            for metric in ('cold_ms', 'warm_ms'):
+                if metric not in base_timings or metric not in cur_timings:
+                    continue
+                old, new = base_timings[metric], cur_timings[metric]
+                ratio = new / old if old > 0 else float('inf')
+                regressed = ratio > 1 + threshold and new - old > min_ms
+                rows.append((scale, path, metric, old, new, ratio, regressed))
+    return rows
+
+def _print_report(report: dict, file = sys.stdout) -> None:
+    for scale, results in report['scales'].items():
+        if 'error' in results:
+            print(f'{scale}: failed ({results["error"]})', file = file)
+            continue
+        print(f'{scale}: {results["rows"]:,} rows, peak RSS {results["peak_rss_mb"]:.0f} MB', file = file)
+        for path, timings in results['paths'].items():
+            warm = f'warm {timings["warm_ms"]:10.2f} ms' if 'warm_ms' in timings else ' ' * 19
+            peak = f'{timings["peak_alloc_mb"]:8.1f} MB' if 'peak_alloc_mb' in timings else ''
+            print(f'  {path:24s} cold {timings["cold_ms"]:10.2f} ms  {warm}  {peak}', file = file)
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description = 'Benchmark StatSwing load, lookup, aggregation and GUI refresh paths')
+    commands = parser.add_subparsers(dest = 'command', required = True)
+
+    run_parser = commands.add_parser('run', help = 'run the benchmarks and write a JSON report')
+    run_parser.add_argument('--scales', default = ','.join(map(str, DEFAULT_SCALES)), help = f'comma-separated dataset multipliers (from {SCALES}); 1000x needs tens of GB of memory')
+    run_parser.add_argument('--repeat', type = int, default = DEFAULT_REPEAT, help = 'warm calls per path')
+    run_parser.add_argument('--data-dir', help = 'where to write the synthetic datasets (kept if given)')
+    run_parser.add_argument('-o', '--output', help = 'JSON report path (printed to stdout if omitted)')
+
+    compare_parser = commands.add_parser('compare', help = 'flag slowdowns between two JSON reports')
+    compare_parser.add_argument('baseline')
+    compare_parser.add_argument('current')
+    compare_parser.add_argument('--threshold', type = float, default = DEFAULT_THRESHOLD, help = 'allowed slowdown ratio (0.2 = 20%%)')
+    compare_parser.add_argument('--min-ms', type = float, default = DEFAULT_MIN_MS, help = 'ignore differences smaller than this')
+
+    scale_parser = commands.add_parser('_scale')
+    scale_parser.add_argument('scale', type = int)
+    scale_parser.add_argument('--repeat', type = int, default = DEFAULT_REPEAT)
+    scale_parser.add_argument('--data-dir', required = True)
+
+    args = parser.parse_args()
+    if args.command == '_scale':
+        # The GUI prints to stdout, so keep it off the JSON channel
+        stdout, sys.stdout = sys.stdout, sys.stderr
+        results = run_scale(args.scale, args.data_dir, args.repeat)
+        sys.stdout = stdout
+        print(json.dumps(results))
+    elif args.command == 'run':
+        report = run([int(scale) for scale in args.scales.split(',')], args.repeat, args.data_dir)
+        # The summary goes to stderr whenever stdout carries the JSON
+        _print_report(report, sys.stdout if args.output else sys.stderr)
+        if args.output:
+            with open(args.output, 'w') as f:
+                json.dump(report, f, indent = 2)
+        else:
+            print(json.dumps(report, indent = 2))
+    else:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        with open(args.current) as f:
+            current = json.load(f)
+        rows = compare(baseline, current, args.threshold, args.min_ms)
+        for scale, path, metric, old, new, ratio, regressed in rows:
+            flag = 'SLOWER' if regressed else ''
+            print(f'{scale:6s} {path:24s} {metric:8s} {old:10.2f} -> {new:10.2f} ms  x{ratio:5.2f}  {flag}')
+        regressions = sum(row[-1] for row in rows)
+        print(f'{regressions} regression(s) beyond {args.threshold:.0%}')
+        sys.exit(1 if regressions else 0)
@@ -0,0 +1,110 @@
+import hashlib
+import json
+import os
+import shutil
+import numpy as np
+import pandas as pd
+from src.config import PLAYER_DATA_SCHEMA
+
+CACHE_VERSION = 2
+MANIFEST_NAME = 'manifest.json'
+
+def cache_dir_for(file_path: str) -> str:
+    '''
+
+    Returns the directory holding the columnar cache for a source CSV (stored next to it)
+
+    '''
+    return f'{file_path}.cache'
+
+def schema_hash(file_path: str) -> str:
+    '''
+
+    Hashes the CSV header together with the cache format version and the declared column types,
+    so a cache written under an older PLAYER_DATA_SCHEMA isn't served with stale dtypes
+
+    '''
+    with open(file_path, 'rb') as f:
+        header = f.readline().strip()
+    schema = ','.join(f'{col}:{dtype}' for col, dtype in PLAYER_DATA_SCHEMA.items())
+    return hashlib.sha1(header + f'|v{CACHE_VERSION}|{schema}'.encode()).hexdigest()
+
+def source_key(file_path: str) -> dict:
+    '''
+
+    Builds the key a cache must match to be considered fresh: path, size, mtime and schema hash
+
+    '''
+    stat = os.stat(file_path)
+    return {
+        'path': os.path.abspath(file_path),
+        'size': stat.st_size,
+        'mtime_ns': stat.st_mtime_ns,
+        'schema': schema_hash(file_path)
+    }
+
+def read_cached_frame(file_path: str):
+    '''
+
+    Memory-maps the cached columns for a CSV, or returns None if the cache is missing or stale
+
+    '''
+    cache_dir = cache_dir_for(file_path)
+    try:
+        with open(os.path.join(cache_dir, MANIFEST_NAME)) as f:
+            manifest = json.load(f)
+        if manifest.get('key') != source_key(file_path):
+            return None
+
+        columns = {}
+        for i, column in enumerate(manifest['columns']):
+            values = np.load(os.path.join(cache_dir, f'col_{i:03d}.npy'), mmap_mode = 'r')
+            if column['kind'] == 'codes':
+                values = pd.Categorical.from_codes(values, column['categories']).astype(column['dtype'])
+            columns[column['name']] = values
+        return pd.DataFrame(columns, copy = False)
+    except (OSError, ValueError, KeyError):
+        return None
+
+def write_cached_frame(file_path: str, data: pd.DataFrame, key: dict) -> None:
+    '''
+
+    Writes one .npy file per column plus a manifest; string columns are stored as integer codes
+
+    The manifest is written last so an interrupted write never looks like a valid cache; key
+    should be taken before the CSV was parsed so a file edited mid-load is seen as stale
+
+    '''
+    cache_dir = cache_dir_for(file_path)
+    tmp_dir = f'{cache_dir}.tmp'
+    try:
+        shutil.rmtree(tmp_dir, ignore_errors = True)
+        os.makedirs(tmp_dir)
+        columns = []
+        for i, name in enumerate(data.columns):
+            series = data[name]
+            column = {'name': name, 'dtype': str(series.dtype)}
+            if series.dtype.kind in 'biuf':
+                column['kind'] = 'values'
+                values = series.to_numpy()
+            elif isinstance(series.dtype, pd.CategoricalDtype):
+                # Keep the existing (sorted) categories so the reloaded column orders the same way
+                column['kind'] = 'codes'
+                column['categories'] = [str(c) for c in series.cat.categories]
+                values = series.cat.codes.to_numpy(dtype = np.int32)
+            else:
+                codes, categories = pd.factorize(series)
+                column['kind'] = 'codes'
+                column['categories'] = [str(c) for c in categories]
+                values = codes.astype(np.int32)
+            np.save(os.path.join(tmp_dir, f'col_{i:03d}.npy'), values)
+            columns.append(column)
+
+        with open(os.path.join(tmp_dir, MANIFEST_NAME), 'w') as f:
+            json.dump({'key': key, 'columns': columns}, f)
+
+        shutil.rmtree(cache_dir, ignore_errors = True)
+        os.replace(tmp_dir, cache_dir)
+    except OSError as e:
+        shutil.rmtree(tmp_dir, ignore_errors = True)
+        print(f'Warning: could not write data cache for {file_path}: {e}')
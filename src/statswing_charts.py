@@ -0,0 +1,484 @@
+from collections import OrderedDict
+import numpy as np
+from matplotlib.collections import PolyCollection
+from matplotlib.patches import Patch
+from matplotlib.transforms import Bbox
+from src.config import COMPARE_STAT_GROUPS, LOWER_IS_BETTER
+
+# Figure-relative height above which only the legend is drawn, so it can be blitted on its own;
+# each further row of legend entries lowers it by LEGEND_ROW_HEIGHT
+LEGEND_BOTTOM = 0.92
+LEGEND_ROW_HEIGHT = 0.025
+LEGEND_COLUMNS = 6
+# Colors given for the first series are followed by these (matplotlib's tab20), then repeated
+SERIES_COLORS = [
+    '#1f77b4', '#ff7f0e', '#2ca02c', '#d62728', '#9467bd', '#8c564b', '#e377c2', '#7f7f7f', '#bcbd22', '#17becf',
+    '#aec7e8', '#ffbb78', '#98df8a', '#ff9896', '#c5b0d5', '#c49c94', '#f7b6d2', '#c7c7c7', '#dbdb8d', '#9edae5'
+]
+
+def _stat_matrix(stats, columns: list) -> np.ndarray:
+    '''
+
+    Returns a players x columns float array from a DataFrame (one row per player) or a list of
+    Series indexed by stat
+
+    '''
+    if hasattr(stats, 'columns'):
+        return stats[columns].to_numpy(dtype = float, na_value = np.nan)
+    return np.array([np.asarray(player_stats[columns], dtype = float) for player_stats in stats]).reshape(len(stats), len(columns))
+
+class CompareChart:
+    '''
+
+    Grouped bar charts for any number of players in the Compare Players tab, built once and
+    updated in place
+
+    The figure is laid out as one cell per stat group plus a legend strip along the top (left out
+    with legend = False, when the players are listed next to the chart). All of a group's bars
+    are a single PolyCollection, so the artist count doesn't grow with the number of players.
+    Updates only move the bar outlines, axis limits and legend on the existing artists, and
+    draw() then repaints just the bars and value axes of the cells whose contents changed
+    (blitting) over a saved copy of everything else
+
+    '''
+    def __init__(self, figure, groups: dict = COMPARE_STAT_GROUPS, colors: tuple = ('blue', 'orange'), width: float = 0.8, legend: bool = True):
+        self.figure = figure
+        self.show_legend = legend
+        self.groups = groups
+        # Width of each stat's cluster of bars, shared between the players
+        self.width = width
+        self.colors = list(colors) + [color for color in SERIES_COLORS if color not in colors]
+        self.columns = [stat for stats in groups.values() for stat in stats]
+        bounds = np.cumsum([0] + [len(stats) for stats in groups.values()])
+        self.slices = [slice(lo, hi) for lo, hi in zip(bounds[:-1], bounds[1:])]
+
+        n_cols = 2
+        n_rows = int(np.ceil(len(groups) / n_cols))
+        axes = figure.subplots(n_rows, n_cols, squeeze = False)
+        self.axes = list(axes.flat)[:len(groups)]
+        for ax in list(axes.flat)[len(groups):]:
+            ax.set_visible(False)
+
+        self.bars = []
+        for ax, (title, stats) in zip(self.axes, groups.items()):
+            x = np.arange(len(stats))
+            bars = PolyCollection([], edgecolors = 'none')
+            ax.add_collection(bars)
+            ax.set_xlim(-0.5, len(stats) - 0.5)
+            ax.set_title(title)
+            ax.set_xticks(x)
+            ax.set_xticklabels(stats, rotation = 30, ha = 'right')
+            self.bars.append(bars)
+        self.heights = [np.zeros((0, len(stats))) for stats in groups.values()]
+
+        # Without a legend the cells reach the top of the figure
+        self.legend_bottom = LEGEND_BOTTOM if legend else 1.0
+        figure.subplots_adjust(hspace = 0.5, wspace = 0.4, top = self.legend_bottom - 0.07)
+        self.legend = None
+        self._background = None
+        self._background_size = None
+        self._set_names(('',) * len(colors))
+        self._dirty = set(range(len(self.axes))) | ({'legend'} if legend else set())
+
+    def color(self, i: int) -> str:
+        return self.colors[i % len(self.colors)]
+
+    def _set_names(self, names: tuple) -> None:
+        '''
+
+        Rebuilds the figure legend for a new set of players, making room for more rows of entries
+
+        '''
+        self.names = names
+        if not self.show_legend:
+            return
+        if self.legend is not None:
+            self.legend.remove()
+        n_cols = max(1, min(len(names), LEGEND_COLUMNS))
+        n_rows = int(np.ceil(len(names) / n_cols)) if names else 1
+        handles = [Patch(facecolor = self.color(i)) for i in range(len(names))]
+        self.legend = self.figure.legend(handles, list(names), loc = 'upper right', fontsize = 10 if n_rows == 1 else 8, ncol = n_cols)
+        legend_bottom = LEGEND_BOTTOM - LEGEND_ROW_HEIGHT * (n_rows - 1)
+        if legend_bottom != self.legend_bottom:
+            self.figure.subplots_adjust(top = legend_bottom - 0.07)
+            self.legend_bottom = legend_bottom
+            # The cells moved, so the saved background no longer lines up
+            self._background = None
+
+    def set_data(self, names: tuple, stats) -> set:
+        '''
+
+        Moves the existing bars to new players' values; returns which cells changed
+
+        names holds one label per player and stats their values, as one Series (indexed by stat)
+        per player or a DataFrame with one row per player
+
+        '''
+        changed = set()
+        values = np.nan_to_num(_stat_matrix(stats, self.columns))
+        n_players = len(values)
+        bar_width = self.width / max(n_players, 1)
+        for i, (ax, columns) in enumerate(zip(self.axes, self.slices)):
+            heights = values[:, columns]
+            if heights.shape == self.heights[i].shape and np.array_equal(heights, self.heights[i]):
+                continue
+            # One rectangle per (player, stat): players side by side within each stat's cluster
+            left = np.arange(heights.shape[1])[None, :] - self.width / 2 + bar_width * np.arange(n_players)[:, None]
+            left, top = left.ravel(), heights.ravel()
+            zeros = np.zeros_like(top)
+            verts = np.stack([
+                np.stack([left, zeros], axis = 1),
+                np.stack([left, top], axis = 1),
+                np.stack([left + bar_width, top], axis = 1),
+                np.stack([left + bar_width, zeros], axis = 1)
+            ], axis = 1)
+            self.bars[i].set_verts(verts)
+            self.bars[i].set_facecolor(np.repeat([self.color(p) for p in range(n_players)], heights.shape[1]) if n_players else [])
+            self.heights[i] = heights
+            low = min(0.0, heights.min()) if heights.size else 0.0
+            high = max(0.0, heights.max()) if heights.size else 0.0
+            pad = (high - low) * 0.05 or 1.0
+            ax.set_ylim(low - (pad if low < 0 else 0), high + pad)
+            changed.add(i)
+
+        names = tuple(names)
+        if names != self.names:
+            self._set_names(names)
+            if self.show_legend:
+                changed.add('legend')
+
+        self._dirty |= changed
+        return changed
+
+    def _cell_bbox(self, canvas, cell) -> tuple:
+        '''
+
+        Returns the display-space (x0, y0, x1, y1) region a cell owns; cells never overlap
+
+        '''
+        width, height = canvas.get_width_height()
+        if cell == 'legend':
+            return 0, self.legend_bottom * height, width, height
+
+        gridspec = self.axes[0].get_subplotspec().get_gridspec()
+        bottoms, tops, lefts, rights = gridspec.get_grid_positions(self.figure)
+        n_rows, n_cols = gridspec.get_geometry()
+        row, col = divmod(cell, n_cols)
+        x0 = (rights[col - 1] + lefts[col]) / 2 if col > 0 else 0.0
+        x1 = (rights[col] + lefts[col + 1]) / 2 if col < n_cols - 1 else 1.0
+        y1 = (bottoms[row - 1] + tops[row]) / 2 if row > 0 else self.legend_bottom
+        y0 = (bottoms[row] + tops[row + 1]) / 2 if row < n_rows - 1 else 0.0
+        return x0 * width, y0 * height, x1 * width, y1 * height
+
+    def _capture_background(self, canvas) -> None:
+        '''
+
+        Grabs a copy of the figure without the parts that change (bars, value axes and legend)
+        to restore cells from before repainting them
+
+        '''
+        artists = self.bars + [ax.yaxis for ax in self.axes] + ([self.legend] if self.legend is not None else [])
+        for artist in artists:
+            artist.set_visible(False)
+        canvas.draw()
+        self._background = canvas.copy_from_bbox(self.figure.bbox)
+        for artist in artists:
+            artist.set_visible(True)
+        self._background_size = canvas.get_width_height()
+
+    def draw(self, canvas, full: bool = False) -> None:
+        '''
+
+        Repaints the cells changed since the last draw, or the whole figure if the canvas was
+        resized or full is set
+
+        '''
+        if full or self._background is None or self._background_size != canvas.get_width_height():
+            self._capture_background(canvas)
+            canvas.draw()
+            self._dirty.clear()
+            return
+
+        renderer = canvas.get_renderer()
+        height = canvas.get_width_height()[1]
+        origin = self._background.get_extents()[:2]
+        for cell in self._dirty:
+            x0, y0, x1, y1 = (int(round(v)) for v in self._cell_bbox(canvas, cell))
+            # Saved regions are addressed top-down, display coordinates bottom-up
+            canvas.restore_region(self._background, bbox = (x0, height - y1, x1, height - y0), xy = origin)
+            if cell == 'legend':
+                self.legend.draw(renderer)
+            else:
+                # Titles and stat labels are already in the background; spines go back over the bars
+                ax = self.axes[cell]
+                for artist in [self.bars[cell], ax.yaxis] + list(ax.spines.values()):
+                    artist.draw(renderer)
+            canvas.blit(Bbox.from_extents(x0, y0, x1, y1))
+        self._dirty.clear()
+
+    def snapshot(self, canvas):
+        '''
+
+        Returns a copy of the currently rendered figure pixels, for RenderCache
+
+        '''
+        return canvas.copy_from_bbox(self.figure.bbox)
+
+    def restore(self, canvas, image) -> None:
+        '''
+
+        Puts previously rendered pixels back on the canvas without drawing any artists
+
+        '''
+        canvas.restore_region(image)
+        canvas.blit(self.figure.bbox)
+        self._dirty.clear()
+
+
+class CompareHeatmap:
+    '''
+
+    Players x stats heatmap for the Compare Players tab, built once and updated in place
+
+    Each cell is colored by the player's percentile among the players shown for that stat (100
+    is best, including for stats where lower is better), so stats on different scales share one
+    color bar. The whole chart is one image, whatever the number of players, and a redraw only
+    repaints it over a saved copy of the rest; the player labels are only re-rendered when the
+    players change. With names off the labels are left to the caller (the GUI paints them with
+    Qt, see row_centers), since matplotlib rasterizes every label's glyphs afresh
+
+    '''
+    def __init__(self, figure, stats: list, lower_is_better: list = LOWER_IS_BETTER, names: bool = True):
+        import matplotlib
+        self.figure = figure
+        self.stats = list(stats)
+        self.flip = np.array([stat in lower_is_better for stat in self.stats])
+        self.ax = figure.add_subplot(111)
+        cmap = matplotlib.colormaps['RdYlGn'].with_extremes(bad = 'lightgray')
+        self.image = self.ax.imshow(np.ma.masked_all((1, len(self.stats))), cmap = cmap, vmin = 0, vmax = 100, aspect = 'auto', interpolation = 'nearest')
+        self.ax.set_xticks(np.arange(len(self.stats)))
+        self.ax.set_xticklabels(self.stats)
+        self.ax.xaxis.tick_top()
+        self.ax.tick_params(length = 0)
+        if not names:
+            self.ax.set_yticks([])
+        figure.colorbar(self.image, ax = self.ax, label = 'Percentile among compared players')
+        # Room for player names along the left
+        figure.subplots_adjust(left = 0.2 if names else 0.02)
+        self.show_names = names
+        self.name_size = 10
+        self.names = ()
+        self.values = np.empty((0, len(self.stats)))
+        self._background = None
+        self._background_size = None
+        # The background with the current player labels drawn in
+        self._labelled = None
+
+    def set_data(self, names: tuple, stats) -> set:
+        '''
+
+        Recolors the image for new players' values; takes the same arguments as
+        CompareChart.set_data
+
+        '''
+        values = _stat_matrix(stats, self.stats)
+        names = tuple(names)
+        if names == self.names and values.shape == self.values.shape and np.array_equal(values, self.values, equal_nan = True):
+            return set()
+        # Rank within each column, ties sharing their mean rank; missing values stay missing
+        present = ~np.isnan(values)
+        order = np.argsort(np.where(present, values, np.inf), axis = 0, kind = 'stable')
+        ranks = np.empty_like(values)
+        np.put_along_axis(ranks, order, np.arange(len(values), dtype = float)[:, None], axis = 0)
+        for column in range(values.shape[1]):
+            _, inverse = np.unique(values[:, column], return_inverse = True)
+            ranks[:, column] = np.bincount(inverse, ranks[:, column])[inverse] / np.bincount(inverse)[inverse]
+        counts = present.sum(axis = 0)
+        with np.errstate(invalid = 'ignore', divide = 'ignore'):
+            percentiles = np.where(counts > 1, 100 * ranks / (counts - 1), 50.0)
+        percentiles = np.where(self.flip, 100 - percentiles, percentiles)
+
+        n_players = len(values)
+        self.image.set_data(np.ma.masked_array(percentiles, mask = ~present) if n_players else np.ma.masked_all((1, len(self.stats))))
+        self.image.set_extent((-0.5, len(self.stats) - 0.5, max(n_players, 1) - 0.5, -0.5))
+        self.ax.set_ylim(max(n_players, 1) - 0.5, -0.5)
+        if names != self.names:
+            self.name_size = 10 if n_players <= 15 else 8
+            # Without labels there is nothing to tick, and every Tick is costly to create
+            if self.show_names:
+                self.ax.set_yticks(np.arange(n_players))
+                self.ax.set_yticklabels(names, fontsize = self.name_size)
+            self._labelled = None
+        self.names = names
+        self.values = values
+        return {'image'}
+
+    def draw(self, canvas, full: bool = False) -> None:
+        '''
+
+        Repaints the image (and the player labels if they changed), or the whole figure if the
+        canvas was resized or full is set
+
+        '''
+        changing = [self.image, self.ax.yaxis]
+        if full or self._background is None or self._background_size != canvas.get_width_height():
+            for artist in changing:
+                artist.set_visible(False)
+            canvas.draw()
+            self._background = canvas.copy_from_bbox(self.figure.bbox)
+            self._background_size = canvas.get_width_height()
+            self._labelled = None
+            for artist in changing:
+                artist.set_visible(True)
+
+        renderer = canvas.get_renderer()
+        if self._labelled is None:
+            canvas.restore_region(self._background)
+            self.ax.yaxis.draw(renderer)
+            self._labelled = canvas.copy_from_bbox(self.figure.bbox)
+        else:
+            canvas.restore_region(self._labelled)
+        for artist in [self.image] + list(self.ax.spines.values()):
+            artist.draw(renderer)
+        canvas.blit(self.figure.bbox)
+
+    def row_centers(self) -> np.ndarray:
+        '''
+
+        Returns the display y coordinate (pixels up from the bottom of the figure) of the middle
+        of each player's row
+
+        '''
+        rows = np.arange(len(self.names), dtype = float)
+        return self.ax.transData.transform(np.column_stack([np.zeros_like(rows), rows]))[:, 1]
+
+    def snapshot(self, canvas):
+        return canvas.copy_from_bbox(self.figure.bbox)
+
+    def restore(self, canvas, image) -> None:
+        canvas.restore_region(image)
+        canvas.blit(self.figure.bbox)
+
+
+class LeagueComparisonChart:
+    '''
+
+    Horizontal player-vs-other-players bar chart, built once and updated in place
+
+    '''
+    def __init__(self, figure):
+        self.figure = figure
+        self.ax = figure.add_subplot(111)
+        self.bars = self.ax.barh(['Other Players (Avg)', ''], [0, 0], color = ['blue', 'green'])
+        self.labels = []
+
+    def set_data(self, player_name: str, label: str, player_val: float, other_player_avg: float, start_season: int, end_season: int) -> None:
+        '''
+
+        Updates the existing bars, tick labels and titles for a new comparison
+
+        '''
+        values = [other_player_avg, player_val]
+        for rect, value in zip(self.bars, values):
+            rect.set_width(value)
+        self.bars[1].set_color('green' if player_val >= other_player_avg else 'red')
+        self.ax.set_yticks([0, 1])
+        self.ax.set_yticklabels(['Other Players (Avg)', player_name])
+
+        low = min(0.0, min(values))
+        high = max(0.0, max(values))
+        pad = (high - low) * 0.15 or 1.0
+        self.ax.set_xlim(low - (pad if low < 0 else 0), high + pad)
+
+        self.ax.set_title(f'{label} Comparison ({start_season}-{end_season})')
+        self.ax.set_ylabel(label)
+        for text in self.labels:
+            text.remove()
+        self.labels = self.ax.bar_label(self.bars, fmt = '%.2f')
+
+
+class TrendChart:
+    '''
+
+    A player's seasons in one stat against the league, built once and updated in place
+
+    The left axes follow calendar seasons (the player's value, its rolling aggregate and the
+    league average); the right axes put the same values by season index over the league aging
+    curve and its quadratic fit
+
+    '''
+    def __init__(self, figure):
+        from matplotlib.ticker import MaxNLocator
+        self.figure = figure
+        self.season_ax, self.index_ax = figure.subplots(1, 2)
+        self.value_line, = self.season_ax.plot([], [], 'o-', color = 'blue', label = 'Player')
+        self.rolling_line, = self.season_ax.plot([], [], '--', color = 'blue', alpha = 0.5, label = 'Rolling')
+        self.league_line, = self.season_ax.plot([], [], 's-', color = 'gray', label = 'League Average')
+        self.index_value_line, = self.index_ax.plot([], [], 'o-', color = 'blue', label = 'Player')
+        self.curve_line, = self.index_ax.plot([], [], '-', color = 'green', label = 'Aging Curve')
+        self.fit_line, = self.index_ax.plot([], [], ':', color = 'green', label = 'Quadratic Fit')
+        self.season_ax.set_xlabel('Season')
+        self.index_ax.set_xlabel('Season Index')
+        self.index_ax.set_title('League Aging Curve')
+        self.index_ax.legend(loc = 'best', fontsize = 9)
+        for ax in (self.season_ax, self.index_ax):
+            ax.xaxis.set_major_locator(MaxNLocator(integer = True))
+        figure.subplots_adjust(wspace = 0.3)
+
+    def set_data(self, player_name: str, label: str, trend, curve, window: int) -> None:
+        '''
+
+        Moves the existing lines to a new player's trend frame and the stat's aging curve
+
+        '''
+        seasons = trend['Season'].to_numpy()
+        self.value_line.set_data(seasons, trend['Value'].to_numpy())
+        self.rolling_line.set_data(seasons, trend['Rolling'].to_numpy())
+        self.rolling_line.set_visible(window > 1)
+        self.rolling_line.set_label(f'{window}-Season Rolling')
+        self.league_line.set_data(seasons, trend['League'].to_numpy())
+        self.index_value_line.set_data(trend['Season Index'].to_numpy(), trend['Value'].to_numpy())
+        self.curve_line.set_data(curve.index.to_numpy(), curve['Curve'].to_numpy())
+        self.fit_line.set_data(curve.index.to_numpy(), curve['Fit'].to_numpy())
+
+        self.season_ax.set_title(f'{player_name}: {label}')
+        self.season_ax.set_ylabel(label)
+        # The legend is rebuilt so the rolling line's label and visibility follow the window
+        self.season_ax.legend(handles = [line for line in (self.value_line, self.rolling_line, self.league_line) if line.get_visible()], loc = 'best', fontsize = 9)
+        for ax in (self.season_ax, self.index_ax):
+            ax.relim(visible_only = True)
+            ax.autoscale_view()
+
+
+class RenderCache:
+    '''
+
+    Small LRU cache of rendered chart images, keyed by whatever identifies the chart's contents
+
+    '''
+    def __init__(self, max_entries: int = 8):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry
+
+    def put(self, key, entry) -> None:
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last = False)
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
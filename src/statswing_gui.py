@@ -1,41 +1,362 @@
+import time
+from contextlib import contextmanager
 import numpy as np
 import pandas as pd
-from PyQt5.QtCore import Qt
+from PyQt5.QtCore import Qt, QEvent, QRectF, QStringListModel, QTimer, pyqtSignal
 from PyQt5.QtWidgets import (
     QMainWindow, QTabWidget, QWidget, QVBoxLayout, QHBoxLayout, QHeaderView,
-    QLabel, QComboBox, QMessageBox, QTableWidget, QTableWidgetItem, QAbstractItemView,
-    QGridLayout, QSizePolicy
+    QLabel, QComboBox, QMessageBox, QTableView, QAbstractItemView,
+    QGridLayout, QSizePolicy, QLineEdit, QListWidget, QListWidgetItem, QPushButton, QStackedWidget
 )
-from src.config import TEAM_NAME_MAPPING, STAT_MAPPING, STAT_DESCRIPTIONS
-from src.statswing_utils import get_dataset_column
-from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as FigureCanvas
-from matplotlib.figure import Figure
+from PyQt5.QtGui import QColor, QIcon, QPainter, QPixmap
+from PyQt5.QtCore import QModelIndex
+from src.config import TEAM_NAME_MAPPING, STAT_MAPPING, STAT_DESCRIPTIONS, COMPARE_HEATMAP_STATS
+from src.statswing_models import ArrayTableModel, PlayerCompleter, PlayerListModel, TeamFilterProxy
+from src.statswing_scheduler import UpdateScheduler
+from src.statswing_search import PlayerSearchIndex
+from src.statswing_trends import DEFAULT_WINDOW
+from src.statswing_workers import WorkerPool
+from src.statswing_utils import get_dataset_column, get_stat_type
+from src import statswing_query as query
+
+LEADERBOARD_SIZE = 25
+SIMILAR_PLAYER_COUNT = 25
+# Title and builder of each tab; a tab's widgets are only created the first time it is shown
+TABS = [
+    ('Player Analytics', 'create_player_tab'),
+    ('Compare Players', 'create_compare_tab'),
+    ('Similar Players', 'create_similar_tab'),
+    ('Career Stats', 'create_career_tab'),
+    ('Trends', 'create_trends_tab')
+]
+# The Compare Players tab holds up to this many players, shown as grouped bars or a heatmap
+MAX_COMPARE_PLAYERS = 30
+COMPARE_VIEWS = ['Grouped Bars', 'Heatmap']
+TREND_WINDOWS = [1, 2, 3, 4, 5]
+DEFAULT_TREND_STAT = 'wOBA'
+# Dropdowns are sized for this many characters instead of measuring every player name
+DROPDOWN_CHARACTERS = 24
+
+class HeatmapNames(QWidget):
+    '''
+
+    Player names for the Compare Players heatmap, painted by Qt to the left of its canvas
+
+    matplotlib rasterizes a label's glyphs every time it draws it, which made the names most of
+    a 30-player heatmap redraw; Qt caches glyphs, so new names cost next to nothing here
+
+    '''
+    def __init__(self, chart, canvas):
+        super().__init__()
+        self.chart = chart
+        self.canvas = canvas
+        self.setFixedWidth(self.fontMetrics().averageCharWidth() * DROPDOWN_CHARACTERS)
+        # Every draw, blit or restore of the canvas repaints the names too
+        canvas.installEventFilter(self)
+
+    def eventFilter(self, watched, event) -> bool:
+        if event.type() == QEvent.Paint:
+            self.update()
+        return False
+
+    def paintEvent(self, event) -> None:
+        from matplotlib.colors import to_hex
+        painter = QPainter(self)
+        painter.fillRect(event.rect(), QColor(to_hex(self.chart.figure.get_facecolor())))
+        if not self.chart.names:
+            painter.end()
+            return
+        # Display coordinates count device pixels up from the bottom of the figure
+        ratio = self.canvas.device_pixel_ratio
+        height = self.chart.figure.bbox.height
+        offset = self.canvas.y() - self.y()
+        font = self.font()
+        font.setPixelSize(max(1, round(self.chart.name_size * self.chart.figure.dpi / ratio / 72)))
+        painter.setFont(font)
+        row_height = painter.fontMetrics().height()
+        for name, y in zip(self.chart.names, self.chart.row_centers()):
+            top = (height - y) / ratio + offset - row_height / 2
+            painter.drawText(QRectF(0, top, self.width() - 4, row_height), Qt.AlignRight | Qt.AlignVCenter, name)
+        painter.end()
 
 class StatSwingApp(QMainWindow):
-    def __init__(self, data):
+    # Emitted by the store listener; queued onto the GUI thread if the store changed elsewhere
+    data_changed = pyqtSignal(object, object)
+
+    def __init__(self, store, dataset = None):
+        self.created = time.perf_counter()
+        # Seconds from construction to the first paint of the window; set by paintEvent
+        self.first_paint = None
         super().__init__()
-        self.data = data
+        self.store = store
+        # Season-range queries in the Player Analytics tab go to the partitioned dataset when one
+        # is given (reading only the seasons and columns they need), otherwise to the store
+        self.range_source = dataset if dataset is not None else store
+        self.data = store.data
         self.setWindowTitle("StatSwing Test")
         self.setGeometry(100, 100, 1000, 800)
         self.tabs = QTabWidget()
         self.setCentralWidget(self.tabs)
 
-        self.tabs.addTab(self.create_player_tab(), "Player Analytics")
-        self.tabs.addTab(self.create_compare_tab(), "Compare Players")
-        self.tabs.addTab(self.create_career_tab(), "Career Stats")
+        # View refreshes go through the scheduler so a dropdown cascade redraws each view once
+        self.scheduler = UpdateScheduler(self)
+        # Queries run on pool threads; results from superseded selections are dropped
+        self.workers = WorkerPool(self)
+        self.chart_window = None
+        self.leaderboard_window = None
+        # One type-ahead index serves every player search box; it is built off the GUI thread
+        # after the first paint, or on the first keystroke if that comes sooner
+        self._search_index = None
+
+        # Every player dropdown is a team filter over one shared name list, and every team
+        # dropdown shares one team list; tabs register their dropdowns here when built
+        self.player_model = PlayerListModel(self.store, self)
+        self.team_model = QStringListModel(self.team_names(), self)
+        self.player_dropdowns = []
+        self.team_dropdowns = []
+
+        self.built_tabs = set()
+        for title, _ in TABS:
+            page = QWidget()
+            page_layout = QVBoxLayout(page)
+            page_layout.setContentsMargins(0, 0, 0, 0)
+            self.tabs.addTab(page, title)
+        self.build_tab(self.tabs.currentIndex())
+        self.tabs.currentChanged.connect(self.build_tab)
+
+        # Rows merged into the store (statswing_utils.upsert_rows) refresh the open views in place
+        self.data_changed.connect(self.refresh_views)
+        # Each access to .emit makes a new bound method, so the one registered is kept to remove it;
+        # a window deleted without being closed unregisters when its QObject goes away
+        self._store_listener = self.data_changed.emit
+        self.store.add_listener(self._store_listener)
+        self.destroyed.connect(lambda _ = None, store = self.store, listener = self._store_listener: store.remove_listener(listener))
+
+    def closeEvent(self, event) -> None:
+        self.store.remove_listener(self._store_listener)
+        super().closeEvent(event)
+
+    def paintEvent(self, event) -> None:
+        if self.first_paint is None:
+            self.first_paint = time.perf_counter() - self.created
+            QTimer.singleShot(0, self.prepare_search_index)
+        super().paintEvent(event)
+
+    @property
+    def search_index(self) -> PlayerSearchIndex:
+        if self._search_index is None:
+            self.workers.cancel('search_index')
+            self._search_index = PlayerSearchIndex(self.store.player_names)
+        return self._search_index
+
+    def prepare_search_index(self) -> None:
+        if self._search_index is None:
+            self.workers.submit('search_index', PlayerSearchIndex, list(self.store.player_names), on_result = self.set_search_index)
+
+    def set_search_index(self, index: PlayerSearchIndex) -> None:
+        if self._search_index is None:
+            # Names merged in while it was being built
+            index.add(self.store.player_names)
+            self._search_index = index
+
+    def build_tab(self, index: int) -> None:
+        '''
+
+        Creates a tab's widgets the first time it is shown
+
+        '''
+        if not 0 <= index < len(TABS) or TABS[index][1] in self.built_tabs:
+            return
+        builder = TABS[index][1]
+        self.built_tabs.add(builder)
+        self.tabs.widget(index).layout().addWidget(getattr(self, builder)())
+
+    def build_all_tabs(self) -> None:
+        for index in range(len(TABS)):
+            self.build_tab(index)
+
+    def team_names(self) -> list:
+        return ['All Teams'] + [TEAM_NAME_MAPPING.get(team, team) for team in self.store.teams]
+
+    def create_team_dropdown(self, on_change) -> QComboBox:
+        '''
+
+        Creates a dropdown over the shared team list
+
+        '''
+        dropdown = QComboBox()
+        dropdown.setModel(self.team_model)
+        dropdown.currentTextChanged.connect(on_change)
+        self.team_dropdowns.append(dropdown)
+        return dropdown
+
+    def create_player_dropdown(self) -> QComboBox:
+        '''
+
+        Creates a dropdown showing every player through its own team filter on the shared list
+
+        '''
+        dropdown = QComboBox()
+        # Sizing to contents would measure every name, and an unset popup list lays out every row
+        dropdown.setSizeAdjustPolicy(QComboBox.AdjustToMinimumContentsLengthWithIcon)
+        dropdown.setMinimumContentsLength(DROPDOWN_CHARACTERS)
+        dropdown.view().setUniformItemSizes(True)
+        dropdown.setModel(TeamFilterProxy(self.player_model, dropdown))
+        self.player_dropdowns.append(dropdown)
+        return dropdown
+
+    def show_team(self, dropdown: QComboBox, team_name: str) -> None:
+        '''
+
+        Limits a player dropdown to one team ('All Teams' for everyone), selecting its first player;
+        the change signal is emitted once, for the final selection
+
+        '''
+        with self.scheduler.blocked(dropdown):
+            dropdown.model().set_team(None if team_name == 'All Teams' else query.team_abbreviation(team_name))
+            dropdown.setCurrentIndex(0 if dropdown.count() else -1)
+        dropdown.currentTextChanged.emit(dropdown.currentText())
+
+    @contextmanager
+    def keeping_selection(self, *dropdowns: QComboBox):
+        '''
+
+        Keeps each dropdown's selection across changes to its model if the item is still there; a
+        change signal is only emitted for dropdowns whose selection itself changed
+
+        '''
+        current = [dropdown.currentText() for dropdown in dropdowns]
+        with self.scheduler.blocked(*dropdowns):
+            yield
+            for dropdown, text in zip(dropdowns, current):
+                model = dropdown.model()
+                row = model.find(text) if isinstance(model, TeamFilterProxy) else dropdown.findText(text)
+                dropdown.setCurrentIndex(row if row >= 0 else (0 if dropdown.count() else -1))
+        for dropdown, text in zip(dropdowns, current):
+            if dropdown.currentText() != text:
+                dropdown.currentTextChanged.emit(dropdown.currentText())
+
+    def refill_dropdown(self, dropdown: QComboBox, items: list) -> None:
+        '''
+
+        Replaces a dropdown's items, keeping the current selection if it's still there; a
+        change signal is only emitted if the selection itself changed
+
+        '''
+        current = dropdown.currentText()
+        with self.scheduler.blocked(dropdown):
+            dropdown.clear()
+            dropdown.addItems(items)
+            if current in items:
+                dropdown.setCurrentText(current)
+        if dropdown.currentText() != current:
+            dropdown.currentTextChanged.emit(dropdown.currentText())
+
+    def refresh_views(self, players: set, seasons: set) -> None:
+        '''
+
+        Brings every view up to date after rows were merged into the store, without rebuilding tabs
+
+        '''
+        self.data = self.store.data
+        if self._search_index is not None:
+            self._search_index.add(self.store.player_names)
+        # Resetting the two shared models updates every dropdown built so far
+        with self.keeping_selection(*self.team_dropdowns, *self.player_dropdowns):
+            self.team_model.setStringList(self.team_names())
+            self.player_model.set_store(self.store)
+
+        if 'create_player_tab' in self.built_tabs:
+            if self.player_dropdown.currentText() in players:
+                # Keep the selected season range, widening the choices to any new seasons
+                seasons_list = [str(season) for season in query.player_seasons(self.range_source, self.player_dropdown.currentText())]
+                self.refill_dropdown(self.start_season_dropdown, seasons_list)
+                self.refill_dropdown(self.end_season_dropdown, seasons_list)
+            self.schedule_player_table()
+        if 'create_compare_tab' in self.built_tabs:
+            # Cached chart images may show replaced values; new seasons widen the range choices
+            self.compare_render_cache.clear()
+            self.refill_dropdown(self.compare_start_dropdown, self.season_choices())
+            self.refill_dropdown(self.compare_end_dropdown, self.season_choices())
+            self.schedule_bar_graph()
+        if 'create_career_tab' in self.built_tabs:
+            self.schedule_career_table()
+        if 'create_similar_tab' in self.built_tabs:
+            if self.similar_player_dropdown.currentText() in players:
+                seasons_list = [str(season) for season in query.player_seasons(self.store, self.similar_player_dropdown.currentText())]
+                self.refill_dropdown(self.similar_start_dropdown, seasons_list)
+                self.refill_dropdown(self.similar_end_dropdown, seasons_list)
+            # Any merged row can move a neighbor, and the standardization with it
+            self.schedule_similar_table()
+        if 'create_trends_tab' in self.built_tabs:
+            # League averages and aging curves move with any merged row
+            self.schedule_trends()
+
+    def schedule_player_table(self) -> None:
+        self.scheduler.request('player_table', self.update_player_table)
+
+    def schedule_career_table(self) -> None:
+        self.scheduler.request('career_table', lambda: self.update_career_table(self.career_player_dropdown.currentText()))
+
+    def schedule_bar_graph(self) -> None:
+        self.scheduler.request('bar_graph', self.update_bar_graph)
+
+    def schedule_similar_table(self) -> None:
+        self.scheduler.request('similar_table', self.update_similar_table)
+
+    def schedule_trends(self) -> None:
+        self.scheduler.request('trends', self.update_trends)
+
+    def create_player_search(self, dropdown: QComboBox, team_dropdown: QComboBox = None) -> QLineEdit:
+        '''
+
+        Creates a search box whose completions select a player in dropdown (switching
+        team_dropdown to All Teams if the player isn't in the current team's list)
+
+        '''
+        search = QLineEdit()
+        search.setPlaceholderText('Search players...')
+        search.setClearButtonEnabled(True)
+        completer = PlayerCompleter(lambda: self.search_index, parent = search)
+        search.setCompleter(completer)
+        search.textEdited.connect(completer.update_matches)
+        completer.activated[str].connect(lambda name: self.select_player(name, dropdown, team_dropdown))
+        return search
+
+    def select_player(self, name: str, dropdown: QComboBox, team_dropdown: QComboBox = None) -> None:
+        if dropdown.model().find(name) < 0 and team_dropdown is not None:
+            team_dropdown.setCurrentText('All Teams')
+        row = dropdown.model().find(name)
+        if row >= 0:
+            dropdown.setCurrentIndex(row)
+
+    def create_table_view(self, model: ArrayTableModel) -> QTableView:
+        '''
+
+        Creates a read-only, sortable table view over a shared array model
+
+        '''
+        table = QTableView()
+        table.setModel(model)
+        table.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
+        table.horizontalHeader().setSortIndicator(-1, Qt.AscendingOrder)
+        table.setSortingEnabled(True)
+        table.setEditTriggers(QAbstractItemView.NoEditTriggers)
+        return table
 
     def create_career_tab(self) -> QWidget:
         tab = QWidget()
         layout = QVBoxLayout()
 
         # Player selection dropdown
-        self.career_player_dropdown = QComboBox()
-        self.career_player_dropdown.addItems(self.data['Name'].unique())
-        self.career_player_dropdown.currentTextChanged.connect(self.update_career_table)
+        self.career_player_dropdown = self.create_player_dropdown()
+        self.career_player_dropdown.currentTextChanged.connect(self.schedule_career_table)
 
-        self.career_stats_table = QTableWidget()
+        self.career_stats_model = ArrayTableModel()
+        self.career_stats_table = self.create_table_view(self.career_stats_model)
 
         layout.addWidget(QLabel("Select Player:"))
+        layout.addWidget(self.create_player_search(self.career_player_dropdown))
         layout.addWidget(self.career_player_dropdown)
         layout.addWidget(self.career_stats_table)
 
@@ -45,61 +366,32 @@ class StatSwingApp(QMainWindow):
     def update_career_table(self, player_name: str) -> None:
 
 
-    # Filter the dataset for career stats (Season Year == 0)
-        player_career_data = self.data[
-            (self.data['Name'] == player_name) & (self.data['Season Year'] == 0)
-        ]
-
-        career_averages = self.data[self.data['Name'] == "Career Average"]
+    # Career stats (Season Year == 0) against the Career Average row
+        self.workers.submit('career_table', query.career_comparison, self.store, player_name, on_result = self.show_career_table)
 
-        if player_career_data.empty or career_averages.empty:
-            self.career_stats_table.clear()
-            self.career_stats_table.setRowCount(0)
-            self.career_stats_table.setColumnCount(0)
-            self.career_stats_table.setHorizontalHeaderLabels([])
+    def show_career_table(self, stats_data: list) -> None:
+        if not stats_data:
+            self.career_stats_model.clear()
             return
 
-        player_stats = player_career_data.iloc[0]
-        career_averages = career_averages.iloc[0]
-
-        stats_columns = ["G", "PA", "HR", "R", "RBI", "SB", "BB%", "K%", "AVG", "OBP", "SLG", "wOBA"]
-
-        stats_data = [
-            (stat, player_stats[stat], career_averages[stat])
-            for stat in stats_columns
-        ]
-
-        self.career_stats_table.clear()
-        self.career_stats_table.setRowCount(len(stats_columns))
-        self.career_stats_table.setColumnCount(3)  # Columns: Stat, Player Value, Career Avg
-        self.career_stats_table.setHorizontalHeaderLabels(["Statistic", "Player Value", "Career Avg"])
-
-        for row, (stat_name, player_value, league_value) in enumerate(stats_data):
-            self.career_stats_table.setItem(row, 0, QTableWidgetItem(stat_name))  # Statistic
-            self.career_stats_table.setItem(row, 1, QTableWidgetItem(f"{player_value:.2f}"))  # Player Value
-            self.career_stats_table.setItem(row, 2, QTableWidgetItem(f"{league_value:.2f}"))  # Career Avg
-
-        self.career_stats_table.resizeColumnsToContents()
-        self.career_stats_table.resizeRowsToContents()
-        self.career_stats_table.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
-        self.career_stats_table.setEditTriggers(QAbstractItemView.NoEditTriggers)
+        stat_names, player_values, league_values = zip(*stats_data)
+        self.career_stats_model.set_columns(
+            ["Statistic", "Player Value", "Career Avg"],  # Columns: Stat, Player Value, Career Avg
+            [np.array(stat_names, dtype = object), np.array(player_values, dtype = float), np.array(league_values, dtype = float)]
+        )
     
     def create_player_tab(self) -> QWidget:
         tab = QWidget()
         layout = QGridLayout()
 
         # Team selection dropdown
-        self.team_dropdown = QComboBox()
+        self.team_dropdown = self.create_team_dropdown(self.update_player_dropdown)
         self.team_dropdown.setSizePolicy(QSizePolicy.Minimum, QSizePolicy.Fixed)
-        team_names = ['All Teams'] + [TEAM_NAME_MAPPING.get(team, team) for team in sorted(self.data['Team'].unique())]
-        self.team_dropdown.addItems(team_names)
-        self.team_dropdown.currentTextChanged.connect(self.update_player_dropdown)
 
         # Player selection dropdown
-        self.player_dropdown = QComboBox()
+        self.player_dropdown = self.create_player_dropdown()
         self.player_dropdown.setSizePolicy(QSizePolicy.Minimum, QSizePolicy.Fixed)
         self.update_player_dropdown('All Teams')
-        self.player_dropdown.currentTextChanged.connect(self.update_player_table)
         self.player_dropdown.currentTextChanged.connect(self.update_season_dropdowns)
 
         # Season selection dropdowns
@@ -107,11 +399,12 @@ class StatSwingApp(QMainWindow):
         self.start_season_dropdown.setSizePolicy(QSizePolicy.Minimum, QSizePolicy.Fixed)
         self.end_season_dropdown = QComboBox()
         self.end_season_dropdown.setSizePolicy(QSizePolicy.Minimum, QSizePolicy.Fixed)
-        self.start_season_dropdown.currentTextChanged.connect(self.update_player_table)
-        self.end_season_dropdown.currentTextChanged.connect(self.update_player_table)
+        self.start_season_dropdown.currentTextChanged.connect(self.schedule_player_table)
+        self.end_season_dropdown.currentTextChanged.connect(self.schedule_player_table)
 
-        self.player_stats_table = QTableWidget()
-        self.player_stats_table.itemDoubleClicked.connect(self.handle_double_click)
+        self.player_stats_model = ArrayTableModel()
+        self.player_stats_table = self.create_table_view(self.player_stats_model)
+        self.player_stats_table.doubleClicked.connect(self.handle_double_click)
         #self.player_stats_table.setSizePolicy(QSizePolicy.Expanding, QSizePolicy.Expanding)
 
         #self.figure_player = Figure()
@@ -128,77 +421,106 @@ class StatSwingApp(QMainWindow):
         layout.addWidget(self.start_season_dropdown, 1, 1)
         layout.addWidget(QLabel('End Season:'), 1, 2)
         layout.addWidget(self.end_season_dropdown, 1, 3)
-        layout.addWidget(self.player_stats_table, 2, 0, 1, 4)
+        layout.addWidget(QLabel('Search:'), 2, 0)
+        layout.addWidget(self.create_player_search(self.player_dropdown, self.team_dropdown), 2, 1, 1, 3)
+        layout.addWidget(self.player_stats_table, 3, 0, 1, 4)
         #layout.addWidget(self.canvas_player, 3, 0, 1, 4)
 
         tab.setLayout(layout)
         return tab
     
-    def handle_double_click(self, item: QTableWidgetItem) -> None:
-        if item.column() == 0:
-            stat_name = item.text()
+    def handle_double_click(self, index: QModelIndex) -> None:
+        if index.column() == 0:
+            stat_name = index.data()
             description = STAT_DESCRIPTIONS.get(stat_name, 'No description available')
             QMessageBox.information(self, f'About {stat_name}', description)
-        elif item.column() == 1:
-            stat_name = self.player_stats_table.item(item.row(), 0).text()
+        elif index.column() == 1:
+            stat_name = index.sibling(index.row(), 0).data()
             self.compare_to_average(stat_name)
+        elif index.column() == 2:
+            stat_name = index.sibling(index.row(), 0).data()
+            self.show_leaderboard(stat_name)
 
     def compare_to_average(self, stat_name: str) -> None:
-        stat_col = get_dataset_column(stat_name)
         start_season = int(self.start_season_dropdown.currentText())
         end_season = int(self.end_season_dropdown.currentText())
         player_name = self.player_dropdown.currentText()
-        filtered_data = self.data[(self.data['Season Year'] >= start_season) & (self.data['Season Year'] <= end_season)]
 
-        grouped_data = (
-            filtered_data.groupby('Name')[stat_col]
-            .sum()
-            .reset_index()
-            .rename(columns = {stat_col: 'TotalStat'})
+        self.workers.submit(
+            'compare_chart', query.league_comparison, self.range_source, player_name, stat_name, start_season, end_season,
+            on_result = lambda comparison: self.show_compare_chart(
+                player_name, stat_name, comparison['player_value'], comparison['other_player_avg'], start_season, end_season
+            )
         )
 
-        player_stat = grouped_data[grouped_data['Name'] == player_name]
-        player_val = player_stat['TotalStat'].iloc[0]
-        other_player_stats = grouped_data[grouped_data['Name'] != player_name]
-        other_player_avg = other_player_stats['TotalStat'].mean()
-        self.show_compare_chart(player_name, stat_name, player_val, other_player_avg, start_season, end_season)
-
     def show_compare_chart(self, player_name: str, stat_name: str, player_val: float, other_player_avg: float, start_season: int, end_season: int) -> None:
-        fig = Figure(figsize = (6, 4))
-        ax = fig.add_subplot(111)
+        # The chart window is built on first use and reused for every later comparison
+        if self.chart_window is None:
+            # matplotlib is only imported once a chart is actually needed
+            from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as FigureCanvas
+            from matplotlib.figure import Figure
+            from src.statswing_charts import LeagueComparisonChart
+
+            fig = Figure(figsize = (6, 4))
+            self.league_chart = LeagueComparisonChart(fig)
+            self.league_canvas = FigureCanvas(fig)
+
+            self.chart_window = QWidget()
+            self.chart_window.setWindowTitle(f'Stat Comparison')
+            layout = QVBoxLayout()
+            layout.addWidget(self.league_canvas)
+            self.chart_window.setLayout(layout)
+
+        label = f'Total {stat_name}' if get_stat_type(get_dataset_column(stat_name)) == 'counting' else stat_name
+        self.league_chart.set_data(player_name, label, player_val, other_player_avg, start_season, end_season)
+        self.league_canvas.draw_idle()
+        self.chart_window.show()
+    
+    def show_leaderboard(self, stat_name: str) -> None:
+        '''
 
-        bars = ax.barh(
-            ['Other Players (Avg)', player_name],
-            [other_player_avg, player_val],
-            color = ['blue', 'green' if player_val >= other_player_avg else 'red']
-        )
+        Lists the top players for a stat over the selected season range in a separate window
+
+        '''
+        start_season = int(self.start_season_dropdown.currentText())
+        end_season = int(self.end_season_dropdown.currentText())
 
-        ax.set_title(f'Total {stat_name} Comparison ({start_season}-{end_season})')
-        ax.set_ylabel(f'Total {stat_name}')
-        ax.bar_label(bars, fmt = '%.2f')
+        def fetch():
+            return query.leaderboard(self.range_source, stat_name, start_season, end_season, LEADERBOARD_SIZE)
+        self.workers.submit(
+            'leaderboard', fetch,
+            on_result = lambda leaders: self.show_leaderboard_table(stat_name, leaders, start_season, end_season)
+        )
 
-        self.chart_window = QWidget()
-        self.chart_window.setWindowTitle(f'Stat Comparison')
+    def show_leaderboard_table(self, stat_name: str, leaders: pd.DataFrame, start_season: int, end_season: int) -> None:
+        # Built on first use and reused, like the comparison chart window
+        if self.leaderboard_window is None:
+            self.leaderboard_model = ArrayTableModel()
+            self.leaderboard_label = QLabel()
+            self.leaderboard_window = QWidget()
+            self.leaderboard_window.setWindowTitle('Leaderboard')
+            self.leaderboard_window.resize(420, 600)
+            layout = QVBoxLayout()
+            layout.addWidget(self.leaderboard_label)
+            layout.addWidget(self.create_table_view(self.leaderboard_model))
+            self.leaderboard_window.setLayout(layout)
+
+        seasons = str(start_season) if start_season == end_season else f'{start_season}-{end_season}'
+        self.leaderboard_label.setText(f'Top {len(leaders)} in {stat_name}, {seasons}')
+        self.leaderboard_model.set_columns(
+            ['Rank', 'Player', stat_name],
+            [leaders['Rank'].to_numpy(), leaders['Name'].to_numpy(dtype = object), leaders.iloc[:, 2].to_numpy(dtype = float)]
+        )
+        self.leaderboard_window.show()
+        self.leaderboard_window.raise_()
 
-        canvas = FigureCanvas(fig)
-        layout = QVBoxLayout()
-        layout.addWidget(canvas)
-        self.chart_window.setLayout(layout)
-        self.chart_window.show()
-    
     def update_player_dropdown(self, team_name: str) -> None:
         '''
         
         Updates the player dropdown menu based on the selected team
         
         '''
-        if team_name == 'All Teams':
-            filtered_data = self.data
-        else:
-            team_abbr = {v: k for k, v in TEAM_NAME_MAPPING.items()}.get(team_name, team_name)
-            filtered_data = self.data[self.data['Team'] == team_abbr]
-        self.player_dropdown.clear()
-        self.player_dropdown.addItems(filtered_data['Name'].unique())
+        self.show_team(self.player_dropdown, team_name)
 
     def update_season_dropdowns(self) -> None:
        '''
@@ -208,23 +530,15 @@ class StatSwingApp(QMainWindow):
        
        '''
        player_name = self.player_dropdown.currentText()
-       if not player_name:
-           self.start_season_dropdown.clear()
-           self.end_season_dropdown.clear()
-           return
-       
-       player_data = self.data[self.data['Name'] == player_name]
-       if player_data.empty:
+       active_seasons = query.player_seasons(self.range_source, player_name) if player_name else []
+
+       # The table is refreshed once below rather than on every intermediate season change
+       with self.scheduler.blocked(self.start_season_dropdown, self.end_season_dropdown):
            self.start_season_dropdown.clear()
            self.end_season_dropdown.clear()
-           return
-       
-       active_seasons = sorted(player_data['Season Year'].unique())
-       active_seasons = np.delete(active_seasons, 0)
-       self.start_season_dropdown.clear()
-       self.end_season_dropdown.clear()
-       self.start_season_dropdown.addItems(map(str, active_seasons))
-       self.end_season_dropdown.addItems(map(str, active_seasons))
+           self.start_season_dropdown.addItems(map(str, active_seasons))
+           self.end_season_dropdown.addItems(map(str, active_seasons))
+       self.schedule_player_table()
 
     def update_player_table(self) -> None:
         '''
@@ -237,52 +551,39 @@ class StatSwingApp(QMainWindow):
         end_season = self.end_season_dropdown.currentText()
 
         if not player_name or not start_season or not end_season:
-            self.player_stats_table.clear()
-            self.player_stats_table.setRowCount(0)
-            self.player_stats_table.setColumnCount(0)
-            self.player_stats_table.setHorizontalHeaderLabels([])
+            # Drop any still-running query for the old selection
+            self.workers.cancel('player_table')
+            self.player_stats_model.clear()
             return
 
-        # Filter for player stats in the selected seasons
-        filtered_player_data = self.data[
-            (self.data['Name'] == player_name) &
-            (self.data['Season Year'] >= int(start_season)) &
-            (self.data['Season Year'] <= int(end_season))
-        ]
+        # Filter for player stats in the selected seasons, with where they rank among every
+        # player active in those seasons
+        def fetch():
+            stats = query.season_range_stats(self.range_source, player_name, int(start_season), int(end_season))
+            if stats is None:
+                return None, None
+            return stats, query.percentile_ranks(self.range_source, player_name, int(start_season), int(end_season))
+        self.workers.submit(
+            'player_table', fetch,
+            on_result = lambda result: self.show_player_table(*result)
+        )
 
         # Filter for league averages in the selected seasons
     #    league_avg_data = self.data[
     #       (self.data['Name'] == f"Season {selected_season} Average")
     #    ]
 
-        if filtered_player_data.empty:
-            self.player_stats_table.clear()
-            self.player_stats_table.setRowCount(0)
-            self.player_stats_table.setColumnCount(0)
-            self.player_stats_table.setHorizontalHeaderLabels(['No Data Available'])
+    def show_player_table(self, agg_data: pd.Series, percentiles: pd.Series = None) -> None:
+        if agg_data is None:
+            self.player_stats_model.set_columns(['No Data Available'], [np.empty(0)])
             return
         
-        agg_data = filtered_player_data.sum(numeric_only = True)
-
-        stats = [
-            (STAT_MAPPING.get(col, col), agg_data[col])
-            for col in agg_data.index
-            if col in STAT_MAPPING
-        ]
-
-        self.player_stats_table.clear()
-        self.player_stats_table.setRowCount(len(stats))
-        self.player_stats_table.setColumnCount(2)  # Columns: Stat, Player Value
-        self.player_stats_table.setHorizontalHeaderLabels(["Statistic", "Value"])
-
-        for row, (stat_name, value) in enumerate(stats):
-            self.player_stats_table.setItem(row, 0, QTableWidgetItem(stat_name))  # Statistic
-            self.player_stats_table.setItem(row, 1, QTableWidgetItem(f'{value:.2f}' if isinstance(value, float) else str(value)))
-
-        self.player_stats_table.resizeColumnsToContents()
-        self.player_stats_table.resizeRowsToContents()
-        self.player_stats_table.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
-        self.player_stats_table.setEditTriggers(QAbstractItemView.NoEditTriggers)
+        if percentiles is None:
+            percentiles = pd.Series(np.nan, index = agg_data.index)
+        self.player_stats_model.set_columns(
+            ["Statistic", "Value", "Percentile"],  # Columns: Stat, Player Value, Percentile among active players
+            [agg_data.index.to_numpy(dtype = object), agg_data.to_numpy(dtype = float), percentiles.reindex(agg_data.index).to_numpy(dtype = float)]
+        )
 
         # Update diverging bar chart for player vs. league average
         #self.update_player_chart(stats_data)
@@ -322,210 +623,385 @@ class StatSwingApp(QMainWindow):
 
     def create_compare_tab(self) -> QWidget:
         tab = QWidget()
-        layout = QVBoxLayout()
+        layout = QGridLayout()
+
+        # Players are picked one at a time (team filter, dropdown or search) into the compare list
+        self.compare_team_dropdown = self.create_team_dropdown(self.update_compare_player_dropdown)
+        self.compare_team_dropdown.setSizePolicy(QSizePolicy.Minimum, QSizePolicy.Fixed)
+        self.compare_player_dropdown = self.create_player_dropdown()
+        self.compare_player_dropdown.setSizePolicy(QSizePolicy.Minimum, QSizePolicy.Fixed)
+        self.compare_player_dropdown.activated.connect(lambda _: self.add_compare_player())
+        add_button = QPushButton('Add Player')
+        add_button.clicked.connect(lambda: self.add_compare_player())
+
+        self.compare_list = QListWidget()
+        self.compare_list.setSelectionMode(QAbstractItemView.ExtendedSelection)
+        self.compare_list.setFlow(QListWidget.LeftToRight)
+        self.compare_list.setWrapping(True)
+        self.compare_list.setMaximumHeight(80)
+        self.compare_list.itemDoubleClicked.connect(lambda item: self.remove_compare_players([item.text()]))
+        remove_button = QPushButton('Remove Selected')
+        remove_button.clicked.connect(lambda: self.remove_compare_players([item.text() for item in self.compare_list.selectedItems()]))
+        clear_button = QPushButton('Clear')
+        clear_button.clicked.connect(lambda: self.set_compare_players([]))
+
+        # Every player is aggregated over the same season range, the whole data by default
+        seasons = self.season_choices()
+        self.compare_start_dropdown = QComboBox()
+        self.compare_start_dropdown.addItems(seasons)
+        self.compare_end_dropdown = QComboBox()
+        self.compare_end_dropdown.addItems(seasons)
+        self.compare_end_dropdown.setCurrentIndex(len(seasons) - 1)
+        self.compare_start_dropdown.currentTextChanged.connect(self.schedule_bar_graph)
+        self.compare_end_dropdown.currentTextChanged.connect(self.schedule_bar_graph)
+        self.compare_view_dropdown = QComboBox()
+        self.compare_view_dropdown.addItems(COMPARE_VIEWS)
+        self.compare_view_dropdown.currentTextChanged.connect(self.schedule_bar_graph)
+        self.compare_status = QLabel('')
+
+        # Initialize Matplotlib figure and canvas (imported here so the analytics layer never pays for it)
+        from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as FigureCanvas
+        from matplotlib.figure import Figure
+        from src.statswing_charts import CompareChart, RenderCache
+        self.figure = Figure(figsize = (12, 10))
+        self.canvas = FigureCanvas(self.figure)
 
-        # Team dropdowns for P1 and P2
-        self.team1_dropdown = QComboBox()
-        self.team1_dropdown.addItems(['All Teams'] + [TEAM_NAME_MAPPING.get(team, team) for team in sorted(self.data['Team'].unique())])
-        self.team1_dropdown.currentTextChanged.connect(self.update_player1_dropdown)
+        # Artists are created once; selection changes only move them. Recent selections are kept
+        # as images. The heatmap's figure is only built the first time it is shown
+        # The player list doubles as the legend (see set_compare_players)
+        self.compare_chart = CompareChart(self.figure, legend = False)
+        self.compare_render_cache = RenderCache()
+        self.compare_heatmap = None
+        self.compare_stack = QStackedWidget()
+        self.compare_stack.addWidget(self.canvas)
 
-        self.team2_dropdown = QComboBox()
-        self.team2_dropdown.addItems(['All Teams'] + [TEAM_NAME_MAPPING.get(team, team) for team in sorted(self.data['Team'].unique())])
-        self.team2_dropdown.currentTextChanged.connect(self.update_player2_dropdown)
+        self.compare_model = ArrayTableModel()
+        self.compare_table = self.create_table_view(self.compare_model)
 
-        # Player dropdowns for P1 and P2
-        self.player1_dropdown = QComboBox()
-        self.update_player1_dropdown('All Teams')
-        self.player1_dropdown.currentTextChanged.connect(self.update_bar_graph)
+        layout.addWidget(QLabel('Select Team:'), 0, 0)
+        layout.addWidget(self.compare_team_dropdown, 0, 1)
+        layout.addWidget(QLabel('Select Player:'), 0, 2)
+        layout.addWidget(self.compare_player_dropdown, 0, 3)
+        layout.addWidget(add_button, 0, 4)
+        layout.addWidget(QLabel('Search:'), 1, 0)
+        layout.addWidget(self.create_player_search(self.compare_player_dropdown, self.compare_team_dropdown), 1, 1, 1, 3)
+        layout.addWidget(QLabel(f'Players (up to {MAX_COMPARE_PLAYERS}):'), 2, 0)
+        layout.addWidget(self.compare_list, 2, 1, 2, 3)
+        layout.addWidget(remove_button, 2, 4)
+        layout.addWidget(clear_button, 3, 4)
+        layout.addWidget(QLabel('Start Season:'), 4, 0)
+        layout.addWidget(self.compare_start_dropdown, 4, 1)
+        layout.addWidget(QLabel('End Season:'), 4, 2)
+        layout.addWidget(self.compare_end_dropdown, 4, 3)
+        layout.addWidget(self.compare_view_dropdown, 4, 4)
+        layout.addWidget(self.compare_status, 5, 0, 1, 5)
+        layout.addWidget(self.compare_stack, 6, 0, 1, 5)
+        layout.addWidget(self.compare_table, 7, 0, 1, 5)
+        layout.setRowStretch(6, 4)
+        layout.setRowStretch(7, 1)
+
+        self.compare_names = []
+        self.add_compare_player()
+        tab.setLayout(layout)
+        return tab
 
-        self.player2_dropdown = QComboBox()
-        self.update_player2_dropdown('All Teams')
-        self.player2_dropdown.currentTextChanged.connect(self.update_bar_graph)
+    def season_choices(self) -> list:
+        cube = self.store.cube
+        return [str(season) for season in range(cube.first_season, cube.last_season + 1)]
 
-        # Initialize Matplotlib figure and canvas
-        self.figure = Figure()
-        self.canvas = FigureCanvas(self.figure)
-        self.canvas.setParent(tab)  # Explicitly set the parent to ensure proper embedding
+    def create_similar_tab(self) -> QWidget:
+        tab = QWidget()
+        layout = QGridLayout()
+
+        self.similar_team_dropdown = self.create_team_dropdown(self.update_similar_player_dropdown)
+        self.similar_team_dropdown.setSizePolicy(QSizePolicy.Minimum, QSizePolicy.Fixed)
 
-        # Add widgets to the layout
-        layout.addWidget(QLabel('Team 1:'))
-        layout.addWidget(self.team1_dropdown)
-        layout.addWidget(QLabel('Player 1:'))
-        layout.addWidget(self.player1_dropdown)
+        self.similar_player_dropdown = self.create_player_dropdown()
+        self.similar_player_dropdown.setSizePolicy(QSizePolicy.Minimum, QSizePolicy.Fixed)
+        self.similar_player_dropdown.currentTextChanged.connect(self.update_similar_seasons)
 
-        layout.addWidget(QLabel('Team 2:'))
-        layout.addWidget(self.team2_dropdown)
-        layout.addWidget(QLabel('Player 2:'))
-        layout.addWidget(self.player2_dropdown)
+        # The profile to match is the player's aggregate over these seasons
+        self.similar_start_dropdown = QComboBox()
+        self.similar_start_dropdown.setSizePolicy(QSizePolicy.Minimum, QSizePolicy.Fixed)
+        self.similar_end_dropdown = QComboBox()
+        self.similar_end_dropdown.setSizePolicy(QSizePolicy.Minimum, QSizePolicy.Fixed)
+        self.similar_start_dropdown.currentTextChanged.connect(self.schedule_similar_table)
+        self.similar_end_dropdown.currentTextChanged.connect(self.schedule_similar_table)
 
-        # Add Matplotlib canvas
-        layout.addWidget(self.canvas)
+        self.similar_model = ArrayTableModel()
+        self.similar_table = self.create_table_view(self.similar_model)
 
+        layout.addWidget(QLabel('Select Team:'), 0, 0)
+        layout.addWidget(self.similar_team_dropdown, 0, 1)
+        layout.addWidget(QLabel('Select Player:'), 0, 2)
+        layout.addWidget(self.similar_player_dropdown, 0, 3)
+        layout.addWidget(QLabel('Start Season:'), 1, 0)
+        layout.addWidget(self.similar_start_dropdown, 1, 1)
+        layout.addWidget(QLabel('End Season:'), 1, 2)
+        layout.addWidget(self.similar_end_dropdown, 1, 3)
+        layout.addWidget(QLabel('Search:'), 2, 0)
+        layout.addWidget(self.create_player_search(self.similar_player_dropdown, self.similar_team_dropdown), 2, 1, 1, 3)
+        layout.addWidget(self.similar_table, 3, 0, 1, 4)
+
+        self.update_similar_seasons()
         tab.setLayout(layout)
         return tab
-    
-    def update_player1_dropdown(self, team_name: str) -> None:
-        '''
-        
-        Updates the dropdown menu for Player 1 based on the selected team
-        
+
+    def update_similar_player_dropdown(self, team_name: str) -> None:
+        self.show_team(self.similar_player_dropdown, team_name)
+
+    def update_similar_seasons(self) -> None:
         '''
-        if team_name == 'All Teams':
-            filtered_data = self.data
-        else:
-            team_abbr = {v: k for k, v in TEAM_NAME_MAPPING.items()}.get(team_name, team_name)
-            filtered_data = self.data[self.data['Team'] == team_abbr]
-        self.player1_dropdown.clear()
-        self.player1_dropdown.addItems(filtered_data['Name'].unique())
 
-    def update_player2_dropdown(self, team_name: str) -> None:
+        Offers the selected player's seasons as the profile range, defaulting to their whole career
+
         '''
-        
-        Updates the dropdown menu for Player 2 based on the selected team
+        player_name = self.similar_player_dropdown.currentText()
+        active_seasons = [str(season) for season in query.player_seasons(self.store, player_name)] if player_name else []
+        with self.scheduler.blocked(self.similar_start_dropdown, self.similar_end_dropdown):
+            self.similar_start_dropdown.clear()
+            self.similar_end_dropdown.clear()
+            self.similar_start_dropdown.addItems(active_seasons)
+            self.similar_end_dropdown.addItems(active_seasons)
+            self.similar_end_dropdown.setCurrentIndex(len(active_seasons) - 1)
+        self.schedule_similar_table()
+
+    def update_similar_table(self) -> None:
+        player_name = self.similar_player_dropdown.currentText()
+        start_season = self.similar_start_dropdown.currentText()
+        end_season = self.similar_end_dropdown.currentText()
+        if not player_name or not start_season or not end_season:
+            self.workers.cancel('similar_table')
+            self.similar_model.clear()
+            return
+
+        self.workers.submit(
+            'similar_table', query.similar_players, self.store, player_name, int(start_season), int(end_season), SIMILAR_PLAYER_COUNT,
+            on_result = self.show_similar_table
+        )
+
+    def show_similar_table(self, neighbors: pd.DataFrame) -> None:
+        if neighbors is None or neighbors.empty:
+            self.similar_model.set_columns(['No Data Available'], [np.empty(0)])
+            return
+
+        stats = list(neighbors.columns[4:])
+        self.similar_model.set_columns(
+            ['Player', 'Season', 'Team', 'Distance'] + stats,
+            [neighbors['Name'].to_numpy(dtype = object), neighbors['Season Year'].to_numpy(), neighbors['Team'].to_numpy(dtype = object),
+             neighbors['Distance'].to_numpy(dtype = float)] + [neighbors[stat].to_numpy(dtype = float) for stat in stats]
+        )
+
+    def create_trends_tab(self) -> QWidget:
+        tab = QWidget()
+        layout = QGridLayout()
+
+        self.trends_team_dropdown = self.create_team_dropdown(self.update_trends_player_dropdown)
+        self.trends_team_dropdown.setSizePolicy(QSizePolicy.Minimum, QSizePolicy.Fixed)
+        self.trends_player_dropdown = self.create_player_dropdown()
+        self.trends_player_dropdown.setSizePolicy(QSizePolicy.Minimum, QSizePolicy.Fixed)
+        self.trends_player_dropdown.currentTextChanged.connect(self.schedule_trends)
+
+        self.trends_stat_dropdown = QComboBox()
+        self.trends_stat_dropdown.addItems([STAT_MAPPING[stat] for stat in self.store.cube.stats])
+        self.trends_stat_dropdown.setCurrentText(STAT_MAPPING[DEFAULT_TREND_STAT])
+        self.trends_stat_dropdown.currentTextChanged.connect(self.schedule_trends)
+        self.trends_window_dropdown = QComboBox()
+        self.trends_window_dropdown.addItems([str(window) for window in TREND_WINDOWS])
+        self.trends_window_dropdown.setCurrentText(str(DEFAULT_WINDOW))
+        self.trends_window_dropdown.currentTextChanged.connect(self.schedule_trends)
+
+        from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as FigureCanvas
+        from matplotlib.figure import Figure
+        from src.statswing_charts import TrendChart
+        figure = Figure(figsize = (12, 5))
+        self.trends_canvas = FigureCanvas(figure)
+        self.trend_chart = TrendChart(figure)
+
+        self.trends_model = ArrayTableModel()
+        self.trends_table = self.create_table_view(self.trends_model)
+
+        layout.addWidget(QLabel('Select Team:'), 0, 0)
+        layout.addWidget(self.trends_team_dropdown, 0, 1)
+        layout.addWidget(QLabel('Select Player:'), 0, 2)
+        layout.addWidget(self.trends_player_dropdown, 0, 3)
+        layout.addWidget(QLabel('Statistic:'), 1, 0)
+        layout.addWidget(self.trends_stat_dropdown, 1, 1)
+        layout.addWidget(QLabel('Rolling Seasons:'), 1, 2)
+        layout.addWidget(self.trends_window_dropdown, 1, 3)
+        layout.addWidget(QLabel('Search:'), 2, 0)
+        layout.addWidget(self.create_player_search(self.trends_player_dropdown, self.trends_team_dropdown), 2, 1, 1, 3)
+        layout.addWidget(self.trends_canvas, 3, 0, 1, 4)
+        layout.addWidget(self.trends_table, 4, 0, 1, 4)
+        layout.setRowStretch(3, 3)
+        layout.setRowStretch(4, 2)
+
+        self.schedule_trends()
+        tab.setLayout(layout)
+        return tab
+
+    def update_trends_player_dropdown(self, team_name: str) -> None:
+        self.show_team(self.trends_player_dropdown, team_name)
 
+    def update_trends(self) -> None:
         '''
-        if team_name == 'All Teams':
-            filtered_data = self.data
-        else:
-            team_abbr = {v: k for k, v in TEAM_NAME_MAPPING.items()}.get(team_name, team_name)
-            filtered_data = self.data[self.data['Team'] == team_abbr]
-        self.player2_dropdown.clear()
-        self.player2_dropdown.addItems(filtered_data['Name'].unique())
 
-    def update_comparison_table(self) -> None:
+        Shows the selected player's season-by-season trend in the selected stat against the league
+
         '''
-        
-        Updates the displayed information in the comparison table based on the selected players
+        player_name = self.trends_player_dropdown.currentText()
+        stat_name = self.trends_stat_dropdown.currentText()
+        window = int(self.trends_window_dropdown.currentText())
+        if not player_name:
+            self.workers.cancel('trends')
+            self.trends_model.clear()
+            return
+
+        def fetch():
+            return query.player_trend(self.store, player_name, stat_name, window), query.aging_curve(self.store, stat_name)
+        self.workers.submit(
+            'trends', fetch,
+            on_result = lambda result: self.show_trends(player_name, stat_name, window, *result)
+        )
+
+    def show_trends(self, player_name: str, stat_name: str, window: int, trend: pd.DataFrame, curve: pd.DataFrame) -> None:
+        if trend is None:
+            self.trends_model.set_columns(['No Data Available'], [np.empty(0)])
+            return
 
+        self.trend_chart.set_data(player_name, stat_name, trend, curve, window)
+        self.trends_canvas.draw_idle()
+        self.trends_model.set_columns(
+            ['Season', 'Season Index', stat_name, 'Change', f'{window}-Season', 'League Average', '% of League'],
+            [trend['Season'].to_numpy(), trend['Season Index'].to_numpy()] +
+            [trend[col].to_numpy(dtype = float) for col in ('Value', 'Delta', 'Rolling', 'League', 'Relative')]
+        )
+
+    def update_compare_player_dropdown(self, team_name: str) -> None:
+        self.show_team(self.compare_player_dropdown, team_name)
+
+    def set_compare_players(self, names: list) -> None:
         '''
-        player1 = self.player1_dropdown.currentText()
-        player2 = self.player2_dropdown.currentText()
 
-        player1_data = self.data[self.data['Name'] == player1]
-        player2_data = self.data[self.data['Name'] == player2]
-        
-        self.display_comparison(player1_data, player2_data)
+        Replaces the players in the Compare Players tab (duplicates and players past
+        MAX_COMPARE_PLAYERS are dropped)
 
-    def display_comparison(self, player1_data: pd.DataFrame, player2_data: pd.DataFrame) -> None:
         '''
-        
-        Helper function for above
-        
+        names = [name for name in dict.fromkeys(names) if name][:MAX_COMPARE_PLAYERS]
+        if names == self.compare_names:
+            return
+        self.compare_names = names
+        self.compare_list.clear()
+        for i, name in enumerate(names):
+            # Each player's swatch is their bar color
+            swatch = QPixmap(12, 12)
+            swatch.fill(QColor(self.compare_chart.color(i)))
+            self.compare_list.addItem(QListWidgetItem(QIcon(swatch), name))
+        self.schedule_bar_graph()
+
+    def add_compare_player(self, name: str = None) -> None:
+        '''
+
+        Adds a player (the one selected in the dropdown by default) to the comparison
+
         '''
-        if player1_data.empty or player2_data.empty:
-            self.comparison_table.clear()
-            self.comparison_table.setRowCount(0)
-            self.comparison_table.setColumnCount(0)
-            self.comparison_table.setHorizontalHeaderLabels([])
+        name = name or self.compare_player_dropdown.currentText()
+        if len(self.compare_names) >= MAX_COMPARE_PLAYERS and name not in self.compare_names:
+            self.compare_status.setText(f'At most {MAX_COMPARE_PLAYERS} players can be compared; remove one first.')
             return
-        
-        stats_columns = ['G', 'PA', 'HR', 'R'] #Need to fill this in with names for stats in data
-        player1_stats = player1_data.iloc[0][stats_columns]
-        player2_stats = player2_data.iloc[0][stats_columns]
-
-        self.comparison_table.clear()
-        self.comparison_table.setRowCount(len(stats_columns))
-        self.comparison_table.setColumnCount(3) #3 cols for stat name, player 1, and player 2
-        self.comparison_table.setHorizontalHeaderLabels(['Statistic', 'Player 1', 'Player 2'])
-
-        for row, stat in enumerate(stats_columns):
-            self.comparison_table.setItem(row, 0, QTableWidgetItem(stat)) #Statistic name
-            self.comparison_table.setItem(row, 1, QTableWidgetItem(str(player1_stats[stat])))
-            self.comparison_table.setItem(row, 2, QTableWidgetItem(str(player2_stats[stat])))
-        
-        self.comparison_table.resizeColumnsToContents()
-        self.comparison_table.resizeRowsToContents()
+        self.set_compare_players(self.compare_names + [name])
+
+    def remove_compare_players(self, names: list) -> None:
+        self.set_compare_players([name for name in self.compare_names if name not in set(names)])
+
+    def compare_season_range(self) -> tuple:
+        seasons = [int(text) for text in (self.compare_start_dropdown.currentText(), self.compare_end_dropdown.currentText()) if text]
+        return (min(seasons), max(seasons)) if len(seasons) == 2 else (None, None)
+
+    def compare_view(self, view: str) -> tuple:
+        '''
+
+        Returns the chart and canvas for a Compare Players view, building the heatmap on first use
 
+        '''
+        if view != 'Heatmap':
+            return self.compare_chart, self.canvas
+        if self.compare_heatmap is None:
+            from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as FigureCanvas
+            from matplotlib.figure import Figure
+            from src.statswing_charts import CompareHeatmap
+            self.heatmap_figure = Figure(figsize = (12, 10))
+            self.heatmap_canvas = FigureCanvas(self.heatmap_figure)
+            # The player names are painted by Qt beside the canvas rather than by matplotlib
+            self.compare_heatmap = CompareHeatmap(self.heatmap_figure, COMPARE_HEATMAP_STATS, names = False)
+            self.heatmap_page = QWidget()
+            page_layout = QHBoxLayout(self.heatmap_page)
+            page_layout.setContentsMargins(0, 0, 0, 0)
+            page_layout.setSpacing(0)
+            page_layout.addWidget(HeatmapNames(self.compare_heatmap, self.heatmap_canvas))
+            page_layout.addWidget(self.heatmap_canvas)
+            self.compare_stack.addWidget(self.heatmap_page)
+        return self.compare_heatmap, self.heatmap_canvas
 
     def update_bar_graph(self) -> None:
         '''
-        
-        Updates the various visualizations present in the compare tab based on selected values
-        
-        
+
+        Updates the compare tab chart and table for the selected players, season range and view
+
+        '''
+        names = tuple(self.compare_names)
+        start_season, end_season = self.compare_season_range()
+        view = self.compare_view_dropdown.currentText()
+        chart, canvas = self.compare_view(view)
+        self.compare_stack.setCurrentWidget(self.heatmap_page if view == 'Heatmap' else canvas)
+        if not names or start_season is None:
+            self.workers.cancel('bar_graph')
+            self.draw_bar_graph(names, start_season, end_season, view, pd.DataFrame(columns = self.store.cube.stats, dtype = float))
+            return
+
+        # Recently shown selections are restored from their rendered image without drawing anything
+        cached = self.compare_render_cache.get((names, start_season, end_season, view, canvas.get_width_height()))
+        if cached is not None:
+            self.workers.cancel('bar_graph')
+            stats, image = cached
+            chart.set_data(tuple(stats.index), stats)
+            chart.restore(canvas, image)
+            self.show_compare_table(names, start_season, end_season, stats)
+            return
+
+        # Every player is aggregated in one pass on a worker; drawing happens on the GUI thread
+        self.workers.submit(
+            'bar_graph', query.compare_players, self.store, list(names), start_season, end_season,
+            on_result = lambda stats: self.draw_bar_graph(names, start_season, end_season, view, stats)
+        )
+
+    def draw_bar_graph(self, names: tuple, start_season: int, end_season: int, view: str, stats: pd.DataFrame) -> None:
+        '''
+
+        Redraws the compare tab chart from already-aggregated player stats
+
         '''
         try:
-            # Get selected players
-            player1_name = self.player1_dropdown.currentText()
-            player2_name = self.player2_dropdown.currentText()
-
-            # Fetch player data
-            player1_data = self.data[self.data["Name"] == player1_name]
-            player2_data = self.data[self.data["Name"] == player2_name]
-
-            if player1_data.empty or player2_data.empty:
-                print(f"Error: Data missing for {player1_name} or {player2_name}.")
-                return
-
-            # Stat groups
-            power_stats = ["HR", "R", "RBI", "SB"]
-            high_range_stats = ["PA"]
-            advanced_stats = ["WAR", "Def"]
-            percentage_stats = ["BB%", "K%"]
-
-            # Extract data for each group
-            player1_power = player1_data[power_stats].iloc[0].fillna(0).astype(float)
-            player2_power = player2_data[power_stats].iloc[0].fillna(0).astype(float)
-
-            player1_high_range = player1_data[high_range_stats].iloc[0].fillna(0).astype(float)
-            player2_high_range = player2_data[high_range_stats].iloc[0].fillna(0).astype(float)
-
-            player1_advanced = player1_data[advanced_stats].iloc[0].fillna(0).astype(float)
-            player2_advanced = player2_data[advanced_stats].iloc[0].fillna(0).astype(float)
-
-            player1_percentage = player1_data[percentage_stats].iloc[0].fillna(0).astype(float)
-            player2_percentage = player2_data[percentage_stats].iloc[0].fillna(0).astype(float)
-
-            # Clear the figure
-            self.figure.clear()
-
-            # Set figure size
-            self.figure.set_size_inches(12, 10)
-
-            # Create subplots
-            axes = self.figure.subplots(2, 2)
-
-            # Plot power stats
-            x = range(len(power_stats))
-            axes[0, 0].bar(x, player1_power, width=0.4, label=player1_name, color='blue')
-            axes[0, 0].bar([i + 0.4 for i in x], player2_power, width=0.4, label=player2_name, color='orange')
-            axes[0, 0].set_title("Power Stats")
-            axes[0, 0].set_xticks([i + 0.2 for i in x])
-            axes[0, 0].set_xticklabels(power_stats, rotation=30, ha='right')
-
-            # Plot high-range stats
-            x = range(len(high_range_stats))
-            axes[0, 1].bar(x, player1_high_range, width=0.4, label=player1_name, color='blue')
-            axes[0, 1].bar([i + 0.4 for i in x], player2_high_range, width=0.4, label=player2_name, color='orange')
-            axes[0, 1].set_title("High-Range Stats")
-            axes[0, 1].set_xticks([i + 0.2 for i in x])
-            axes[0, 1].set_xticklabels(high_range_stats, rotation=30, ha='right')
-
-            # Plot advanced stats
-            x = range(len(advanced_stats))
-            axes[1, 0].bar(x, player1_advanced, width=0.4, label=player1_name, color='blue')
-            axes[1, 0].bar([i + 0.4 for i in x], player2_advanced, width=0.4, label=player2_name, color='orange')
-            axes[1, 0].set_title("Advanced Stats")
-            axes[1, 0].set_xticks([i + 0.2 for i in x])
-            axes[1, 0].set_xticklabels(advanced_stats, rotation=30, ha='right')
-
-            # Plot percentage stats
-            x = range(len(percentage_stats))
-            axes[1, 1].bar(x, player1_percentage, width=0.4, label=player1_name, color='blue')
-            axes[1, 1].bar([i + 0.4 for i in x], player2_percentage, width=0.4, label=player2_name, color='orange')
-            axes[1, 1].set_title("Percentage Stats")
-            axes[1, 1].set_xticks([i + 0.2 for i in x])
-            axes[1, 1].set_xticklabels(percentage_stats, rotation=30, ha='right')
-
-            # Add a single legend for the entire figure
-            handles, labels = axes[0, 0].get_legend_handles_labels()
-            self.figure.legend(handles, labels, loc='upper right', fontsize=10)
-
-            # Adjust layout
-            self.figure.subplots_adjust(hspace=0.5, wspace=0.4)
-
-            # Refresh canvas
-            self.canvas.draw()
+            # Move the existing artists and repaint only what changed
+            chart, canvas = self.compare_view(view)
+            chart.set_data(tuple(stats.index), stats)
+            chart.draw(canvas)
+            self.show_compare_table(names, start_season, end_season, stats)
+
+            if names:
+                key = (names, start_season, end_season, view, canvas.get_width_height())
+                self.compare_render_cache.put(key, (stats, chart.snapshot(canvas)))
 
         except Exception as e:
-            print(f"Error in update_bar_graph: {e}")
+            print(f"Error in draw_bar_graph: {e}")
+
+    def show_compare_table(self, names: tuple, start_season: int, end_season: int, stats: pd.DataFrame) -> None:
+        missing = [name for name in names if name not in stats.index]
+        status = f'{len(stats)} players, {start_season}-{end_season}' if names else 'Add players to compare them.'
+        if missing:
+            status += f" (no seasons in range: {', '.join(missing)})"
+        self.compare_status.setText(status)
+        self.compare_model.set_columns(
+            ['Name'] + COMPARE_HEATMAP_STATS,
+            [stats.index.to_numpy(dtype = object)] + [stats[stat].to_numpy(dtype = float) for stat in COMPARE_HEATMAP_STATS]
+        )
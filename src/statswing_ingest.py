@@ -0,0 +1,270 @@
+import argparse
+import os
+import time
+import numpy as np
+import pandas as pd
+from src.config import PA_SCHEMA, PA_EVENT_OUTCOMES, STAT_MAPPING
+from src.statswing_store import PlayerStore
+from src.statswing_utils import apply_schema, build_average_rows
+
+DEFAULT_CHUNKSIZE = 250_000
+# Written next to the bundled FanGraphs table rather than over it: an ingested table has no wRC+,
+# BsR, Off, Def or WAR
+DEFAULT_OUTPUT = 'data/ingested_player_data.csv'
+REQUIRED_PA_COLUMNS = ['game_pk', 'game_year', 'batter_name', 'events']
+OUTCOMES = ['single', 'double', 'triple', 'home_run', 'walk', 'hit_by_pitch', 'strikeout', 'sac_fly', 'sac_bunt', 'interference']
+COUNT_COLUMNS = ['PA'] + OUTCOMES + ['RBI', 'R', 'SB', 'woba_num', 'woba_den', 'xwoba_num', 'xwoba_den']
+
+# Column order of the season-level table the GUI reads
+SEASON_COLUMNS = ['Name', 'Team'] + [col for col in STAT_MAPPING if col != 'TotalStat'] + ['Season Year']
+
+class _CodeRegistry:
+    '''
+
+    Assigns stable integer ids to strings across chunks (each chunk has its own categories)
+
+    '''
+    def __init__(self):
+        self.values = []
+        self.ids = {}
+
+    def codes_for(self, column: pd.Series) -> np.ndarray:
+        categorical = column.astype('category')
+        lookup = np.empty(len(categorical.cat.categories) + 1, dtype = np.int32)
+        for i, value in enumerate(categorical.cat.categories):
+            code = self.ids.get(value)
+            if code is None:
+                code = self.ids[value] = len(self.values)
+                self.values.append(value)
+            lookup[i] = code
+        # Missing values have code -1, which picks the trailing -1 slot
+        lookup[-1] = -1
+        return lookup[categorical.cat.codes.to_numpy()]
+
+class SeasonAggregator:
+    '''
+
+    Folds plate-appearance chunks into running per-(batter, season) totals
+
+    Memory is bounded by the chunk size plus one row of totals per batter-season, not by the
+    size of the input. Games are counted assuming each file is ordered by game, as play-by-play
+    exports are
+
+    '''
+    def __init__(self):
+        self.players = _CodeRegistry()
+        self.teams = _CodeRegistry()
+        self.totals = None
+        self.games = None
+        self._last_game = None
+        self.player_teams = {}
+        self.rows = 0
+
+    def add_chunk(self, chunk: pd.DataFrame) -> None:
+        # Pitch-level files carry an event only on the last pitch of each plate appearance
+        chunk = chunk[chunk['events'].notna() & chunk['batter_name'].notna()]
+        self.rows += len(chunk)
+        if chunk.empty:
+            return
+
+        player = self.players.codes_for(chunk['batter_name'])
+        season = chunk['game_year'].to_numpy(dtype = np.int16)
+        outcome = chunk['events'].map(PA_EVENT_OUTCOMES).astype(object).fillna('out').to_numpy()
+
+        counts = {'player': player, 'season': season, 'PA': np.ones(len(chunk), dtype = np.int32)}
+        for name in OUTCOMES:
+            counts[name] = (outcome == name).astype(np.int32)
+        for name, source in (('RBI', 'rbi'), ('R', 'runs_scored'), ('SB', 'stolen_bases')):
+            counts[name] = chunk[source].fillna(0).to_numpy(dtype = np.int32) if source in chunk else np.zeros(len(chunk), dtype = np.int32)
+
+        woba_value = chunk['woba_value'].to_numpy(dtype = np.float64) if 'woba_value' in chunk else np.full(len(chunk), np.nan)
+        woba_denom = chunk['woba_denom'].to_numpy(dtype = np.float64) if 'woba_denom' in chunk else np.full(len(chunk), np.nan)
+        expected = chunk['estimated_woba_using_speedangle'].to_numpy(dtype = np.float64) if 'estimated_woba_using_speedangle' in chunk else np.full(len(chunk), np.nan)
+        # Expected wOBA only exists for batted balls; other plate appearances keep their actual value
+        expected = np.where(np.isnan(expected), woba_value, expected)
+        counts['woba_num'] = np.nan_to_num(woba_value)
+        counts['woba_den'] = np.where(np.isnan(woba_value), 0.0, np.nan_to_num(woba_denom))
+        counts['xwoba_num'] = np.nan_to_num(expected)
+        counts['xwoba_den'] = np.where(np.isnan(expected), 0.0, np.nan_to_num(woba_denom))
+
+        part = pd.DataFrame(counts).groupby(['player', 'season'], sort = False).sum()
+        self.totals = part if self.totals is None else self.totals.add(part, fill_value = 0)
+
+        self._add_games(player, season, chunk['game_pk'].to_numpy())
+        if 'team' in chunk:
+            self._add_teams(player, season, self.teams.codes_for(chunk['team']))
+
+    def _add_games(self, player: np.ndarray, season: np.ndarray, game: np.ndarray) -> None:
+        '''
+
+        Counts distinct games per batter-season, merging a game split across two chunks
+
+        '''
+        games = pd.DataFrame({'player': player, 'season': season, 'game': game}).drop_duplicates()
+        grouped = games.groupby(['player', 'season'], sort = False)['game']
+        count = grouped.size()
+        last = grouped.last()
+        if self._last_game is not None:
+            first = grouped.first()
+            count = count - first.eq(self._last_game.reindex(first.index)).astype(np.int64)
+            last = last.combine_first(self._last_game)
+        self.games = count if self.games is None else self.games.add(count, fill_value = 0)
+        self._last_game = last
+
+    def _add_teams(self, player: np.ndarray, season: np.ndarray, team: np.ndarray) -> None:
+        triples = np.unique(np.stack([player, season.astype(np.int32), team], axis = 1), axis = 0)
+        for p, s, t in triples:
+            if t >= 0:
+                self.player_teams.setdefault((int(p), int(s)), set()).add(int(t))
+
+    def _team_label(self, team_ids: set) -> str:
+        '''
+
+        Labels a set of teams the way FanGraphs does ('NYY', or '2 Tms' for more than one)
+
+        '''
+        if not team_ids:
+            return ''
+        if len(team_ids) == 1:
+            return self.teams.values[next(iter(team_ids))]
+        return f'{len(team_ids)} Tms'
+
+    def season_table(self) -> pd.DataFrame:
+        '''
+
+        Builds season rows, career rows (Season Year 0) and the league average rows
+
+        '''
+        if self.totals is None:
+            return pd.DataFrame(columns = SEASON_COLUMNS)
+
+        totals = self.totals.copy()
+        totals['G'] = self.games.reindex(totals.index).fillna(0)
+        keys = totals.index.to_frame(index = False)
+
+        season_rows = derive_stats(totals.reset_index(drop = True))
+        season_rows['Name'] = [self.players.values[p] for p in keys['player']]
+        season_rows['Team'] = [self._team_label(self.player_teams.get((int(p), int(s)), set())) for p, s in zip(keys['player'], keys['season'])]
+        season_rows['Season Year'] = keys['season'].to_numpy(dtype = np.int64)
+
+        career_totals = totals.groupby(level = 'player').sum()
+        career_rows = derive_stats(career_totals.reset_index(drop = True))
+        career_rows['Name'] = [self.players.values[p] for p in career_totals.index]
+        career_teams = {}
+        for (p, s), teams in self.player_teams.items():
+            career_teams.setdefault(p, set()).update(teams)
+        career_rows['Team'] = [self._team_label(career_teams.get(int(p), set())) for p in career_totals.index]
+        career_rows['Season Year'] = 0
+
+        data = pd.concat([season_rows, career_rows], ignore_index = True)[SEASON_COLUMNS]
+        return pd.concat([data, build_average_rows(data)], ignore_index = True)
+
+def derive_stats(totals: pd.DataFrame) -> pd.DataFrame:
+    '''
+
+    Computes the season-table stats from summed plate-appearance counts
+
+    wRC+, BsR, Off, Def and WAR need league and park context that play-by-play rows don't carry,
+    so they're left empty
+
+    '''
+    # The arithmetic runs on plain arrays; with only a handful of rows (a single split) pandas'
+    # per-operation overhead would dominate
+    t = {col: totals[col].to_numpy(dtype = np.float64) for col in ['PA'] + OUTCOMES + ['woba_num', 'woba_den', 'xwoba_num', 'xwoba_den']}
+    hits = t['single'] + t['double'] + t['triple'] + t['home_run']
+    total_bases = t['single'] + 2 * t['double'] + 3 * t['triple'] + 4 * t['home_run']
+    at_bats = t['PA'] - t['walk'] - t['hit_by_pitch'] - t['sac_fly'] - t['sac_bunt'] - t['interference']
+    on_base_denom = at_bats + t['walk'] + t['hit_by_pitch'] + t['sac_fly']
+    balls_in_play = at_bats - t['strikeout'] - t['home_run'] + t['sac_fly']
+
+    def ratio(num, den):
+        with np.errstate(invalid = 'ignore', divide = 'ignore'):
+            return np.where(den > 0, num / den, np.nan)
+
+    average, slugging = ratio(hits, at_bats), ratio(total_bases, at_bats)
+    return pd.DataFrame({
+        'G': totals['G'],
+        'PA': totals['PA'],
+        'HR': totals['home_run'],
+        'R': totals['R'],
+        'RBI': totals['RBI'],
+        'SB': totals['SB'],
+        'BB%': ratio(t['walk'], t['PA']) * 100,
+        'K%': ratio(t['strikeout'], t['PA']) * 100,
+        'BABIP': ratio(hits - t['home_run'], balls_in_play),
+        'AVG': average,
+        'OBP': ratio(hits + t['walk'] + t['hit_by_pitch'], on_base_denom),
+        'SLG': slugging,
+        'wOBA': ratio(t['woba_num'], t['woba_den']),
+        'xwOBA': ratio(t['xwoba_num'], t['xwoba_den']),
+        'ISO': slugging - average,
+        **{col: np.nan for col in ['wRC+', 'BsR', 'Off', 'Def', 'WAR']}
+    }, index = totals.index)
+
+def ingest_play_by_play(file_paths: list, chunksize: int = DEFAULT_CHUNKSIZE, verbose: bool = True) -> tuple:
+    '''
+
+    Streams play-by-play CSV files in chunks and aggregates them into the season-level table
+
+    Returns (table, report) where report holds the row count, elapsed time and rows per second
+
+    '''
+    aggregator = SeasonAggregator()
+    rows_read = 0
+    chunks = 0
+    start = time.perf_counter()
+
+    for file_path in file_paths:
+        header = pd.read_csv(file_path, nrows = 0).columns
+        missing = [col for col in REQUIRED_PA_COLUMNS if col not in header]
+        if missing:
+            print(f'Error: {file_path} is missing required columns {missing}, skipping it.')
+            continue
+        usecols = [col for col in PA_SCHEMA if col in header]
+        dtype = {col: PA_SCHEMA[col] for col in usecols}
+        # Small ints can't hold NaN; let pandas pick a float for those and cast after filling
+        dtype.update({col: 'float32' for col in ('rbi', 'runs_scored', 'stolen_bases') if col in dtype})
+
+        for chunk in pd.read_csv(file_path, usecols = usecols, dtype = dtype, chunksize = chunksize):
+            aggregator.add_chunk(chunk)
+            rows_read += len(chunk)
+            chunks += 1
+            if verbose:
+                elapsed = time.perf_counter() - start
+                print(f'{file_path}: {rows_read:,} rows ({rows_read / elapsed:,.0f} rows/s)')
+
+    table = aggregator.season_table()
+    elapsed = time.perf_counter() - start
+    report = {
+        'files': len(file_paths),
+        'chunks': chunks,
+        'rows': rows_read,
+        'plate_appearances': aggregator.rows,
+        'seconds': elapsed,
+        'rows_per_second': rows_read / elapsed if elapsed > 0 else float('inf')
+    }
+    if verbose:
+        print(f"Ingested {report['rows']:,} rows in {elapsed:.2f}s ({report['rows_per_second']:,.0f} rows/s)")
+    return table, report
+
+def load_play_by_play(file_paths: list, chunksize: int = DEFAULT_CHUNKSIZE) -> PlayerStore:
+    '''
+
+    Ingests play-by-play files and indexes the resulting season table for the GUI
+
+    '''
+    table, _ = ingest_play_by_play(file_paths, chunksize = chunksize)
+    return PlayerStore(apply_schema(table))
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description = 'Aggregate play-by-play CSV files into a StatSwing season table')
+    parser.add_argument('files', nargs = '+', help = 'play-by-play CSV files')
+    parser.add_argument('-o', '--output', default = DEFAULT_OUTPUT, help = 'season table to write')
+    parser.add_argument('--force', action = 'store_true', help = 'overwrite the output file if it exists')
+    parser.add_argument('--chunksize', type = int, default = DEFAULT_CHUNKSIZE, help = 'rows read per chunk')
+    args = parser.parse_args()
+    if os.path.exists(args.output) and not args.force:
+        parser.error(f'{args.output} already exists; pass --force to overwrite it')
+
+    table, _ = ingest_play_by_play(args.files, chunksize = args.chunksize)
+    table.to_csv(args.output, index = False)
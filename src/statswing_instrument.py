@@ -0,0 +1,260 @@
+import atexit
+import cProfile
+import functools
+import importlib
+import inspect
+import io
+import json
+import math
+import os
+import pstats
+import threading
+import time
+from contextlib import contextmanager
+
+# Setting STATSWING_PROFILE turns instrumentation on: '1' writes statswing_profile.json, any
+# other value is the JSON path. STATSWING_PROFILE_OP names one operation to run under cProfile
+ENV_VAR = 'STATSWING_PROFILE'
+ENV_OPERATION = 'STATSWING_PROFILE_OP'
+DEFAULT_OUTPUT = 'statswing_profile.json'
+DUMP_SHORTCUT = 'Ctrl+Shift+P'
+
+# Histogram buckets grow by 2^(1/8) (about 9%) from 1 microsecond, so percentiles are accurate to
+# within one bucket while memory stays fixed however many calls are recorded
+BUCKET_BASE = 1e-6
+BUCKETS_PER_DOUBLING = 8
+
+# What gets wrapped: module-level functions of the data layer, and methods of the GUI classes
+# (every public StatSwingApp method is a slot or a helper a slot calls)
+DATA_LAYER = {
+    'src.statswing_query': None,
+    'src.statswing_utils': ['load_data', 'read_player_csv', 'aggregate_seasons', 'aggregate_player', 'upsert_rows']
+}
+GUI_CLASSES = {
+    'src.statswing_gui.StatSwingApp': None,
+    'src.statswing_models.ArrayTableModel': ['set_columns', 'sort'],
+    'src.statswing_charts.CompareChart': ['set_data', 'draw', 'restore'],
+    'src.statswing_charts.LeagueComparisonChart': ['set_data']
+}
+
+class LatencyHistogram:
+    '''
+
+    Call count, total and log-bucketed latency distribution for one operation
+
+    '''
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.buckets = {}
+
+    def record(self, seconds: float) -> None:
+        self.count += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+        bucket = max(0, int(math.log2(max(seconds, BUCKET_BASE) / BUCKET_BASE) * BUCKETS_PER_DOUBLING))
+        self.buckets[bucket] = self.buckets.get(bucket, 0) + 1
+
+    def percentile(self, q: float) -> float:
+        '''
+
+        Returns the upper edge (in seconds) of the bucket holding the q-th percentile call
+
+        '''
+        if not self.count:
+            return 0.0
+        rank = q / 100 * self.count
+        seen = 0
+        for bucket in sorted(self.buckets):
+            seen += self.buckets[bucket]
+            if seen >= rank:
+                return min(BUCKET_BASE * 2 ** ((bucket + 1) / BUCKETS_PER_DOUBLING), self.max)
+        return self.max
+
+    def summary(self) -> dict:
+        return {
+            'count': self.count,
+            'total_ms': self.total * 1000,
+            'mean_ms': self.total / self.count * 1000 if self.count else 0.0,
+            'p50_ms': self.percentile(50) * 1000,
+            'p95_ms': self.percentile(95) * 1000,
+            'p99_ms': self.percentile(99) * 1000,
+            'max_ms': self.max * 1000
+        }
+
+class Instrumentation:
+    '''
+
+    Collects per-operation latency histograms from wrapped GUI slots and data-layer calls
+
+    Operations are named module.function or Class.method. Calls may come from worker threads,
+    so recording takes a lock. When profile_operation is set, each call to that operation also
+    runs under one shared cProfile profiler, written next to the JSON as a .prof file
+
+    '''
+    def __init__(self, output_path: str = DEFAULT_OUTPUT, profile_operation: str = None):
+        self.output_path = output_path
+        self.profile_operation = profile_operation
+        self.histograms = {}
+        self.started = time.time()
+        self._lock = threading.Lock()
+        self._profiler = cProfile.Profile() if profile_operation else None
+        self._profiling = False
+        self._installed = []
+
+    def record(self, name: str, seconds: float) -> None:
+        with self._lock:
+            histogram = self.histograms.get(name)
+            if histogram is None:
+                histogram = self.histograms[name] = LatencyHistogram()
+            histogram.record(seconds)
+
+    @contextmanager
+    def timed(self, name: str):
+        '''
+
+        Times the enclosed block as one call of name
+
+        '''
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - start)
+
+    def _call(self, name: str, fn, args: tuple, kwargs: dict):
+        if name == self.profile_operation:
+            # A profiler only follows one thread; overlapping calls are timed but not profiled
+            with self._lock:
+                profile = not self._profiling
+                self._profiling = True
+            if profile:
+                try:
+                    with self.timed(name):
+                        return self._profiler.runcall(fn, *args, **kwargs)
+                finally:
+                    self._profiling = False
+        with self.timed(name):
+            return fn(*args, **kwargs)
+
+    def wrap(self, fn, name: str):
+        '''
+
+        Returns fn wrapped with a timer; extra positional arguments beyond what fn accepts are
+        dropped, as Qt does when a signal carries more arguments than the connected slot takes
+
+        '''
+        parameters = inspect.signature(fn).parameters.values()
+        if any(p.kind == p.VAR_POSITIONAL for p in parameters):
+            max_args = None
+        else:
+            max_args = sum(p.kind in (p.POSITIONAL_ONLY, p.POSITIONAL_OR_KEYWORD) for p in parameters)
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if max_args is not None:
+                args = args[:max_args]
+            return self._call(name, fn, args, kwargs)
+        wrapper.__statswing_instrumented__ = fn
+        return wrapper
+
+    def install(self, data_layer: dict = DATA_LAYER, gui_classes: dict = GUI_CLASSES) -> None:
+        '''
+
+        Wraps the data-layer functions and GUI methods in place; must run before the window is
+        built, since Qt keeps whatever callable a signal was connected to
+
+        '''
+        for module_name, names in data_layer.items():
+            module = importlib.import_module(module_name)
+            if names is None:
+                names = [
+                    attr for attr, value in vars(module).items()
+                    if inspect.isfunction(value) and value.__module__ == module_name and not attr.startswith('_')
+                ]
+            for attr in names:
+                self._patch(module, attr, f'{module_name.rsplit(".", 1)[-1]}.{attr}')
+
+        for path, names in gui_classes.items():
+            module_name, class_name = path.rsplit('.', 1)
+            cls = getattr(importlib.import_module(module_name), class_name)
+            if names is None:
+                names = [attr for attr, value in vars(cls).items() if inspect.isfunction(value) and (not attr.startswith('_') or attr == '__init__')]
+            for attr in names:
+                self._patch(cls, attr, f'{class_name}.{attr}')
+
+    def _patch(self, owner, attr: str, name: str) -> None:
+        original = getattr(owner, attr)
+        if hasattr(original, '__statswing_instrumented__'):
+            return
+        setattr(owner, attr, self.wrap(original, name))
+        self._installed.append((owner, attr, original))
+
+    def uninstall(self) -> None:
+        for owner, attr, original in reversed(self._installed):
+            setattr(owner, attr, original)
+        self._installed.clear()
+
+    def summary(self) -> dict:
+        with self._lock:
+            operations = {name: histogram.summary() for name, histogram in sorted(self.histograms.items())}
+        return {
+            'started': time.strftime('%Y-%m-%dT%H:%M:%S', time.localtime(self.started)),
+            'elapsed_s': time.time() - self.started,
+            'operations': operations
+        }
+
+    def dump(self, output_path: str = None) -> str:
+        '''
+
+        Writes the histograms (and the cProfile stats, if any) and returns the JSON path
+
+        '''
+        output_path = output_path or self.output_path
+        report = self.summary()
+        if self._profiler is not None:
+            profile_path = os.path.splitext(output_path)[0] + '.prof'
+            with self._lock:
+                if self._profiler.getstats():
+                    self._profiler.dump_stats(profile_path)
+                    text = io.StringIO()
+                    pstats.Stats(profile_path, stream = text).sort_stats('cumulative').print_stats(25)
+                    report['profile'] = {'operation': self.profile_operation, 'path': profile_path, 'top': text.getvalue()}
+        with open(output_path, 'w') as f:
+            json.dump(report, f, indent = 2)
+        return output_path
+
+    def attach_shortcut(self, window) -> None:
+        '''
+
+        Binds DUMP_SHORTCUT on a window to write the current histograms
+
+        '''
+        from PyQt5.QtGui import QKeySequence
+        from PyQt5.QtWidgets import QShortcut
+        shortcut = QShortcut(QKeySequence(DUMP_SHORTCUT), window)
+        shortcut.activated.connect(lambda: print(f'Instrumentation written to {self.dump()}'))
+        window._instrumentation_shortcut = shortcut
+
+def enable(output_path: str = None, profile_operation: str = None) -> Instrumentation:
+    '''
+
+    Installs instrumentation and registers a dump at interpreter exit
+
+    '''
+    instrumentation = Instrumentation(output_path or DEFAULT_OUTPUT, profile_operation)
+    instrumentation.install()
+    atexit.register(instrumentation.dump)
+    return instrumentation
+
+def from_environment():
+    '''
+
+    Enables instrumentation if STATSWING_PROFILE is set, otherwise returns None
+
+    '''
+    value = os.environ.get(ENV_VAR)
+    if not value or value == '0':
+        return None
+    return enable(None if value == '1' else value, os.environ.get(ENV_OPERATION) or None)
@@ -0,0 +1,210 @@
+import argparse
+import asyncio
+import json
+import random
+import socket
+import subprocess
+import sys
+import time
+from urllib.parse import urlsplit, urlencode
+from src.statswing_instrument import LatencyHistogram
+
+DEFAULT_URL = 'http://127.0.0.1:8765'
+DEFAULT_CONCURRENCY = 200
+DEFAULT_REQUESTS = 10_000
+# Share of repeat requests sent with If-None-Match, as a polling dashboard would
+DEFAULT_REVALIDATE = 0.3
+# Players the generated queries draw from; fewer players means more cache hits
+DEFAULT_PLAYERS = 200
+READY_TIMEOUT = 60
+
+async def _request(reader: asyncio.StreamReader, writer: asyncio.StreamWriter, host: str, path: str, etag: str = None) -> tuple:
+    '''
+
+    Sends one keep-alive GET and returns (status, etag, body)
+
+    '''
+    headers = [f'GET {path} HTTP/1.1', f'Host: {host}', 'Connection: keep-alive']
+    if etag:
+        headers.append(f'If-None-Match: {etag}')
+    writer.write(('\r\n'.join(headers) + '\r\n\r\n').encode('latin-1'))
+    await writer.drain()
+
+    head = (await reader.readuntil(b'\r\n\r\n')).decode('latin-1').split('\r\n')
+    status = int(head[0].split(' ', 2)[1])
+    fields = {}
+    for line in head[1:]:
+        name, _, value = line.partition(':')
+        if name:
+            fields[name.strip().lower()] = value.strip()
+    body = await reader.readexactly(int(fields.get('content-length', 0) or 0))
+    return status, fields.get('etag'), body
+
+async def _get_json(base_url: str, path: str):
+    url = urlsplit(base_url)
+    reader, writer = await asyncio.open_connection(url.hostname, url.port or 80)
+    try:
+        status, _, body = await _request(reader, writer, url.netloc, path)
+        return status, json.loads(body) if body else None
+    finally:
+        writer.close()
+
+def build_paths(players: dict, count: int, seed: int = 0) -> list:
+    '''
+
+    Generates a reproducible mix of requests across every endpoint, with season ranges drawn
+    from each player's own seasons (players maps name -> seasons)
+
+    '''
+    rng = random.Random(seed)
+    names = list(players)
+    stats = ['Home Runs', 'WAR', 'wOBA', 'Strikeout Percentage', 'Stolen Bases', 'OBP']
+
+    def season_range(name):
+        seasons = players[name]
+        start = rng.randrange(len(seasons))
+        return seasons[start], seasons[rng.randrange(start, len(seasons))]
+
+    def one():
+        kind = rng.random()
+        name = rng.choice(names)
+        start, end = season_range(name)
+        if kind < 0.3:
+            return '/range?' + urlencode({'name': name, 'start': start, 'end': end})
+        if kind < 0.45:
+            return '/compare?' + urlencode({'a': name, 'b': rng.choice(names), 'start': start, 'end': end})
+        if kind < 0.6:
+            return '/league?' + urlencode({'name': name, 'stat': rng.choice(stats), 'start': start, 'end': end})
+        if kind < 0.7:
+            return '/leaderboard?' + urlencode({'stat': rng.choice(stats), 'start': start, 'end': end})
+        if kind < 0.8:
+            return '/career?' + urlencode({'name': name})
+        if kind < 0.9:
+            return '/player?' + urlencode({'name': name})
+        return '/search?' + urlencode({'q': name[:rng.randint(2, 6)]})
+    return [one() for _ in range(count)]
+
+async def run(base_url: str, concurrency: int = DEFAULT_CONCURRENCY, requests: int = DEFAULT_REQUESTS,
+              revalidate: float = DEFAULT_REVALIDATE, players: int = DEFAULT_PLAYERS, seed: int = 0) -> dict:
+    '''
+
+    Sends requests over concurrency keep-alive connections and returns throughput, status
+    counts and latency percentiles
+
+    '''
+    status, _ = await _get_json(base_url, '/health')
+    if status != 200:
+        raise RuntimeError(f'{base_url}/health returned {status}')
+    _, listing = await _get_json(base_url, '/players')
+    rng = random.Random(seed)
+    pool = {}
+    for name in rng.sample(listing['players'], min(players, len(listing['players']))):
+        status, player = await _get_json(base_url, '/player?' + urlencode({'name': name}))
+        if status == 200 and player['seasons']:
+            pool[name] = player['seasons']
+    paths = build_paths(pool, requests, seed)
+
+    url = urlsplit(base_url)
+    histogram = LatencyHistogram()
+    statuses = {}
+    etags = {}
+    errors = []
+    next_index = iter(range(len(paths)))
+
+    async def client(worker_id: int) -> None:
+        worker_rng = random.Random(seed * 1000 + worker_id)
+        reader, writer = await asyncio.open_connection(url.hostname, url.port or 80)
+        try:
+            for i in next_index:
+                path = paths[i]
+                etag = etags.get(path) if worker_rng.random() < revalidate else None
+                start = time.perf_counter()
+                try:
+                    status, new_etag, _ = await _request(reader, writer, url.netloc, path, etag)
+                except (ConnectionError, asyncio.IncompleteReadError) as e:
+                    errors.append(repr(e))
+                    writer.close()
+                    reader, writer = await asyncio.open_connection(url.hostname, url.port or 80)
+                    continue
+                histogram.record(time.perf_counter() - start)
+                statuses[status] = statuses.get(status, 0) + 1
+                if new_etag:
+                    etags[path] = new_etag
+        finally:
+            writer.close()
+
+    start = time.perf_counter()
+    await asyncio.gather(*(client(i) for i in range(concurrency)))
+    elapsed = time.perf_counter() - start
+    _, after = await _get_json(base_url, '/health')
+    return {
+        'requests': histogram.count,
+        'concurrency': concurrency,
+        'seconds': elapsed,
+        'requests_per_second': histogram.count / elapsed if elapsed > 0 else float('inf'),
+        'statuses': {str(code): count for code, count in sorted(statuses.items())},
+        'errors': len(errors),
+        'latency': histogram.summary(),
+        'server': after
+    }
+
+def start_service(data_path: str) -> tuple:
+    '''
+
+    Starts statswing_service on a free port in a subprocess; returns (process, base URL)
+
+    '''
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        port = sock.getsockname()[1]
+    command = [sys.executable, '-m', 'src.statswing_service', '--port', str(port)]
+    if data_path:
+        command += ['--data', data_path]
+    process = subprocess.Popen(command)
+    base_url = f'http://127.0.0.1:{port}'
+    deadline = time.time() + READY_TIMEOUT
+    while time.time() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f'service exited with code {process.returncode}')
+        try:
+            with socket.create_connection(('127.0.0.1', port), timeout = 1):
+                return process, base_url
+        except OSError:
+            time.sleep(0.2)
+    process.terminate()
+    raise RuntimeError('service did not start listening in time')
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description = 'Load-test the StatSwing HTTP service')
+    parser.add_argument('--url', help = f'service to test (default: start one on a free port; {DEFAULT_URL} is the service default)')
+    parser.add_argument('--data', help = 'player data CSV for the service this script starts')
+    parser.add_argument('-c', '--concurrency', type = int, default = DEFAULT_CONCURRENCY, help = 'simultaneous keep-alive connections')
+    parser.add_argument('-n', '--requests', type = int, default = DEFAULT_REQUESTS, help = 'total requests')
+    parser.add_argument('--revalidate', type = float, default = DEFAULT_REVALIDATE, help = 'share of repeat requests sent with If-None-Match')
+    parser.add_argument('--players', type = int, default = DEFAULT_PLAYERS, help = 'distinct players in the request mix')
+    parser.add_argument('--seed', type = int, default = 0)
+    parser.add_argument('-o', '--output', help = 'also write the results as JSON')
+    args = parser.parse_args()
+
+    process = None
+    base_url = args.url
+    if base_url is None:
+        process, base_url = start_service(args.data)
+    try:
+        results = asyncio.run(run(base_url, args.concurrency, args.requests, args.revalidate, args.players, args.seed))
+    finally:
+        if process is not None:
+            process.terminate()
+            process.wait()
+
+    latency = results['latency']
+    cache = results['server']['cache']
+    print(f"{results['requests']:,} requests over {results['concurrency']} connections in {results['seconds']:.2f}s "
+          f"({results['requests_per_second']:,.0f} req/s), {results['errors']} errors")
+    print(f"statuses {results['statuses']}; latency p50 {latency['p50_ms']:.2f} ms, p95 {latency['p95_ms']:.2f} ms, "
+          f"p99 {latency['p99_ms']:.2f} ms, max {latency['max_ms']:.2f} ms")
+    print(f"server cache: {cache['hits']:,} hits, {cache['misses']:,} misses, {cache['evictions']:,} evictions; "
+          f"{results['server']['coalesced']:,} coalesced, {results['server']['not_modified']:,} not modified")
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent = 2)
@@ -0,0 +1,183 @@
+# Memoized query-layer results (statswing_query), one bounded cache per store. Like the query
+# layer itself this never imports Qt, and pandas only through the functions it wraps
+import functools
+import inspect
+import numbers
+import sys
+import threading
+import weakref
+from collections import OrderedDict
+
+DEFAULT_MAX_BYTES = 32 * 2**20
+# Parameters holding a stat are keyed by dataset column, so 'Home Runs' and 'HR' share an entry
+STAT_PARAMETERS = {'stat_name', 'stat'}
+_MISSING = object()
+
+def result_size(value) -> int:
+    '''
+
+    Estimates the memory held by a query result: pandas objects and arrays report their own
+    buffers, containers are summed over their items
+
+    '''
+    if hasattr(value, 'memory_usage'):
+        usage = value.memory_usage(deep = True)
+        return int(usage.sum()) if hasattr(usage, 'sum') else int(usage)
+    if hasattr(value, 'nbytes'):
+        return int(value.nbytes)
+    if isinstance(value, dict):
+        return sys.getsizeof(value) + sum(result_size(k) + result_size(v) for k, v in value.items())
+    if isinstance(value, (list, tuple)):
+        return sys.getsizeof(value) + sum(result_size(item) for item in value)
+    return sys.getsizeof(value)
+
+def normalize_argument(name: str, value):
+    '''
+
+    Returns the hashable, canonical form of one query argument: NumPy scalars become Python
+    numbers, lists become tuples and stats become dataset columns
+
+    '''
+    if isinstance(value, bool) or value is None:
+        return value
+    if isinstance(value, numbers.Integral):
+        return int(value)
+    if isinstance(value, numbers.Real):
+        value = float(value)
+        return int(value) if value.is_integer() else value
+    if isinstance(value, (list, tuple)):
+        return tuple(normalize_argument(name, item) for item in value)
+    if name in STAT_PARAMETERS and isinstance(value, str):
+        from src.statswing_utils import get_dataset_column
+        return get_dataset_column(value)
+    return value
+
+class ResultCache:
+    '''
+
+    LRU cache of one store's query results, bounded by their estimated size in bytes
+
+    Keys are (operation, arguments...) tuples. Every entry belongs to the store version it was
+    computed from; the first lookup after the version moves (a merge into the store) drops them
+    all, and a result computed from an older version than the cache has seen is not kept.
+    Results are shared between callers, so they must be treated as read-only. A budget of 0
+    turns caching off
+
+    '''
+    def __init__(self, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self.version = None
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+        # operation: [hits, misses]
+        self.operations = {}
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _sync(self, version) -> None:
+        if version != self.version:
+            if self._entries:
+                self.invalidations += 1
+            self._entries.clear()
+            self.bytes = 0
+            self.version = version
+
+    def get(self, key: tuple, version):
+        '''
+
+        Returns the cached result for key, or _MISSING
+
+        '''
+        with self._lock:
+            self._sync(version)
+            entry = self._entries.get(key)
+            counts = self.operations.setdefault(key[0], [0, 0])
+            if entry is None:
+                self.misses += 1
+                counts[1] += 1
+                return _MISSING
+            self._entries.move_to_end(key)
+            self.hits += 1
+            counts[0] += 1
+            return entry[0]
+
+    def put(self, key: tuple, version, value) -> None:
+        size = result_size(value)
+        with self._lock:
+            if version != self.version:
+                return
+            if size <= self.max_bytes:
+                old = self._entries.pop(key, None)
+                if old is not None:
+                    self.bytes -= old[1]
+                self._entries[key] = (value, size)
+                self.bytes += size
+            # The budget may also have been lowered since the last put
+            while self.bytes > self.max_bytes:
+                _, (_, evicted) = self._entries.popitem(last = False)
+                self.bytes -= evicted
+                self.evictions += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.bytes = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'bytes': self.bytes,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+                'evictions': self.evictions,
+                'invalidations': self.invalidations,
+                'operations': {operation: {'hits': hits, 'misses': misses} for operation, (hits, misses) in sorted(self.operations.items())}
+            }
+
+_caches = weakref.WeakKeyDictionary()
+_caches_lock = threading.Lock()
+
+def result_cache(store) -> ResultCache:
+    '''
+
+    Returns the store's ResultCache, creating it on first use
+
+    '''
+    with _caches_lock:
+        cache = _caches.get(store)
+        if cache is None:
+            cache = _caches[store] = ResultCache()
+        return cache
+
+def memoized(fn):
+    '''
+
+    Caches a query function's results in its store's ResultCache (the store is the first
+    argument). Arguments are bound to the signature with defaults filled in before keying, so
+    positional, keyword and default spellings of the same call share one entry
+
+    '''
+    signature = inspect.signature(fn)
+    operation = fn.__name__
+
+    @functools.wraps(fn)
+    def wrapper(store, *args, **kwargs):
+        bound = signature.bind(store, *args, **kwargs)
+        bound.apply_defaults()
+        key = (operation,) + tuple(normalize_argument(name, value) for name, value in list(bound.arguments.items())[1:])
+        cache = result_cache(store)
+        # Stores that never change (a PartitionedDataset) have no version
+        version = getattr(store, 'version', 0)
+        result = cache.get(key, version)
+        if result is _MISSING:
+            result = fn(store, *args, **kwargs)
+            cache.put(key, version, result)
+        return result
+    return wrapper
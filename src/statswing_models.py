@@ -0,0 +1,306 @@
+import numpy as np
+import pandas as pd
+from PyQt5.QtCore import Qt, QAbstractTableModel, QAbstractListModel, QAbstractProxyModel, QModelIndex, QStringListModel
+from PyQt5.QtWidgets import QCompleter
+from src.statswing_search import DEFAULT_LIMIT
+
+def format_value(value) -> str:
+    '''
+
+    Formats a cell for display: floats to two decimals, missing values as N/A
+
+    '''
+    if value is None or (isinstance(value, (float, np.floating)) and np.isnan(value)):
+        return 'N/A'
+    if isinstance(value, (float, np.floating)):
+        return f'{value:.2f}'
+    return str(value)
+
+class ArrayTableModel(QAbstractTableModel):
+    '''
+
+    Read-only table model over a block of NumPy columns
+
+    Cells are formatted only when the view asks for them, so only visible rows cost anything.
+    Sorting keeps a row permutation instead of reordering the arrays, and swapping in new
+    arrays is a single model reset
+
+    '''
+    def __init__(self, headers: list = None, columns: list = None, parent = None):
+        super().__init__(parent)
+        self._headers = []
+        self._columns = []
+        self._order = None
+        self._sort_column = -1
+        self._sort_order = Qt.AscendingOrder
+        if headers is not None:
+            self.set_columns(headers, columns or [])
+
+    def set_columns(self, headers: list, columns: list) -> None:
+        '''
+
+        Replaces the table contents with one array per column (all the same length)
+
+        '''
+        self.beginResetModel()
+        self._headers = list(headers)
+        self._columns = [np.asarray(column) for column in columns]
+        self._order = None
+        self._apply_sort()
+        self.endResetModel()
+
+    def set_frame(self, frame: pd.DataFrame) -> None:
+        '''
+
+        Replaces the table contents with a DataFrame's columns (numeric columns are not copied)
+
+        '''
+        self.set_columns(list(frame.columns), [frame[column].to_numpy() for column in frame.columns])
+
+    def clear(self) -> None:
+        self.set_columns([], [])
+
+    def rowCount(self, parent = QModelIndex()) -> int:
+        if parent.isValid() or not self._columns:
+            return 0
+        return len(self._columns[0])
+
+    def columnCount(self, parent = QModelIndex()) -> int:
+        if parent.isValid():
+            return 0
+        return len(self._headers)
+
+    def raw_value(self, row: int, column: int):
+        '''
+
+        Returns the unformatted value shown at a view row, taking the current sort into account
+
+        '''
+        if self._order is not None:
+            row = self._order[row]
+        return self._columns[column][row]
+
+    def data(self, index: QModelIndex, role: int = Qt.DisplayRole):
+        if not index.isValid() or index.column() >= len(self._columns):
+            return None
+        if role == Qt.DisplayRole:
+            return format_value(self.raw_value(index.row(), index.column()))
+        if role == Qt.UserRole:
+            return self.raw_value(index.row(), index.column())
+        if role == Qt.TextAlignmentRole and self._columns[index.column()].dtype.kind in 'iuf':
+            return int(Qt.AlignRight | Qt.AlignVCenter)
+        return None
+
+    def headerData(self, section: int, orientation: int, role: int = Qt.DisplayRole):
+        if role != Qt.DisplayRole:
+            return None
+        if orientation == Qt.Horizontal:
+            return self._headers[section] if section < len(self._headers) else None
+        return str(section + 1)
+
+    def sort(self, column: int, order: int = Qt.AscendingOrder) -> None:
+        self.layoutAboutToBeChanged.emit()
+        old_order = self._order
+        self._sort_column = column
+        self._sort_order = order
+        self._apply_sort()
+
+        # Keep selections and other persistent indexes pointing at the same underlying rows
+        persistent = self.persistentIndexList()
+        if persistent:
+            position = np.empty(self.rowCount(), dtype = np.int64)
+            position[self._order if self._order is not None else np.arange(self.rowCount())] = np.arange(self.rowCount())
+            updated = []
+            for index in persistent:
+                source_row = old_order[index.row()] if old_order is not None else index.row()
+                updated.append(self.index(int(position[source_row]), index.column()))
+            self.changePersistentIndexList(persistent, updated)
+        self.layoutChanged.emit()
+
+    def _apply_sort(self) -> None:
+        '''
+
+        Recomputes the row permutation for the current sort column (-1 keeps the source order)
+
+        '''
+        if self._sort_column < 0 or self._sort_column >= len(self._columns):
+            self._order = None
+            return
+        values = self._columns[self._sort_column]
+        if values.dtype.kind not in 'biuf':
+            values = values.astype(str)
+        order = np.argsort(values, kind = 'stable')
+        if self._sort_order == Qt.DescendingOrder:
+            # NaN stays at the bottom either way
+            if values.dtype.kind == 'f':
+                nan_count = int(np.isnan(values).sum())
+                order = np.concatenate((order[:len(order) - nan_count][::-1], order[len(order) - nan_count:]))
+            else:
+                order = order[::-1]
+        self._order = order
+
+class PlayerListModel(QAbstractListModel):
+    '''
+
+    Every player name in the store, shared by all the player dropdowns
+
+    Which rows belong to a team is worked out the first time any dropdown asks for that team
+    (from PlayerStore.team_to_players) and then reused, so switching teams never rebuilds a list
+
+    '''
+    def __init__(self, store, parent = None):
+        super().__init__(parent)
+        self.names = []
+        self._team_rows = {}
+        self._positions = None
+        self._store = store
+        self.set_store(store)
+
+    def set_store(self, store) -> None:
+        '''
+
+        Takes the store's current player list (e.g. after an upsert added names or team rows)
+
+        '''
+        self.beginResetModel()
+        self._store = store
+        self.names = list(store.player_names)
+        self._team_rows = {}
+        self._positions = None
+        self.endResetModel()
+
+    def row_of(self, name: str) -> int:
+        '''
+
+        Returns the row of a player, or -1
+
+        '''
+        if self._positions is None:
+            self._positions = {name: row for row, name in enumerate(self.names)}
+        return self._positions.get(name, -1)
+
+    def team_rows(self, team_abbr: str) -> np.ndarray:
+        '''
+
+        Returns the ascending rows of a team's players
+
+        '''
+        rows = self._team_rows.get(team_abbr)
+        if rows is None:
+            rows = np.array(sorted(self.row_of(name) for name in self._store.players_for_team(team_abbr)), dtype = np.int64)
+            self._team_rows[team_abbr] = rows = rows[rows >= 0]
+        return rows
+
+    def rowCount(self, parent = QModelIndex()) -> int:
+        return 0 if parent.isValid() else len(self.names)
+
+    def data(self, index, role = Qt.DisplayRole):
+        if index.isValid() and role in (Qt.DisplayRole, Qt.EditRole):
+            return self.names[index.row()]
+        return None
+
+class TeamFilterProxy(QAbstractProxyModel):
+    '''
+
+    One dropdown's view of a shared PlayerListModel: every player, or a single team's
+
+    A QSortFilterProxyModel would call back into Python once per player on every team change;
+    here the team's rows come precomputed from the shared model, so a change is one reset
+
+    '''
+    def __init__(self, source: PlayerListModel, parent = None):
+        super().__init__(parent)
+        self.team = None
+        self.rows = None
+        self.setSourceModel(source)
+        source.modelAboutToBeReset.connect(self.beginResetModel)
+        source.modelReset.connect(self._source_reset)
+
+    def set_team(self, team_abbr: str = None) -> None:
+        '''
+
+        Shows only team_abbr's players, or everyone for None
+
+        '''
+        self.beginResetModel()
+        self.team = team_abbr
+        self.rows = None if team_abbr is None else self.sourceModel().team_rows(team_abbr)
+        self.endResetModel()
+
+    def _source_reset(self) -> None:
+        self.rows = None if self.team is None else self.sourceModel().team_rows(self.team)
+        self.endResetModel()
+
+    def find(self, name: str) -> int:
+        '''
+
+        Returns the row of a player in this view, or -1 (a dictionary lookup, unlike QComboBox.findText)
+
+        '''
+        row = self.sourceModel().row_of(name)
+        if row < 0 or self.rows is None:
+            return row
+        position = int(np.searchsorted(self.rows, row))
+        return position if position < len(self.rows) and self.rows[position] == row else -1
+
+    def _source_row(self, row: int) -> int:
+        return row if self.rows is None else int(self.rows[row])
+
+    def rowCount(self, parent = QModelIndex()) -> int:
+        if parent.isValid():
+            return 0
+        return self.sourceModel().rowCount() if self.rows is None else len(self.rows)
+
+    def columnCount(self, parent = QModelIndex()) -> int:
+        return 0 if parent.isValid() else 1
+
+    def index(self, row: int, column: int, parent = QModelIndex()) -> QModelIndex:
+        if parent.isValid() or column != 0 or not 0 <= row < self.rowCount():
+            return QModelIndex()
+        return self.createIndex(row, column)
+
+    def parent(self, index = None):
+        # Without an index this is QObject.parent()
+        if index is None:
+            return super().parent()
+        return QModelIndex()
+
+    def mapToSource(self, proxy_index: QModelIndex) -> QModelIndex:
+        if not proxy_index.isValid():
+            return QModelIndex()
+        return self.sourceModel().index(self._source_row(proxy_index.row()), 0)
+
+    def mapFromSource(self, source_index: QModelIndex) -> QModelIndex:
+        if not source_index.isValid():
+            return QModelIndex()
+        return self.index(self.find(self.sourceModel().names[source_index.row()]), 0)
+
+    def data(self, index, role = Qt.DisplayRole):
+        if index.isValid() and role in (Qt.DisplayRole, Qt.EditRole):
+            return self.sourceModel().names[self._source_row(index.row())]
+        return None
+
+class PlayerCompleter(QCompleter):
+    '''
+
+    Completer that takes its suggestions from a PlayerSearchIndex on every keystroke
+
+    Qt's own prefix filtering is turned off (the index already ranked prefix and fuzzy matches),
+    so the popup only ever holds the top few names instead of the whole player list. index may
+    also be a function returning the index, so it need not exist until the first keystroke
+
+    '''
+    def __init__(self, index, limit: int = DEFAULT_LIMIT, parent = None):
+        super().__init__(parent)
+        self.index = index
+        self.limit = limit
+        self.matches = QStringListModel(self)
+        self.setModel(self.matches)
+        self.setCompletionMode(QCompleter.UnfilteredPopupCompletion)
+        self.setCaseSensitivity(Qt.CaseInsensitive)
+
+    def update_matches(self, text: str) -> None:
+        index = self.index() if callable(self.index) else self.index
+        self.matches.setStringList(index.search(text, self.limit) if text.strip() else [])
+        if self.matches.rowCount():
+            self.complete()
@@ -0,0 +1,236 @@
+import argparse
+import bisect
+import json
+import os
+import shutil
+import numpy as np
+import pandas as pd
+from src.config import STAT_MAPPING, RATE_WEIGHT_COLUMN
+
+PARTITION_VERSION = 1
+MANIFEST_NAME = 'manifest.json'
+# Columns every scan reads, whatever the caller asked for
+KEY_COLUMNS = ['Name', 'Team', 'Season Year']
+
+def partition_file(season: int) -> str:
+    # Career rows (Season Year 0) get a partition of their own
+    return f'season_{season:04d}.npz'
+
+def write_partitions(data: pd.DataFrame, root: str, source: dict = None) -> dict:
+    '''
+
+    Writes a player table as one uncompressed .npz file per season plus a manifest, and returns
+    the manifest
+
+    String columns are stored as int32 codes into one sorted, dataset-wide category list, so
+    partitions concatenate without remapping and a name's code range orders like the names.
+    The manifest records every partition's row count and the min/max of each column, which is
+    what lets scans skip files without opening them. Like the columnar cache, the new directory
+    replaces the old one only once it is complete
+
+    '''
+    tmp_dir = f'{root.rstrip(os.sep)}.tmp'
+    shutil.rmtree(tmp_dir, ignore_errors = True)
+    os.makedirs(tmp_dir)
+
+    columns = []
+    encoded = {}
+    for name in data.columns:
+        series = data[name]
+        column = {'name': name, 'dtype': str(series.dtype)}
+        if series.dtype.kind in 'biuf':
+            column['kind'] = 'values'
+            encoded[name] = series.to_numpy()
+        else:
+            categories = sorted(str(value) for value in pd.unique(series.astype(str)))
+            column['kind'] = 'codes'
+            column['categories'] = categories
+            encoded[name] = pd.Categorical(series.astype(str), categories = categories).codes.astype(np.int32)
+        columns.append(column)
+
+    seasons = data['Season Year'].to_numpy()
+    partitions = []
+    for season in np.sort(pd.unique(seasons)):
+        rows = np.flatnonzero(seasons == season)
+        arrays = {name: values[rows] for name, values in encoded.items()}
+        stats = {}
+        for name, values in arrays.items():
+            finite = values[~np.isnan(values)] if values.dtype.kind == 'f' else values
+            if len(finite):
+                stats[name] = {'min': finite.min().item(), 'max': finite.max().item()}
+        file_name = partition_file(int(season))
+        np.savez(os.path.join(tmp_dir, file_name), **{f'col_{i:03d}': arrays[column['name']] for i, column in enumerate(columns)})
+        partitions.append({'file': file_name, 'season': int(season), 'rows': len(rows), 'stats': stats})
+
+    manifest = {'version': PARTITION_VERSION, 'source': source, 'columns': columns, 'partitions': partitions}
+    with open(os.path.join(tmp_dir, MANIFEST_NAME), 'w') as f:
+        json.dump(manifest, f)
+    shutil.rmtree(root, ignore_errors = True)
+    os.replace(tmp_dir, root)
+    return manifest
+
+class PartitionedDataset:
+    '''
+
+    Season-partitioned player table on disk, read a partition and a column at a time
+
+    Scans take a season range, an optional list of names and optional (low, high) bounds per
+    column. Partitions whose manifest min/max can't satisfy those predicates are never opened;
+    of the rest, only the requested columns are read (each is its own member of the .npz), and
+    the name and bound predicates are then applied row by row. last_scan records what the most
+    recent scan touched
+
+    '''
+    def __init__(self, root: str):
+        self.root = root
+        with open(os.path.join(root, MANIFEST_NAME)) as f:
+            manifest = json.load(f)
+        if manifest.get('version') != PARTITION_VERSION:
+            raise ValueError(f'{root} was written by an incompatible version ({manifest.get("version")})')
+        self.source = manifest.get('source')
+        self.columns = [column['name'] for column in manifest['columns']]
+        self._columns = {column['name']: (i, column) for i, column in enumerate(manifest['columns'])}
+        self.partitions = manifest['partitions']
+        self.seasons = [partition['season'] for partition in self.partitions if partition['season'] != 0]
+        self.stats = [col for col in STAT_MAPPING if col in self.columns and col != 'TotalStat']
+        self.last_scan = None
+
+    def _codes_for(self, column: str, values: list) -> np.ndarray:
+        categories = self._columns[column][1]['categories']
+        codes = []
+        for value in values:
+            i = bisect.bisect_left(categories, str(value))
+            if i < len(categories) and categories[i] == str(value):
+                codes.append(i)
+        return np.asarray(codes, dtype = np.int32)
+
+    def prune(self, start_season: int, end_season: int, names: list = None, where: dict = None) -> list:
+        '''
+
+        Returns the partitions that may hold matching rows, judged from the manifest alone
+
+        '''
+        bounds = dict(where or {})
+        if names is not None:
+            codes = self._codes_for('Name', names)
+            if not len(codes):
+                return []
+            bounds['Name'] = (int(codes.min()), int(codes.max()))
+
+        selected = []
+        for partition in self.partitions:
+            if not start_season <= partition['season'] <= end_season:
+                continue
+            stats = partition['stats']
+            if any(
+                col in stats and ((low is not None and stats[col]['max'] < low) or (high is not None and stats[col]['min'] > high))
+                for col, (low, high) in bounds.items()
+            ):
+                continue
+            selected.append(partition)
+        return selected
+
+    def _read(self, partition: dict, columns: list) -> dict:
+        with np.load(os.path.join(self.root, partition['file'])) as members:
+            return {col: members[f'col_{self._columns[col][0]:03d}'] for col in columns}
+
+    def scan(self, start_season: int, end_season: int, columns: list = None, names: list = None, where: dict = None) -> pd.DataFrame:
+        '''
+
+        Returns the rows with start_season <= Season Year <= end_season (Season Year 0 for career
+        rows), optionally only for names and within (low, high) bounds per column, with just the
+        key columns plus columns
+
+        '''
+        wanted = [col for col in self.columns if col in KEY_COLUMNS or columns is None or col in columns]
+        predicate_columns = [col for col in (where or {}) if col not in wanted]
+        partitions = self.prune(start_season, end_season, names, where)
+
+        name_codes = self._codes_for('Name', names) if names is not None else None
+        blocks = []
+        for partition in partitions:
+            arrays = self._read(partition, wanted + predicate_columns)
+            mask = np.ones(partition['rows'], dtype = bool)
+            if name_codes is not None:
+                mask &= np.isin(arrays['Name'], name_codes)
+            for col, (low, high) in (where or {}).items():
+                if low is not None:
+                    mask &= arrays[col] >= low
+                if high is not None:
+                    mask &= arrays[col] <= high
+            blocks.append({col: arrays[col][mask] for col in wanted})
+        self.last_scan = {'partitions_read': len(partitions), 'partitions_total': len(self.partitions), 'columns': wanted + predicate_columns}
+
+        frame = {}
+        for col in wanted:
+            _, column = self._columns[col]
+            values = np.concatenate([block[col] for block in blocks]) if blocks else np.empty(0, dtype = np.int32 if column['kind'] == 'codes' else column['dtype'])
+            if column['kind'] == 'codes':
+                values = pd.Categorical.from_codes(values, column['categories'])
+                values = values if column['dtype'] == 'category' else np.asarray(values, dtype = object)
+            frame[col] = values
+        return pd.DataFrame(frame, copy = False)
+
+    def range_aggregates(self, start_season: int, end_season: int, stats: list = None, names: list = None) -> pd.DataFrame:
+        '''
+
+        Aggregates players over a season range like statswing_utils.aggregate_seasons, reading
+        only the overlapping partitions and the stats asked for (plus PA, the rate weight)
+
+        '''
+        from src.statswing_utils import aggregate_rows
+        stats = stats or self.stats
+        # Career rows live in partition 0 and never belong to a season range
+        start_season = max(start_season, 1)
+        rows = self.scan(start_season, end_season, stats + [RATE_WEIGHT_COLUMN], names = names)
+        return aggregate_rows(rows, stats)
+
+    def player_seasons(self, name: str) -> list:
+        rows = self.scan(1, max(self.seasons, default = 0), [], names = [name])
+        return sorted(int(season) for season in pd.unique(rows['Season Year']))
+
+    def load_store(self, start_season: int = None, end_season: int = None):
+        '''
+
+        Builds an in-memory PlayerStore over just the seasons in range (all if not given), plus
+        the career and average rows
+
+        '''
+        from src.statswing_store import PlayerStore
+        start_season = min(self.seasons, default = 0) if start_season is None else start_season
+        end_season = max(self.seasons, default = 0) if end_season is None else end_season
+        rows = pd.concat([self.scan(0, 0), self.scan(start_season, end_season)], ignore_index = True)
+        return PlayerStore(rows)
+
+def partitions_dir_for(file_path: str) -> str:
+    return f'{file_path}.partitions'
+
+def open_partitions(file_path: str, rebuild: bool = False) -> PartitionedDataset:
+    '''
+
+    Opens the partitioned copy of a player CSV, writing it first if it is missing or stale
+
+    '''
+    from src.statswing_cache import source_key
+    from src.statswing_utils import read_player_csv
+    root = partitions_dir_for(file_path)
+    key = source_key(file_path)
+    if not rebuild:
+        try:
+            dataset = PartitionedDataset(root)
+            if dataset.source == key:
+                return dataset
+        except (OSError, ValueError, KeyError):
+            pass
+    write_partitions(read_player_csv(file_path), root, key)
+    return PartitionedDataset(root)
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description = 'Write the season-partitioned copy of a player CSV and show its partitions')
+    parser.add_argument('file', nargs = '?', default = 'data/player_data.csv')
+    args = parser.parse_args()
+
+    dataset = open_partitions(args.file, rebuild = True)
+    for partition in dataset.partitions:
+        size = os.path.getsize(os.path.join(dataset.root, partition['file']))
+        print(f"{partition['file']}: {partition['rows']:,} rows, {size / 1024:,.0f} KB")
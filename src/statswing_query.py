@@ -0,0 +1,230 @@
+# GUI-free queries shared by the desktop app, batch jobs and notebooks. pandas/NumPy are only
+# imported (through statswing_utils) the first time a query needs them; Qt/matplotlib never are.
+# The aggregating queries are memoized per store (statswing_memo); their results are read-only
+from typing import TYPE_CHECKING
+from src.config import TEAM_NAME_MAPPING, STAT_MAPPING
+from src.statswing_memo import memoized
+
+if TYPE_CHECKING:
+    import pandas as pd
+    from src.statswing_store import PlayerStore
+
+DEFAULT_DATA_PATH = 'data/player_data.csv'
+CAREER_STATS = ['G', 'PA', 'HR', 'R', 'RBI', 'SB', 'BB%', 'K%', 'AVG', 'OBP', 'SLG', 'wOBA']
+# Full team name -> dataset abbreviation, the reverse of TEAM_NAME_MAPPING
+TEAM_ABBREVIATIONS = {name: abbr for abbr, name in TEAM_NAME_MAPPING.items()}
+
+def _partitioned(store) -> bool:
+    '''
+
+    Tells a season-partitioned dataset (statswing_partitions) from an in-memory PlayerStore;
+    range queries on the former read only the partitions and columns they need
+
+    '''
+    from src.statswing_partitions import PartitionedDataset
+    return isinstance(store, PartitionedDataset)
+
+def load(file_path: str = DEFAULT_DATA_PATH, use_cache: bool = True) -> 'PlayerStore':
+    '''
+
+    Loads and indexes the player data (see statswing_utils.load_data)
+
+    '''
+    from src.statswing_utils import load_data
+    return load_data(file_path, use_cache = use_cache)
+
+def upsert(store: 'PlayerStore', rows: 'pd.DataFrame') -> dict:
+    '''
+
+    Merges new or corrected player-season rows into a loaded store (see statswing_utils.upsert_rows)
+
+    '''
+    from src.statswing_utils import upsert_rows
+    return upsert_rows(store, rows)
+
+def upsert_csv(store: 'PlayerStore', file_path: str) -> dict:
+    '''
+
+    Merges the rows of a CSV in the player_data.csv format (e.g. a day's new rows) into a store
+
+    '''
+    from src.statswing_utils import read_player_csv, upsert_rows
+    return upsert_rows(store, read_player_csv(file_path))
+
+def team_abbreviation(team_name: str) -> str:
+    '''
+
+    Maps a full team name (as shown in the dropdowns) back to its dataset abbreviation
+
+    '''
+    return TEAM_ABBREVIATIONS.get(team_name, team_name)
+
+def lookup_player(store: 'PlayerStore', name: str) -> 'pd.DataFrame':
+    '''
+
+    Returns every row for a player (career row first, then seasons in ascending order)
+
+    '''
+    return store.player_rows(name)
+
+def players_for_team(store: 'PlayerStore', team: str) -> list:
+    '''
+
+    Returns the players for a team given as a full name or abbreviation ('All Teams' for everyone)
+
+    '''
+    if team == 'All Teams':
+        return store.player_names
+    return store.players_for_team(team_abbreviation(team))
+
+def player_seasons(store: 'PlayerStore', name: str) -> list:
+    '''
+
+    Returns the seasons a player was active in
+
+    '''
+    return store.player_seasons(name)
+
+@memoized
+def season_range_stats(store: 'PlayerStore', name: str, start_season: int, end_season: int):
+    '''
+
+    Returns a player's aggregated stats over a season range, keyed by display name, or None if
+    the player has no rows in the range
+
+    '''
+    from src.statswing_utils import aggregate_player
+    if _partitioned(store):
+        aggregates = store.range_aggregates(start_season, end_season, names = [name])
+        return aggregates.loc[name].rename(index = STAT_MAPPING) if name in aggregates.index else None
+    if store.cube.player_row_count(name, start_season, end_season) == 0:
+        return None
+    agg_data = aggregate_player(store, name, start_season, end_season)
+    return agg_data.rename(index = STAT_MAPPING)
+
+@memoized
+def league_comparison(store: 'PlayerStore', name: str, stat_name: str, start_season: int, end_season: int) -> dict:
+    '''
+
+    Compares a player's aggregate for one stat over a season range with the average of every
+    other player active in that range (the average rows are not players, as in statswing_rank)
+
+    '''
+    from src.statswing_store import is_average_row
+    from src.statswing_utils import aggregate_seasons, get_dataset_column
+    stat_col = get_dataset_column(stat_name)
+    if _partitioned(store):
+        aggregates = store.range_aggregates(start_season, end_season, [stat_col])[stat_col]
+    else:
+        aggregates = aggregate_seasons(store, start_season, end_season)[stat_col]
+    names = aggregates.index.to_series()
+    others = aggregates[~is_average_row(names).to_numpy() & (names != name).to_numpy()]
+    return {
+        'player_value': float(aggregates[name]),
+        'other_player_avg': float(others.mean())
+    }
+
+@memoized
+def percentile_ranks(store: 'PlayerStore', name: str, start_season: int, end_season: int):
+    '''
+
+    Returns a player's percentile among every player active in a season range for each stat,
+    keyed by display name (higher is better, including for K%)
+
+    '''
+    from src.statswing_rank import ranking_engine, rank_aggregates
+    if _partitioned(store):
+        percentiles = rank_aggregates(store.range_aggregates(start_season, end_season)).percentiles(name)
+    else:
+        percentiles = ranking_engine(store).percentiles(name, start_season, end_season)
+    return percentiles.rename(index = STAT_MAPPING)
+
+@memoized
+def leaderboard(store: 'PlayerStore', stat_name: str, start_season: int, end_season: int, k: int = 25) -> 'pd.DataFrame':
+    '''
+
+    Returns the top k players for a stat (display name) over a season range as Rank, Name and
+    value columns, best first
+
+    '''
+    from src.statswing_rank import ranking_engine, rank_aggregates
+    from src.statswing_utils import get_dataset_column
+    stat_col = get_dataset_column(stat_name)
+    if _partitioned(store):
+        return rank_aggregates(store.range_aggregates(start_season, end_season, [stat_col])).top(stat_col, k)
+    return ranking_engine(store).top(stat_col, start_season, end_season, k)
+
+@memoized
+def similar_players(store: 'PlayerStore', name: str, start_season: int, end_season: int, k: int = 10):
+    '''
+
+    Returns the k other players' seasons whose profile is closest to the player's aggregate over a
+    season range, nearest first, or None if the player has no rows in the range
+
+    '''
+    from src.statswing_similar import similarity_engine
+    return similarity_engine(store).similar_to_player(name, start_season, end_season, k)
+
+@memoized
+def compare_players(store: 'PlayerStore', names: list, start_season: int, end_season: int) -> 'pd.DataFrame':
+    '''
+
+    Returns several players' aggregated stats over a season range, one row per player (dataset
+    columns, in the order given); players with no rows in the range are left out
+
+    '''
+    from src.statswing_utils import aggregate_players
+    if _partitioned(store):
+        aggregates = store.range_aggregates(start_season, end_season, names = list(names))
+        return aggregates.reindex([name for name in dict.fromkeys(names) if name in aggregates.index])
+    return aggregate_players(store, names, start_season, end_season)
+
+@memoized
+def career_comparison(store: 'PlayerStore', name: str, stats_columns: list = CAREER_STATS) -> list:
+    '''
+
+    Returns (stat, player career value, Career Average value) rows, or an empty list if either
+    career row is missing
+
+    '''
+    player_stats = store.career_row(name)
+    career_averages = store.career_row('Career Average')
+    if player_stats is None or career_averages is None:
+        return []
+    return [(stat, player_stats[stat], career_averages[stat]) for stat in stats_columns]
+
+@memoized
+def latest_season_stats(store: 'PlayerStore', name: str, stats_columns: list):
+    '''
+
+    Returns the given stats from a player's most recent season row, or None if they aren't found
+
+    '''
+    row = store.latest_season_row(name)
+    if row is None:
+        return None
+    return row[stats_columns].fillna(0).astype(float)
+
+@memoized
+def player_trend(store: 'PlayerStore', name: str, stat_name: str, window: int = 3):
+    '''
+
+    Returns a player's season-by-season trend in a stat (display name): the value, change from
+    the previous season, rolling window-season aggregate, league average and percentage of it,
+    or None if the player has no seasons
+
+    '''
+    from src.statswing_trends import trend_engine
+    from src.statswing_utils import get_dataset_column
+    return trend_engine(store).player_trend(name, get_dataset_column(stat_name), window)
+
+@memoized
+def aging_curve(store: 'PlayerStore', stat_name: str) -> 'pd.DataFrame':
+    '''
+
+    Returns the league aging curve of a stat (display name) by season index
+
+    '''
+    from src.statswing_trends import trend_engine
+    from src.statswing_utils import get_dataset_column
+    return trend_engine(store).aging_curve(get_dataset_column(stat_name))
@@ -0,0 +1,164 @@
+import threading
+import weakref
+from collections import OrderedDict
+import numpy as np
+import pandas as pd
+from src.config import LOWER_IS_BETTER
+from src.statswing_store import PlayerStore, is_average_row
+from src.statswing_utils import aggregate_seasons
+
+DEFAULT_TOP_K = 25
+# Multi-season ranges are sorted on first use; this many are kept
+MAX_CACHED_RANGES = 16
+
+class RankedRange:
+    '''
+
+    Every player's aggregates over one season range, with each stat's values kept sorted
+
+    '''
+    def __init__(self, aggregates: pd.DataFrame):
+        self.names = aggregates.index.to_numpy(dtype = object)
+        self.row = {name: i for i, name in enumerate(self.names)}
+        self.stats = list(aggregates.columns)
+        self.stat_index = {stat: i for i, stat in enumerate(self.stats)}
+        self.values = aggregates.to_numpy(dtype = np.float64)
+        # NaN sorts to the end; each column's count of real values bounds its searches
+        self.sorted_values = np.sort(self.values, axis = 0)
+        self.counts = np.count_nonzero(~np.isnan(self.values), axis = 0)
+
+    def percentile(self, name: str, stat: str):
+        '''
+
+        Returns (value, percentile, rank, population) for a player, or None if they have no value;
+        percentile is the share of players below (ties count half), flipped for LOWER_IS_BETTER
+
+        '''
+        row, col = self.row.get(name), self.stat_index[stat]
+        if row is None or np.isnan(self.values[row, col]):
+            return None
+        value = self.values[row, col]
+        n = int(self.counts[col])
+        column = self.sorted_values[:n, col]
+        below = int(np.searchsorted(column, value, side = 'left'))
+        above = n - int(np.searchsorted(column, value, side = 'right'))
+        if stat in LOWER_IS_BETTER:
+            below, above = above, below
+        ties = n - below - above
+        return value, (below + ties / 2) / n * 100, above + 1, n
+
+    def percentiles(self, name: str) -> pd.Series:
+        '''
+
+        Returns a player's percentile for every stat (NaN where they have no value)
+
+        '''
+        results = [self.percentile(name, stat) for stat in self.stats]
+        return pd.Series([np.nan if result is None else result[1] for result in results], index = self.stats)
+
+    def top(self, stat: str, k: int, min_pa: float = 0) -> pd.DataFrame:
+        '''
+
+        Returns the k best players for a stat, best first, via argpartition instead of a full sort
+
+        '''
+        col = self.stat_index[stat]
+        values = self.values[:, col]
+        eligible = ~np.isnan(values)
+        if min_pa and 'PA' in self.stat_index:
+            eligible &= self.values[:, self.stat_index['PA']] >= min_pa
+        candidates = np.flatnonzero(eligible)
+        keys = values[candidates] if stat in LOWER_IS_BETTER else -values[candidates]
+        k = min(k, len(candidates))
+        if k == 0:
+            return pd.DataFrame({'Rank': [], 'Name': [], stat: []})
+        if k < len(candidates):
+            part = np.argpartition(keys, k - 1)[:k]
+            candidates, keys = candidates[part], keys[part]
+        best = candidates[np.lexsort((self.names[candidates].astype(str), keys))]
+        return pd.DataFrame({'Rank': np.arange(1, k + 1), 'Name': self.names[best], stat: values[best]})
+
+def rank_aggregates(aggregates: pd.DataFrame) -> RankedRange:
+    '''
+
+    Ranks per-player range aggregates (as from aggregate_seasons), leaving out the average rows
+
+    '''
+    return RankedRange(aggregates[~is_average_row(aggregates.index.to_series())])
+
+class RankingEngine:
+    '''
+
+    Percentile ranks and top-k leaderboards per season (or season range) and stat
+
+    Single seasons are ranked up front from the store's season cube; ranges are aggregated and
+    ranked on first use and kept in a small LRU. Average rows are never ranked. The engine
+    rebuilds itself when the store's version changes (after an upsert)
+
+    '''
+    def __init__(self, store: PlayerStore):
+        self.store = store
+        self._lock = threading.Lock()
+        self._build()
+
+    def _build(self) -> None:
+        self.version = self.store.version
+        cube = self.store.cube
+        self._ranges = OrderedDict()
+        self.seasons = {
+            season: self._rank(season, season)
+            for season in range(cube.first_season, cube.last_season + 1)
+            if cube.active_player_count(season, season)
+        }
+
+    def _rank(self, start_season: int, end_season: int) -> RankedRange:
+        return rank_aggregates(aggregate_seasons(self.store, start_season, end_season))
+
+    def ranked(self, start_season: int, end_season: int) -> RankedRange:
+        '''
+
+        Returns the ranked aggregates for a season range
+
+        '''
+        with self._lock:
+            if self.version != self.store.version:
+                self._build()
+            if start_season == end_season and start_season in self.seasons:
+                return self.seasons[start_season]
+            key = (start_season, end_season)
+            ranked = self._ranges.get(key)
+            if ranked is None:
+                ranked = self._ranges[key] = self._rank(start_season, end_season)
+                while len(self._ranges) > MAX_CACHED_RANGES:
+                    self._ranges.popitem(last = False)
+            self._ranges.move_to_end(key)
+            return ranked
+
+    def percentile(self, name: str, stat: str, start_season: int, end_season: int = None):
+        return self.ranked(start_season, start_season if end_season is None else end_season).percentile(name, stat)
+
+    def percentiles(self, name: str, start_season: int, end_season: int) -> pd.Series:
+        '''
+
+        Returns a player's percentile for every stat over a season range (NaN where they have none)
+
+        '''
+        return self.ranked(start_season, end_season).percentiles(name)
+
+    def top(self, stat: str, start_season: int, end_season: int, k: int = DEFAULT_TOP_K, min_pa: float = 0) -> pd.DataFrame:
+        return self.ranked(start_season, end_season).top(stat, k, min_pa)
+
+_engines = weakref.WeakKeyDictionary()
+_engines_lock = threading.Lock()
+
+def ranking_engine(store: PlayerStore) -> RankingEngine:
+    '''
+
+    Returns the store's RankingEngine, building it on first use
+
+    '''
+    with _engines_lock:
+        engine = _engines.get(store)
+        if engine is None:
+            engine = _engines[store] = RankingEngine(store)
+        return engine
@@ -0,0 +1,273 @@
+import argparse
+import multiprocessing
+import os
+import re
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+import numpy as np
+import pandas as pd
+from src.config import TEAM_NAME_MAPPING, COMPARE_STAT_GROUPS, STAT_MAPPING
+
+FORMATS = ['pdf', 'png']
+# Roster columns on a team sheet
+TEAM_SHEET_STATS = ['G', 'PA', 'HR', 'R', 'RBI', 'SB', 'AVG', 'OBP', 'SLG', 'wOBA', 'wRC+', 'WAR']
+# Reports handed to a worker at a time; large enough to amortize the round trip, small enough to balance
+TASK_CHUNKSIZE = 16
+ALIGNMENT = 8
+
+def share_frame(data: pd.DataFrame) -> tuple:
+    '''
+
+    Copies a frame's columns into one shared memory block; returns (block, layout)
+
+    The layout is small and picklable: it names the block and gives each column's offset and
+    dtype (string and categorical columns travel as int32 codes plus their categories, as in
+    the columnar cache). The caller owns the block and must close and unlink it
+
+    '''
+    columns = []
+    arrays = []
+    offset = 0
+    for name in data.columns:
+        series = data[name]
+        column = {'name': name, 'dtype': str(series.dtype)}
+        if isinstance(series.dtype, pd.CategoricalDtype):
+            column['categories'] = list(series.cat.categories)
+            values = series.cat.codes.to_numpy(dtype = np.int32)
+        elif series.dtype.kind in 'biuf':
+            values = series.to_numpy()
+        else:
+            codes, categories = pd.factorize(series)
+            column['categories'] = list(categories)
+            values = codes.astype(np.int32)
+        column.update({'offset': offset, 'values_dtype': values.dtype.str, 'length': len(values)})
+        offset += -(-values.nbytes // ALIGNMENT) * ALIGNMENT
+        columns.append(column)
+        arrays.append(values)
+
+    block = shared_memory.SharedMemory(create = True, size = max(offset, 1))
+    for column, values in zip(columns, arrays):
+        np.ndarray(len(values), dtype = values.dtype, buffer = block.buf, offset = column['offset'])[:] = values
+    return block, {'name': block.name, 'columns': columns}
+
+def attach_frame(layout: dict) -> tuple:
+    '''
+
+    Maps a frame shared by share_frame without copying its numeric columns; returns (block, frame)
+
+    The frame's arrays point into the block, so the block must stay open while the frame is used
+
+    '''
+    block = shared_memory.SharedMemory(name = layout['name'])
+    columns = {}
+    for column in layout['columns']:
+        values = np.ndarray(column['length'], dtype = np.dtype(column['values_dtype']), buffer = block.buf, offset = column['offset'])
+        values.flags.writeable = False
+        if 'categories' in column:
+            values = pd.Categorical.from_codes(values, column['categories'])
+            values = values if column['dtype'] == 'category' else np.asarray(values, dtype = object)
+        columns[column['name']] = values
+    return block, pd.DataFrame(columns, copy = False)
+
+def report_slug(name: str) -> str:
+    return re.sub(r'[^\w-]+', '_', name).strip('_')
+
+class ReportRenderer:
+    '''
+
+    Draws player and team sheets off screen, reusing one set of figures for every report
+
+    The comparison page is the Compare Players layout (statswing_charts.CompareChart), with the
+    league's average row for the same season as the second bar; the second page is a stats
+    table. Both figures are built once per process and only their data changes per report
+
+    '''
+    def __init__(self, store, output_dir: str, fmt: str = 'pdf'):
+        from matplotlib.backends.backend_agg import FigureCanvasAgg
+        from matplotlib.figure import Figure
+        from src.statswing_charts import CompareChart
+
+        self.store = store
+        self.output_dir = output_dir
+        self.fmt = fmt
+        self.compare_stats = [stat for group in COMPARE_STAT_GROUPS.values() for stat in group]
+
+        self.compare_figure = Figure(figsize = (12, 10))
+        FigureCanvasAgg(self.compare_figure)
+        self.compare_chart = CompareChart(self.compare_figure)
+        self.title = self.compare_figure.suptitle('', x = 0.02, ha = 'left', fontsize = 14)
+
+        self.table_figure = Figure(figsize = (12, 10))
+        FigureCanvasAgg(self.table_figure)
+        self.table_ax = self.table_figure.add_subplot(111)
+        self.table_title = self.table_figure.suptitle('', x = 0.02, ha = 'left', fontsize = 14)
+
+    def _season_stats(self, rows: pd.DataFrame, season: int) -> tuple:
+        from src.statswing_store import average_row_name
+        league = self.store.data.iloc[self.store.row_position(average_row_name(season), season)]
+        return rows[self.compare_stats].astype(float).mean().fillna(0), league[self.compare_stats].astype(float).fillna(0)
+
+    def _draw_table(self, title: str, headers: list, rows: list) -> None:
+        self.table_ax.clear()
+        self.table_ax.axis('off')
+        self.table_title.set_text(title)
+        if rows:
+            table = self.table_ax.table(cellText = rows, colLabels = headers, loc = 'upper center', cellLoc = 'center')
+            table.auto_set_font_size(False)
+            table.set_fontsize(9 if len(headers) > 6 else 11)
+            table.scale(1, 1.4)
+            table.auto_set_column_width(0)
+
+    def _write(self, slug: str) -> list:
+        base = os.path.join(self.output_dir, slug)
+        if self.fmt == 'pdf':
+            from matplotlib.backends.backend_pdf import PdfPages
+            with PdfPages(f'{base}.pdf') as pdf:
+                pdf.savefig(self.compare_figure)
+                pdf.savefig(self.table_figure)
+            return [f'{base}.pdf']
+        self.compare_figure.savefig(f'{base}_compare.png')
+        self.table_figure.savefig(f'{base}_sheet.png')
+        return [f'{base}_compare.png', f'{base}_sheet.png']
+
+    def player_report(self, name: str) -> list:
+        '''
+
+        Writes a player's latest-season comparison against the league average and their career
+        sheet; returns the files written (none if the player has no season rows)
+
+        '''
+        from src.statswing_query import career_comparison
+        from src.statswing_models import format_value
+        from src.statswing_store import average_row_name
+
+        row = self.store.latest_season_row(name)
+        if row is None or row['Season Year'] == 0:
+            return []
+        season = int(row['Season Year'])
+        player_stats, league_stats = self._season_stats(row.to_frame().T, season)
+        self.compare_chart.set_data((name, average_row_name(season)), [player_stats, league_stats])
+        self.title.set_text(f'{name} ({row["Team"]}), {season}')
+
+        career = career_comparison(self.store, name)
+        self._draw_table(
+            f'{name}: career vs. career average',
+            ['Statistic', 'Player', 'Career Avg'],
+            [[STAT_MAPPING.get(stat, stat), format_value(float(value)), format_value(float(average))] for stat, value, average in career]
+        )
+        return self._write(f'player_{report_slug(name)}')
+
+    def team_report(self, team: str) -> list:
+        '''
+
+        Writes a team's latest-season comparison (its hitters' mean against the league average
+        row) and a roster sheet; returns the files written
+
+        '''
+        from src.statswing_models import format_value
+        from src.statswing_store import average_row_name, is_average_row
+
+        seasons = self.store.data['Season Year']
+        team_rows = self.store.data[(self.store.data['Team'] == team) & (seasons != 0)]
+        if team_rows.empty:
+            return []
+        season = int(team_rows['Season Year'].max())
+        roster = team_rows[team_rows['Season Year'] == season]
+        roster = roster[~is_average_row(roster['Name'])].sort_values('PA', ascending = False)
+
+        team_name = TEAM_NAME_MAPPING.get(team, team)
+        team_stats, league_stats = self._season_stats(roster, season)
+        self.compare_chart.set_data((f'{team_name} (mean)', average_row_name(season)), [team_stats, league_stats])
+        self.title.set_text(f'{team_name}, {season}')
+
+        self._draw_table(
+            f'{team_name} hitters, {season}',
+            ['Player'] + TEAM_SHEET_STATS,
+            [[name] + [format_value(value) for value in values] for name, values in zip(roster['Name'].astype(str), roster[TEAM_SHEET_STATS].astype(float).to_numpy())]
+        )
+        return self._write(f'team_{report_slug(team)}')
+
+# Per-process state, set up once by _init_worker
+_worker = {}
+
+def _init_worker(layout: dict, output_dir: str, fmt: str) -> None:
+    import matplotlib
+    matplotlib.use('Agg')
+    from src.statswing_store import PlayerStore
+
+    block, data = attach_frame(layout)
+    # The block stays attached for the worker's lifetime; the parent unlinks it
+    _worker['block'] = block
+    _worker['renderer'] = ReportRenderer(PlayerStore(data), output_dir, fmt)
+
+def _render(task: tuple) -> int:
+    kind, name = task
+    renderer = _worker['renderer']
+    try:
+        files = renderer.player_report(name) if kind == 'player' else renderer.team_report(name)
+    except Exception as e:
+        print(f'Error: {kind} report for {name} failed: {e}', file = sys.stderr)
+        return 0
+    return 1 if files else 0
+
+def report_tasks(store, players: list = None, teams: list = None) -> list:
+    '''
+
+    Lists (kind, name) tasks: every player and every team unless the lists are given
+
+    '''
+    from src.statswing_store import is_average_row
+    if players is None:
+        players = [name for name in store.player_names if not is_average_row(pd.Series([name])).iloc[0]]
+    if teams is None:
+        teams = [team for team in store.teams if team in TEAM_NAME_MAPPING]
+    return [('player', name) for name in players] + [('team', team) for team in teams]
+
+def run_reports(store, output_dir: str, fmt: str = 'pdf', workers: int = None, players: list = None, teams: list = None) -> dict:
+    '''
+
+    Renders every report across a process pool and returns counts, elapsed time and reports/s
+
+    The store's data is placed in shared memory once; each worker maps it, indexes it and
+    renders its share of the tasks, so nothing but (kind, name) pairs is pickled per task
+
+    '''
+    os.makedirs(output_dir, exist_ok = True)
+    tasks = report_tasks(store, players, teams)
+    workers = workers or os.cpu_count() or 1
+
+    start = time.perf_counter()
+    block, layout = share_frame(store.data)
+    try:
+        # spawn keeps workers independent of whatever the parent has loaded (Qt, threads)
+        context = multiprocessing.get_context('spawn')
+        with ProcessPoolExecutor(workers, mp_context = context, initializer = _init_worker, initargs = (layout, output_dir, fmt)) as pool:
+            written = sum(pool.map(_render, tasks, chunksize = TASK_CHUNKSIZE))
+    finally:
+        block.close()
+        block.unlink()
+    elapsed = time.perf_counter() - start
+    return {
+        'tasks': len(tasks),
+        'reports': written,
+        'workers': workers,
+        'seconds': elapsed,
+        'reports_per_second': written / elapsed if elapsed > 0 else float('inf')
+    }
+
+if __name__ == '__main__':
+    from src.statswing_query import DEFAULT_DATA_PATH, load
+    parser = argparse.ArgumentParser(description = 'Render comparison and career/roster sheets for every player and team without a display')
+    parser.add_argument('-d', '--data', default = DEFAULT_DATA_PATH, help = 'player data CSV')
+    parser.add_argument('-o', '--output-dir', default = 'reports', help = 'where to write the reports')
+    parser.add_argument('--format', choices = FORMATS, default = 'pdf', help = 'one two-page PDF per report, or two PNGs')
+    parser.add_argument('-j', '--workers', type = int, help = 'worker processes (default: one per CPU)')
+    parser.add_argument('--players', nargs = '*', help = 'only these players (none for no player reports)')
+    parser.add_argument('--teams', nargs = '*', help = 'only these team abbreviations (none for no team reports)')
+    args = parser.parse_args()
+
+    summary = run_reports(load(args.data), args.output_dir, args.format, args.workers, args.players, args.teams)
+    print(f"{summary['reports']:,} of {summary['tasks']:,} reports in {summary['seconds']:.1f}s with {summary['workers']} worker(s) "
+          f"({summary['reports_per_second']:.1f} reports/s) -> {args.output_dir}")
@@ -0,0 +1,73 @@
+from contextlib import contextmanager
+from PyQt5.QtCore import QObject, QTimer, QSignalBlocker
+
+class UpdateScheduler(QObject):
+    '''
+
+    Coalesces view refreshes so each one runs at most once per event-loop turn
+
+    Slots call request() with a key for the view they want refreshed instead of refreshing it
+    directly; repeated requests for the same key before the next turn are dropped and counted
+
+    '''
+    def __init__(self, parent: QObject = None):
+        super().__init__(parent)
+        self._pending = {}
+        self._timer = QTimer(self)
+        self._timer.setSingleShot(True)
+        self._timer.setInterval(0)
+        self._timer.timeout.connect(self.flush)
+        self.requested = 0
+        self.run = 0
+        self.skipped = 0
+
+    def request(self, key: str, callback) -> None:
+        '''
+
+        Schedules callback to run on the next event-loop turn, replacing any pending one for key
+
+        '''
+        self.requested += 1
+        if key in self._pending:
+            self.skipped += 1
+        self._pending[key] = callback
+        if not self._timer.isActive():
+            self._timer.start()
+
+    def flush(self) -> None:
+        '''
+
+        Runs every pending refresh now (normally called by the timer)
+
+        '''
+        self._timer.stop()
+        pending, self._pending = self._pending, {}
+        for callback in pending.values():
+            self.run += 1
+            callback()
+
+    def is_pending(self, key: str) -> bool:
+        return key in self._pending
+
+    def stats(self) -> dict:
+        '''
+
+        Returns how many refreshes were requested, actually run and skipped as redundant
+
+        '''
+        return {'requested': self.requested, 'run': self.run, 'skipped': self.skipped}
+
+    @staticmethod
+    @contextmanager
+    def blocked(*widgets):
+        '''
+
+        Suppresses the signals of the given widgets while they're being refilled
+
+        '''
+        blockers = [QSignalBlocker(widget) for widget in widgets]
+        try:
+            yield
+        finally:
+            for blocker in blockers:
+                blocker.unblock()
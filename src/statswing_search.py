@@ -0,0 +1,168 @@
+import bisect
+import re
+import unicodedata
+import numpy as np
+
+DEFAULT_LIMIT = 10
+NAME_SUFFIXES = {'jr', 'sr', 'ii', 'iii', 'iv', 'v'}
+# Fuzzy matches must share at least this fraction of trigrams (Jaccard) with the query
+MIN_FUZZY_SCORE = 0.2
+# Trigrams in more than this share of names only score candidates, they don't generate them
+RARE_POSTING_FRACTION = 0.002
+MIN_RARE_POSTING = 64
+
+def normalize_name(name: str) -> str:
+    '''
+
+    Folds a name for matching: no accents, lower case, no punctuation and no suffixes like Jr.
+
+    '''
+    text = unicodedata.normalize('NFKD', str(name))
+    text = ''.join(ch for ch in text if not unicodedata.combining(ch)).lower()
+    text = re.sub(r"[.'’]", '', text)
+    text = re.sub(r'[^a-z0-9]+', ' ', text)
+    return ' '.join(word for word in text.split() if word not in NAME_SUFFIXES)
+
+def trigrams(text: str) -> set:
+    '''
+
+    Returns the character trigrams of a normalized name, padded so word starts count extra
+
+    '''
+    padded = f'  {text} '
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+class PlayerSearchIndex:
+    '''
+
+    Type-ahead index over player names, built once
+
+    Prefix matches come from two sorted key arrays searched with bisect: whole names first
+    ('aar' -> Aaron Judge), then later words ('jud' -> Aaron Judge). If those don't fill the
+    result, a trigram index supplies typo-tolerant matches ('aron jugde'), scored by trigram
+    overlap. Names and queries are compared after normalize_name, so 'acuna' finds Acuña and
+    'bobby witt' finds Bobby Witt Jr.
+
+    '''
+    def __init__(self, names: list = ()):
+        self.names = []
+        self._ids = {}
+        self._full_keys = []
+        self._full_ids = []
+        self._word_keys = []
+        self._word_ids = []
+        self._postings = {}
+        self._trigram_counts = []
+        self._arrays = {}
+        self._counts_array = np.empty(0, dtype = np.float32)
+        self.add(names)
+
+    def add(self, names: list) -> None:
+        '''
+
+        Adds names not yet in the index (e.g. players merged in by an upsert)
+
+        '''
+        full, words = [], []
+        for name in names:
+            if name in self._ids:
+                continue
+            name_id = self._ids[name] = len(self.names)
+            self.names.append(name)
+            key = normalize_name(name)
+            full.append((key, name_id))
+            # Every later word start is a key too, so surnames match as prefixes
+            for match in re.finditer(r' ', key):
+                words.append((key[match.end():], name_id))
+            grams = trigrams(key)
+            self._trigram_counts.append(len(grams))
+            for gram in grams:
+                self._postings.setdefault(gram, []).append(name_id)
+        if not full:
+            return
+
+        for keys, ids, new in ((self._full_keys, self._full_ids, full), (self._word_keys, self._word_ids, words)):
+            merged = sorted(list(zip(keys, ids)) + new)
+            keys[:] = [key for key, _ in merged]
+            ids[:] = [name_id for _, name_id in merged]
+        # Postings are frozen into arrays here so no keystroke pays for it
+        self._arrays = {gram: np.asarray(ids, dtype = np.int32) for gram, ids in self._postings.items()}
+        self._counts_array = np.asarray(self._trigram_counts, dtype = np.float32)
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def _prefix_ids(self, keys: list, ids: list, prefix: str, limit: int, seen: set) -> list:
+        found = []
+        i = bisect.bisect_left(keys, prefix)
+        while i < len(keys) and len(found) < limit and keys[i].startswith(prefix):
+            name_id = ids[i]
+            if name_id not in seen:
+                seen.add(name_id)
+                found.append(name_id)
+            i += 1
+        return found
+
+    def prefix(self, query: str, limit: int = DEFAULT_LIMIT) -> list:
+        '''
+
+        Returns up to limit names whose full name, or any later word, starts with query
+
+        '''
+        prefix = normalize_name(query)
+        if not prefix:
+            return []
+        seen = set()
+        found = self._prefix_ids(self._full_keys, self._full_ids, prefix, limit, seen)
+        found += self._prefix_ids(self._word_keys, self._word_ids, prefix, limit - len(found), seen)
+        return [self.names[name_id] for name_id in found]
+
+    def fuzzy(self, query: str, limit: int = DEFAULT_LIMIT, exclude: set = frozenset()) -> list:
+        '''
+
+        Returns up to limit names ranked by trigram overlap with query, best first
+
+        '''
+        all_grams = trigrams(normalize_name(query))
+        query_grams = [gram for gram in all_grams if gram in self._arrays]
+        if not query_grams:
+            return []
+
+        # Candidates come from the rarer trigrams only; a common one such as ' ma' would drag in
+        # a large share of the index while adding little to any score
+        postings = sorted((self._arrays[gram] for gram in query_grams), key = len)
+        rare_limit = max(RARE_POSTING_FRACTION * len(self.names), MIN_RARE_POSTING)
+        n_rare = max(sum(len(posting) <= rare_limit for posting in postings), 1)
+
+        # Runs in the sorted rare postings give each candidate's hit count directly
+        hits = np.sort(np.concatenate(postings[:n_rare]))
+        starts = np.flatnonzero(np.concatenate(([True], hits[1:] != hits[:-1])))
+        candidates = hits[starts]
+        shared = np.diff(np.append(starts, len(hits))).astype(np.float32)
+
+        # Posting lists are in ascending id order, so the common ones are checked by binary search
+        for posting in postings[n_rare:]:
+            position = np.minimum(np.searchsorted(posting, candidates), len(posting) - 1)
+            shared += posting[position] == candidates
+        scores = shared / (len(all_grams) + self._counts_array[candidates] - shared)
+
+        keep = scores >= MIN_FUZZY_SCORE
+        candidates, scores = candidates[keep], scores[keep]
+        wanted = min(limit + len(exclude), len(candidates))
+        if wanted < len(candidates):
+            top = np.argpartition(-scores, wanted - 1)[:wanted]
+            candidates, scores = candidates[top], scores[top]
+        order = np.lexsort((candidates, -scores))
+        names = [self.names[name_id] for name_id in candidates[order] if self.names[name_id] not in exclude]
+        return names[:limit]
+
+    def search(self, query: str, limit: int = DEFAULT_LIMIT) -> list:
+        '''
+
+        Returns up to limit names for a partly typed query: prefix matches, then fuzzy ones
+
+        '''
+        found = self.prefix(query, limit)
+        if len(found) < limit:
+            found += self.fuzzy(query, limit - len(found), exclude = set(found))
+        return found
@@ -0,0 +1,380 @@
+import argparse
+import asyncio
+import hashlib
+import json
+import math
+import sys
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit, parse_qsl
+from src import statswing_query as query
+from src.statswing_memo import result_cache
+
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_PORT = 8765
+DEFAULT_CACHE_ENTRIES = 4096
+DEFAULT_CACHE_BYTES = 64 * 2**20
+# Queries run on a few threads so a slow one never stalls the connections waiting on the event loop
+DEFAULT_QUERY_THREADS = 4
+# Pending connections the listening socket will queue
+BACKLOG = 1024
+MAX_HEADER_BYTES = 16 * 1024
+# Stats are stored as float32, which only carries about 7 significant digits; rounding there
+# keeps values like 18.9 from coming out as 18.899999618530273
+JSON_SIGNIFICANT_DIGITS = 7
+
+STATUS_TEXT = {200: 'OK', 304: 'Not Modified', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed', 500: 'Internal Server Error'}
+
+class ServiceError(Exception):
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+
+def to_json(value):
+    '''
+
+    Converts query results (Series, frames, NumPy scalars, NaN) into plain JSON values
+
+    '''
+    import numpy as np
+    import pandas as pd
+    if isinstance(value, pd.DataFrame):
+        return [{col: to_json(v) for col, v in row.items()} for row in value.to_dict('records')]
+    if isinstance(value, pd.Series):
+        return {str(key): to_json(v) for key, v in value.items()}
+    if isinstance(value, dict):
+        return {str(key): to_json(v) for key, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [to_json(v) for v in value]
+    if isinstance(value, np.generic):
+        value = value.item()
+    if isinstance(value, float):
+        return float(f'{value:.{JSON_SIGNIFICANT_DIGITS}g}') if math.isfinite(value) else None
+    return value
+
+class ResponseCache:
+    '''
+
+    LRU cache of encoded responses, bounded by entry count and total body size
+
+    '''
+    def __init__(self, max_entries: int = DEFAULT_CACHE_ENTRIES, max_bytes: int = DEFAULT_CACHE_BYTES):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key):
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry
+
+    def put(self, key, entry: tuple) -> None:
+        if key in self._entries:
+            self.bytes -= len(self._entries.pop(key)[2])
+        self._entries[key] = entry
+        self.bytes += len(entry[2])
+        while len(self._entries) > self.max_entries or (self.bytes > self.max_bytes and len(self._entries) > 1):
+            _, (_, _, body) = self._entries.popitem(last = False)
+            self.bytes -= len(body)
+            self.evictions += 1
+
+    def stats(self) -> dict:
+        return {'entries': len(self._entries), 'bytes': self.bytes, 'hits': self.hits, 'misses': self.misses, 'evictions': self.evictions}
+
+class StatsService:
+    '''
+
+    Local HTTP/JSON front end to the query layer (statswing_query)
+
+    Each endpoint declares its parameters; a request's parameters are parsed into canonical
+    values (ints, dataset stat columns, trimmed names, defaults filled in, unknown ones dropped)
+    and that normalized form plus the store version is the cache key, so equivalent URLs share
+    one entry and a merge into the store invalidates everything. Responses carry a strong ETag
+    (a hash of the body) and If-None-Match gets a 304. Identical requests that arrive while
+    the first is still being computed wait for it instead of repeating the work
+
+    '''
+    def __init__(self, store, cache_entries: int = DEFAULT_CACHE_ENTRIES, cache_bytes: int = DEFAULT_CACHE_BYTES, query_threads: int = DEFAULT_QUERY_THREADS):
+        from src.statswing_search import PlayerSearchIndex
+        self.store = store
+        self.search_index = PlayerSearchIndex(store.player_names)
+        self.cache = ResponseCache(cache_entries, cache_bytes)
+        self.executor = ThreadPoolExecutor(query_threads, thread_name_prefix = 'statswing-query')
+        self._in_flight = {}
+        self._search_version = store.version
+        self.requests = 0
+        self.not_modified = 0
+        self.coalesced = 0
+        self.started = time.time()
+
+        # path: (handler, {param: (kind, required)})
+        self.endpoints = {
+            '/health': (self.health, {}),
+            '/players': (self.players, {'team': ('text', False)}),
+            '/search': (self.search, {'q': ('text', True), 'limit': ('int', False)}),
+            '/player': (self.player, {'name': ('player', True)}),
+            '/range': (self.range_stats, {'name': ('player', True), 'start': ('int', False), 'end': ('int', False)}),
+            '/career': (self.career, {'name': ('player', True)}),
+            '/compare': (self.compare, {'a': ('player', True), 'b': ('player', True), 'start': ('int', False), 'end': ('int', False)}),
+            '/league': (self.league, {'name': ('player', True), 'stat': ('stat', True), 'start': ('int', False), 'end': ('int', False)}),
+            '/leaderboard': (self.leaderboard, {'stat': ('stat', True), 'start': ('int', False), 'end': ('int', False), 'k': ('int', False)}),
+            '/similar': (self.similar, {'name': ('player', True), 'start': ('int', False), 'end': ('int', False), 'k': ('int', False)})
+        }
+
+    # Parameters
+
+    def normalize(self, path: str, raw: dict) -> dict:
+        '''
+
+        Parses a request's parameters into the canonical values its endpoint takes
+
+        '''
+        from src.statswing_utils import get_dataset_column
+        _, spec = self.endpoints[path]
+        params = {}
+        for name, (kind, required) in spec.items():
+            value = raw.get(name, '').strip()
+            if not value:
+                if required:
+                    raise ServiceError(400, f'missing parameter {name!r}')
+                continue
+            if kind == 'int':
+                try:
+                    params[name] = int(value)
+                except ValueError:
+                    raise ServiceError(400, f'parameter {name!r} must be an integer')
+            elif kind == 'stat':
+                column = get_dataset_column(value)
+                if column not in self.store.cube.stat_index:
+                    raise ServiceError(400, f'unknown stat {value!r}')
+                params[name] = column
+            elif kind == 'player':
+                if value not in self.store.name_ranges:
+                    raise ServiceError(404, f'unknown player {value!r}')
+                params[name] = value
+            else:
+                params[name] = value
+
+        cube = self.store.cube
+        if 'start' in spec:
+            params.setdefault('start', cube.first_season)
+            params.setdefault('end', cube.last_season)
+            if params['start'] > params['end']:
+                raise ServiceError(400, 'start must not be after end')
+        return params
+
+    # Endpoints; each runs on a query thread and returns JSON-ready values
+
+    def health(self) -> dict:
+        return {
+            'version': self.store.version,
+            'players': len(self.store.player_names),
+            'seasons': [self.store.cube.first_season, self.store.cube.last_season],
+            'uptime_s': time.time() - self.started,
+            'requests': self.requests,
+            'not_modified': self.not_modified,
+            'coalesced': self.coalesced,
+            'cache': self.cache.stats(),
+            'results': result_cache(self.store).stats()
+        }
+
+    def players(self, team: str = 'All Teams') -> dict:
+        return {'team': team, 'players': query.players_for_team(self.store, team)}
+
+    def search(self, q: str, limit: int = 10) -> dict:
+        if self._search_version != self.store.version:
+            self.search_index.add(self.store.player_names)
+            self._search_version = self.store.version
+        return {'query': q, 'players': self.search_index.search(q, max(1, min(limit, 100)))}
+
+    def player(self, name: str) -> dict:
+        latest = self.store.latest_season_row(name)
+        return {
+            'name': name,
+            'seasons': query.player_seasons(self.store, name),
+            'team': str(latest['Team']),
+            'latest': to_json(latest.drop(['Name', 'Team']))
+        }
+
+    def range_stats(self, name: str, start: int, end: int) -> dict:
+        stats = query.season_range_stats(self.store, name, start, end)
+        if stats is None:
+            raise ServiceError(404, f'{name} has no seasons between {start} and {end}')
+        return {'name': name, 'start': start, 'end': end, 'stats': to_json(stats), 'percentiles': to_json(query.percentile_ranks(self.store, name, start, end))}
+
+    def career(self, name: str) -> dict:
+        rows = query.career_comparison(self.store, name)
+        if not rows:
+            raise ServiceError(404, f'no career row for {name}')
+        return {'name': name, 'stats': [{'stat': stat, 'player': to_json(value), 'career_average': to_json(average)} for stat, value, average in rows]}
+
+    def compare(self, a: str, b: str, start: int, end: int) -> dict:
+        stats = [query.season_range_stats(self.store, name, start, end) for name in (a, b)]
+        return {
+            'start': start,
+            'end': end,
+            'players': [{'name': name, 'stats': to_json(values)} for name, values in zip((a, b), stats)]
+        }
+
+    def league(self, name: str, stat: str, start: int, end: int) -> dict:
+        from src.config import STAT_MAPPING
+        if self.store.cube.player_row_count(name, start, end) == 0:
+            raise ServiceError(404, f'{name} has no seasons between {start} and {end}')
+        return {'name': name, 'stat': STAT_MAPPING.get(stat, stat), 'start': start, 'end': end, **to_json(query.league_comparison(self.store, name, stat, start, end))}
+
+    def leaderboard(self, stat: str, start: int, end: int, k: int = 25) -> dict:
+        from src.config import STAT_MAPPING
+        leaders = query.leaderboard(self.store, stat, start, end, max(1, min(k, 500)))
+        return {'stat': STAT_MAPPING.get(stat, stat), 'start': start, 'end': end, 'leaders': to_json(leaders.rename(columns = {stat: 'Value'}))}
+
+    def similar(self, name: str, start: int, end: int, k: int = 10) -> dict:
+        neighbors = query.similar_players(self.store, name, start, end, max(1, min(k, 100)))
+        if neighbors is None:
+            raise ServiceError(404, f'{name} has no seasons between {start} and {end}')
+        return {'name': name, 'start': start, 'end': end, 'neighbors': to_json(neighbors)}
+
+    # Request handling
+
+    async def respond(self, path: str, raw: dict) -> tuple:
+        '''
+
+        Returns (status, etag, body) for a request, from the cache when possible
+
+        '''
+        if path not in self.endpoints:
+            raise ServiceError(404, f'unknown endpoint {path!r}')
+        handler, _ = self.endpoints[path]
+        params = self.normalize(path, raw)
+        if path == '/health':
+            return self._encode(200, handler())
+
+        key = (path, tuple(sorted(params.items())), self.store.version)
+        cached = self.cache.get(key)
+        if cached is not None:
+            return cached
+        pending = self._in_flight.get(key)
+        if pending is not None:
+            self.coalesced += 1
+            return await asyncio.shield(pending)
+
+        future = asyncio.get_running_loop().create_future()
+        self._in_flight[key] = future
+        try:
+            try:
+                result = await asyncio.get_running_loop().run_in_executor(self.executor, lambda: handler(**params))
+                response = self._encode(200, result)
+            except ServiceError as e:
+                # Answers like 'no seasons in range' only change with the data, so they're cached too
+                response = self._encode(e.status, {'error': str(e)})
+            self.cache.put(key, response)
+            future.set_result(response)
+            return response
+        except BaseException as e:
+            future.set_exception(e)
+            # Retrieved here so a failure nobody else waited on isn't reported as unhandled
+            future.exception()
+            raise
+        finally:
+            del self._in_flight[key]
+
+    @staticmethod
+    def _encode(status: int, payload) -> tuple:
+        body = json.dumps(payload, separators = (',', ':')).encode()
+        return status, f'"{hashlib.sha1(body).hexdigest()[:20]}"', body
+
+    async def handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        '''
+
+        Serves HTTP/1.1 requests on one connection until the client closes it or asks to
+
+        '''
+        try:
+            while True:
+                try:
+                    head = await reader.readuntil(b'\r\n\r\n')
+                except (asyncio.IncompleteReadError, asyncio.LimitOverrunError, ConnectionError):
+                    return
+                lines = head.decode('latin-1').split('\r\n')
+                try:
+                    method, target, version = lines[0].split(' ', 2)
+                except ValueError:
+                    await self._write(writer, *self._encode(400, {'error': 'malformed request line'}), close = True)
+                    return
+                headers = {}
+                for line in lines[1:]:
+                    name, _, value = line.partition(':')
+                    if name:
+                        headers[name.strip().lower()] = value.strip()
+                # Request bodies aren't used, but must be consumed to keep the connection in step
+                length = int(headers.get('content-length', 0) or 0)
+                if length:
+                    await reader.readexactly(length)
+
+                connection = headers.get('connection', '').lower()
+                close = connection == 'close' or (version == 'HTTP/1.0' and connection != 'keep-alive')
+                self.requests += 1
+                if method not in ('GET', 'HEAD'):
+                    status, etag, body = self._encode(405, {'error': f'{method} not allowed'})
+                else:
+                    url = urlsplit(target)
+                    try:
+                        status, etag, body = await self.respond(url.path.rstrip('/') or '/', dict(parse_qsl(url.query)))
+                    except ServiceError as e:
+                        status, etag, body = self._encode(e.status, {'error': str(e)})
+                    except Exception as e:
+                        print(f'Error: {target} failed: {e!r}', file = sys.stderr)
+                        status, etag, body = self._encode(500, {'error': 'internal error'})
+                    if status == 200 and etag in (tag.strip() for tag in headers.get('if-none-match', '').split(',')):
+                        self.not_modified += 1
+                        status, body = 304, b''
+                await self._write(writer, status, etag, body, close, head = method == 'HEAD')
+                if close:
+                    return
+        finally:
+            writer.close()
+
+    @staticmethod
+    async def _write(writer: asyncio.StreamWriter, status: int, etag: str, body: bytes, close: bool, head: bool = False) -> None:
+        headers = [f'HTTP/1.1 {status} {STATUS_TEXT.get(status, "")}']
+        if status != 304:
+            headers += ['Content-Type: application/json', f'Content-Length: {len(body)}']
+        if status in (200, 304):
+            # Clients may keep the body but must revalidate it, which costs them a 304 at most
+            headers += [f'ETag: {etag}', 'Cache-Control: no-cache']
+        headers.append(f'Connection: {"close" if close else "keep-alive"}')
+        writer.write(('\r\n'.join(headers) + '\r\n\r\n').encode('latin-1') + (b'' if head else body))
+        await writer.drain()
+
+    async def serve(self, host: str = DEFAULT_HOST, port: int = DEFAULT_PORT, ready = None) -> None:
+        server = await asyncio.start_server(self.handle_connection, host, port, backlog = BACKLOG, limit = MAX_HEADER_BYTES)
+        address = server.sockets[0].getsockname()
+        print(f'StatSwing service on http://{address[0]}:{address[1]}', file = sys.stderr)
+        if ready is not None:
+            ready(address)
+        async with server:
+            await server.serve_forever()
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description = 'Serve StatSwing queries as JSON over HTTP')
+    parser.add_argument('-d', '--data', default = query.DEFAULT_DATA_PATH, help = 'player data CSV')
+    parser.add_argument('--host', default = DEFAULT_HOST)
+    parser.add_argument('--port', type = int, default = DEFAULT_PORT)
+    parser.add_argument('--cache-entries', type = int, default = DEFAULT_CACHE_ENTRIES, help = 'responses kept in the LRU cache')
+    parser.add_argument('--cache-mb', type = float, default = DEFAULT_CACHE_BYTES / 2**20, help = 'total size of cached responses')
+    parser.add_argument('--threads', type = int, default = DEFAULT_QUERY_THREADS, help = 'threads running uncached queries')
+    args = parser.parse_args()
+
+    service = StatsService(query.load(args.data), args.cache_entries, int(args.cache_mb * 2**20), args.threads)
+    try:
+        asyncio.run(service.serve(args.host, args.port))
+    except KeyboardInterrupt:
+        pass
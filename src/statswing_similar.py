@@ -0,0 +1,215 @@
+import argparse
+import sys
+import threading
+import time
+import weakref
+import numpy as np
+import pandas as pd
+from src.config import SIMILARITY_STATS
+from src.statswing_store import PlayerStore, is_average_row
+from src.statswing_utils import aggregate_player
+
+DEFAULT_NEIGHBORS = 10
+# Queries are scored against every row in blocks of at most this many distances (64 MB of float32)
+BLOCK_ELEMENTS = 2**24
+
+class SimilarityEngine:
+    '''
+
+    k-nearest-neighbor search over every player-season's stat profile
+
+    Each season row becomes one float32 vector of SIMILARITY_STATS, standardized to zero mean and
+    unit variance so no stat dominates by scale (missing values sit at the mean). Distances are
+    Euclidean in that space, computed for a whole block of queries at once as
+    |q|^2 + |x|^2 - 2 q.x (one matrix product), and the k smallest are picked with argpartition.
+    Brute force stays exact, and with this few dimensions it beats a KD-tree until the blocks
+    no longer fit in cache, which BLOCK_ELEMENTS keeps from happening
+
+    '''
+    def __init__(self, store: PlayerStore, stats: list = SIMILARITY_STATS):
+        self.store = store
+        self.stats = [stat for stat in stats if stat in store.data.columns]
+        self._lock = threading.Lock()
+        self._build()
+
+    def _build(self) -> None:
+        self.version = self.store.version
+        data = self.store.data
+        rows = data[(data['Season Year'] != 0) & ~is_average_row(data['Name'])]
+        self.names = rows['Name'].to_numpy(dtype = object)
+        self.seasons = rows['Season Year'].to_numpy(dtype = np.int16)
+        self.teams = rows['Team'].to_numpy(dtype = object)
+        self.data_rows = rows.index.to_numpy()
+        # Rows are sorted by name, so each player's seasons are one contiguous run of codes
+        self.player_codes = np.concatenate(([0], np.cumsum(self.names[1:] != self.names[:-1]))) if len(rows) else np.empty(0, dtype = np.int64)
+
+        values = rows[self.stats].to_numpy(dtype = np.float64)
+        self.mean = np.nanmean(values, axis = 0)
+        self.scale = np.nanstd(values, axis = 0)
+        self.scale[~(self.scale > 0)] = 1.0
+        self.matrix = self.standardize(values)
+        self.norms = np.einsum('ij,ij->i', self.matrix, self.matrix)
+
+    def standardize(self, values) -> np.ndarray:
+        '''
+
+        Maps raw stat vectors (one per row, in self.stats order) into the search space
+
+        '''
+        values = np.atleast_2d(np.asarray(values, dtype = np.float64))
+        return np.nan_to_num((values - self.mean) / self.scale).astype(np.float32)
+
+    def _current(self) -> None:
+        with self._lock:
+            if self.version != self.store.version:
+                self._build()
+
+    def _candidates(self, start_season: int = None, end_season: int = None) -> np.ndarray:
+        mask = np.ones(len(self.seasons), dtype = bool)
+        if start_season is not None:
+            mask &= self.seasons >= start_season
+        if end_season is not None:
+            mask &= self.seasons <= end_season
+        return mask
+
+    def nearest(self, vectors: np.ndarray, k: int = DEFAULT_NEIGHBORS, candidates: np.ndarray = None, exclude: np.ndarray = None) -> tuple:
+        '''
+
+        Returns (rows, distances), each queries x k, for standardized query vectors
+
+        candidates is a boolean mask of rows that may be returned; exclude is an optional function
+        taking a slice of the queries and returning a (queries in slice) x rows boolean mask of
+        pairs to skip. Queries with fewer than k matches are padded with -1 and inf
+
+        '''
+        vectors = np.atleast_2d(vectors).astype(np.float32)
+        n = len(self.matrix)
+        pool = np.flatnonzero(candidates) if candidates is not None else np.arange(n)
+        matrix, norms = self.matrix[pool], self.norms[pool]
+        k_found = min(k, len(pool))
+        rows = np.full((len(vectors), k), -1, dtype = np.int64)
+        distances = np.full((len(vectors), k), np.inf, dtype = np.float32)
+        if k_found == 0:
+            return rows, distances
+
+        block = max(1, BLOCK_ELEMENTS // max(len(pool), 1))
+        for start in range(0, len(vectors), block):
+            queries = vectors[start:start + block]
+            squared = np.einsum('ij,ij->i', queries, queries)[:, None] + norms[None, :] - 2 * (queries @ matrix.T)
+            if exclude is not None:
+                squared[exclude(slice(start, start + len(queries)))[:, pool]] = np.inf
+            best = np.argpartition(squared, k_found - 1, axis = 1)[:, :k_found]
+            best_squared = np.take_along_axis(squared, best, axis = 1)
+            order = np.argsort(best_squared, axis = 1, kind = 'stable')
+            best, best_squared = np.take_along_axis(best, order, axis = 1), np.take_along_axis(best_squared, order, axis = 1)
+            found = np.isfinite(best_squared)
+            rows[start:start + len(queries), :k_found] = np.where(found, pool[best], -1)
+            # Rounding can push a zero distance slightly negative
+            distances[start:start + len(queries), :k_found] = np.sqrt(np.maximum(best_squared, 0))
+        return rows, distances
+
+    def _frame(self, rows: np.ndarray, distances: np.ndarray) -> pd.DataFrame:
+        found = rows >= 0
+        rows, distances = rows[found], distances[found]
+        result = pd.DataFrame({
+            'Name': self.names[rows],
+            'Season Year': self.seasons[rows],
+            'Team': self.teams[rows],
+            'Distance': distances
+        })
+        return pd.concat([result, self.store.data.loc[self.data_rows[rows], self.stats].reset_index(drop = True)], axis = 1)
+
+    def similar_to_vector(self, values, k: int = DEFAULT_NEIGHBORS, start_season: int = None, end_season: int = None, exclude_name: str = None) -> pd.DataFrame:
+        '''
+
+        Returns the k player-seasons (optionally within a season range) closest to a stat
+        vector, given as a Series/dict keyed by stat or a sequence in self.stats order
+
+        '''
+        self._current()
+        if isinstance(values, (pd.Series, dict)):
+            values = [values.get(stat, np.nan) for stat in self.stats]
+        candidates = self._candidates(start_season, end_season)
+        if exclude_name is not None:
+            candidates &= self.names != exclude_name
+        rows, distances = self.nearest(self.standardize(values), k, candidates)
+        return self._frame(rows[0], distances[0])
+
+    def similar_to_player(self, name: str, start_season: int, end_season: int, k: int = DEFAULT_NEIGHBORS,
+                          pool_start: int = None, pool_end: int = None) -> pd.DataFrame:
+        '''
+
+        Returns the k other players' seasons closest to a player's aggregate profile over a season
+        range, or None if the player has no rows in the range
+
+        '''
+        if self.store.cube.player_row_count(name, start_season, end_season) == 0:
+            return None
+        profile = aggregate_player(self.store, name, start_season, end_season)
+        return self.similar_to_vector(profile, k, pool_start, pool_end, exclude_name = name)
+
+    def all_pairs(self, k: int = DEFAULT_NEIGHBORS, same_player: bool = False) -> tuple:
+        '''
+
+        Returns (rows, distances), each rows x k: every player-season's k nearest other seasons,
+        by default skipping the player's own seasons. Work is done in BLOCK_ELEMENTS blocks
+
+        '''
+        self._current()
+        n = len(self.matrix)
+        if same_player:
+            exclude = lambda block: np.arange(n)[None, :] == np.arange(block.start, min(block.stop, n))[:, None]
+        else:
+            exclude = lambda block: self.player_codes[block][:, None] == self.player_codes[None, :]
+        return self.nearest(self.matrix, k, exclude = exclude)
+
+    def all_pairs_frame(self, k: int = DEFAULT_NEIGHBORS, same_player: bool = False) -> pd.DataFrame:
+        '''
+
+        Returns all_pairs as a long table: Name, Season Year, Rank, Neighbor, Neighbor Season, Distance
+
+        '''
+        rows, distances = self.all_pairs(k, same_player)
+        source = np.repeat(np.arange(len(rows)), k)
+        rows, distances = rows.ravel(), distances.ravel()
+        found = rows >= 0
+        source, rows, distances = source[found], rows[found], distances[found]
+        return pd.DataFrame({
+            'Name': self.names[source],
+            'Season Year': self.seasons[source],
+            'Rank': np.tile(np.arange(1, k + 1), len(self.names))[found],
+            'Neighbor': self.names[rows],
+            'Neighbor Season': self.seasons[rows],
+            'Distance': distances
+        })
+
+_engines = weakref.WeakKeyDictionary()
+_engines_lock = threading.Lock()
+
+def similarity_engine(store: PlayerStore) -> SimilarityEngine:
+    '''
+
+    Returns the store's SimilarityEngine, building it on first use
+
+    '''
+    with _engines_lock:
+        engine = _engines.get(store)
+        if engine is None:
+            engine = _engines[store] = SimilarityEngine(store)
+        return engine
+
+if __name__ == '__main__':
+    from src.statswing_query import DEFAULT_DATA_PATH, load
+    parser = argparse.ArgumentParser(description = 'Find the most similar other player-seasons for every player-season')
+    parser.add_argument('-d', '--data', default = DEFAULT_DATA_PATH, help = 'player data CSV')
+    parser.add_argument('-k', type = int, default = DEFAULT_NEIGHBORS, help = 'neighbors per season')
+    parser.add_argument('--same-player', action = 'store_true', help = "allow a player's own other seasons as neighbors")
+    parser.add_argument('-o', '--output', default = 'similar_players.csv', help = 'CSV to write')
+    args = parser.parse_args()
+
+    engine = similarity_engine(load(args.data))
+    start = time.perf_counter()
+    pairs = engine.all_pairs_frame(args.k, args.same_player)
+    elapsed = time.perf_counter() - start
+    pairs.to_csv(args.output, index = False)
+    print(f'{len(engine.names):,} seasons x {args.k} neighbors in {elapsed:.2f}s -> {args.output}', file = sys.stderr)
@@ -0,0 +1,591 @@
+import argparse
+import sys
+import time
+import numpy as np
+import pandas as pd
+from src.config import BASE_STATES, PA_EVENT_OUTCOMES, PA_SCHEMA, PA_SPLIT_SCHEMA, SPLIT_DIMENSIONS, TEAM_NAME_MAPPING
+from src.statswing_ingest import DEFAULT_CHUNKSIZE, OUTCOMES, REQUIRED_PA_COLUMNS, derive_stats
+
+# Rows are grouped into containers of 2^16 by their high bits, as in Roaring bitmaps
+CONTAINER_BITS = 16
+CONTAINER_SIZE = 1 << CONTAINER_BITS
+BITSET_WORDS = CONTAINER_SIZE // 64
+# A container holding more rows than this is stored as a 65,536-bit bitset (8 KB) rather than as
+# a sorted array of 16-bit offsets, which would then take more room
+ARRAY_LIMIT = 4096
+# Summed per matching row; 'G' is counted as distinct games instead
+MEASURES = ['RBI', 'R', 'SB', 'woba_num', 'woba_den', 'xwoba_num', 'xwoba_den']
+# Dimensions whose values are whole numbers in the play-by-play files
+NUMERIC_DIMENSIONS = {'inning', 'bases', 'outs', 'season'}
+SPLIT_STATS = ['G', 'PA', 'HR', 'R', 'RBI', 'SB', 'BB%', 'K%', 'ISO', 'BABIP', 'AVG', 'OBP', 'SLG', 'wOBA', 'xwOBA']
+
+def _popcount(words: np.ndarray) -> int:
+    if hasattr(np, 'bitwise_count'):
+        return int(np.bitwise_count(words).sum())
+    return int(np.unpackbits(words.view(np.uint8)).sum())
+
+def _to_bitset(offsets: np.ndarray) -> np.ndarray:
+    mask = np.zeros(CONTAINER_SIZE, dtype = bool)
+    mask[offsets] = True
+    return np.packbits(mask, bitorder = 'little').view(np.uint64)
+
+def _to_offsets(words: np.ndarray) -> np.ndarray:
+    return np.flatnonzero(np.unpackbits(words.view(np.uint8), bitorder = 'little')).astype(np.uint16)
+
+def _is_bitset(container: np.ndarray) -> bool:
+    return container.dtype == np.uint64
+
+def _cardinality(container: np.ndarray) -> int:
+    return _popcount(container) if _is_bitset(container) else len(container)
+
+def _shrink(words: np.ndarray):
+    '''
+
+    Returns a bitset container in its smaller form, or None if it is empty
+
+    '''
+    count = _popcount(words)
+    if count == 0:
+        return None
+    return words if count > ARRAY_LIMIT else _to_offsets(words)
+
+def _intersect(a: np.ndarray, b: np.ndarray):
+    if _is_bitset(a) and _is_bitset(b):
+        return _shrink(a & b)
+    if _is_bitset(a):
+        a, b = b, a
+    if _is_bitset(b):
+        # Probe the bitset with each offset of the array
+        kept = a[((b[a >> 6] >> (a & 63).astype(np.uint64)) & np.uint64(1)).astype(bool)]
+    else:
+        kept = np.intersect1d(a, b, assume_unique = True)
+    return kept if len(kept) else None
+
+def _union(containers: list) -> np.ndarray:
+    if len(containers) == 1:
+        return containers[0]
+    if not any(_is_bitset(c) for c in containers) and sum(len(c) for c in containers) <= ARRAY_LIMIT:
+        return np.unique(np.concatenate(containers))
+    words = np.zeros(BITSET_WORDS, dtype = np.uint64)
+    for container in containers:
+        words |= container if _is_bitset(container) else _to_bitset(container)
+    return _shrink(words)
+
+class RowBitmap:
+    '''
+
+    Compressed set of row numbers, laid out like a Roaring bitmap
+
+    Rows are split by their high 16 bits into containers; a sparse container is a sorted
+    array of the low 16 bits, a dense one a 65,536-bit bitset, so a bitmap takes at most
+    2 bytes per row and never more than 1 bit per row of its span. Intersections and unions
+    work container by container and only over the keys both (or either) sides hold.
+    Bitmaps are immutable once built
+
+    '''
+    def __init__(self, containers: dict = None):
+        # high bits -> uint16 offsets array or uint64 bitset
+        self.containers = containers if containers is not None else {}
+        self._len = None
+
+    @classmethod
+    def from_rows(cls, rows: np.ndarray) -> 'RowBitmap':
+        '''
+
+        Builds a bitmap from ascending, distinct row numbers
+
+        '''
+        rows = np.asarray(rows, dtype = np.int64)
+        containers = {}
+        if len(rows):
+            keys = rows >> CONTAINER_BITS
+            bounds = np.concatenate(([0], np.flatnonzero(keys[1:] != keys[:-1]) + 1, [len(rows)]))
+            for start, stop in zip(bounds[:-1], bounds[1:]):
+                offsets = (rows[start:stop] & (CONTAINER_SIZE - 1)).astype(np.uint16)
+                containers[int(keys[start])] = offsets if len(offsets) <= ARRAY_LIMIT else _to_bitset(offsets)
+        bitmap = cls(containers)
+        bitmap._len = len(rows)
+        return bitmap
+
+    @classmethod
+    def intersect_all(cls, bitmaps: list) -> 'RowBitmap':
+        '''
+
+        Returns the rows held by every bitmap, starting from the smallest and stopping as soon
+        as nothing is left
+
+        '''
+        if not bitmaps:
+            raise ValueError('Need at least one bitmap to intersect')
+        bitmaps = sorted(bitmaps, key = len)
+        containers = dict(bitmaps[0].containers)
+        for bitmap in bitmaps[1:]:
+            if not containers:
+                break
+            merged = {}
+            for key, container in containers.items():
+                other = bitmap.containers.get(key)
+                if other is not None:
+                    kept = _intersect(container, other)
+                    if kept is not None:
+                        merged[key] = kept
+            containers = merged
+        return cls(containers)
+
+    @classmethod
+    def union_all(cls, bitmaps: list) -> 'RowBitmap':
+        '''
+
+        Returns the rows held by any of the bitmaps
+
+        '''
+        if len(bitmaps) == 1:
+            return bitmaps[0]
+        by_key = {}
+        for bitmap in bitmaps:
+            for key, container in bitmap.containers.items():
+                by_key.setdefault(key, []).append(container)
+        containers = {}
+        for key in sorted(by_key):
+            merged = _union(by_key[key])
+            if merged is not None:
+                containers[key] = merged
+        return cls(containers)
+
+    def __and__(self, other: 'RowBitmap') -> 'RowBitmap':
+        return RowBitmap.intersect_all([self, other])
+
+    def __or__(self, other: 'RowBitmap') -> 'RowBitmap':
+        return RowBitmap.union_all([self, other])
+
+    def __len__(self) -> int:
+        if self._len is None:
+            self._len = sum(_cardinality(c) for c in self.containers.values())
+        return self._len
+
+    def __contains__(self, row: int) -> bool:
+        container = self.containers.get(int(row) >> CONTAINER_BITS)
+        if container is None:
+            return False
+        offset = int(row) & (CONTAINER_SIZE - 1)
+        if _is_bitset(container):
+            return bool((int(container[offset >> 6]) >> (offset & 63)) & 1)
+        position = np.searchsorted(container, offset)
+        return position < len(container) and container[position] == offset
+
+    def to_rows(self) -> np.ndarray:
+        '''
+
+        Returns the row numbers in ascending order
+
+        '''
+        if not self.containers:
+            return np.empty(0, dtype = np.int64)
+        parts = []
+        for key in sorted(self.containers):
+            container = self.containers[key]
+            offsets = _to_offsets(container) if _is_bitset(container) else container
+            parts.append(offsets.astype(np.int64) + (key << CONTAINER_BITS))
+        return np.concatenate(parts)
+
+    @property
+    def nbytes(self) -> int:
+        return sum(c.nbytes for c in self.containers.values())
+
+class SplitsEngine:
+    '''
+
+    Situational splits over plate-appearance rows, answered from bitmap indexes
+
+    Every value of every split dimension (batter, pitcher, park, inning, base state, outs,
+    batter and pitcher handedness, season) has a RowBitmap of the plate appearances it
+    covers. A combination of filters is the intersection of one bitmap per filtered
+    dimension (the union of several when a dimension is given a list of values), and the
+    counts behind the stats are then summed over the matching rows only, so a query costs in
+    proportion to the rows it selects rather than to the whole table. Dimensions missing
+    from the input are left out. The engine is built once and doesn't change afterwards
+
+    '''
+    def __init__(self, plate_appearances: pd.DataFrame):
+        pa = plate_appearances
+        pa = pa[pa['events'].notna() & pa['batter_name'].notna()].reset_index(drop = True)
+        self.rows = len(pa)
+
+        outcome = pa['events'].map(PA_EVENT_OUTCOMES).astype(object).fillna('out').to_numpy()
+        # Outcome codes follow OUTCOMES, with outs in play last
+        self.outcomes = OUTCOMES + ['out']
+        self.outcome = pd.Categorical(outcome, categories = self.outcomes).codes.astype(np.int8)
+        self.game, _ = pd.factorize(pa['game_pk'])
+        self.n_games = int(self.game.max()) + 1 if self.rows else 0
+
+        # Per-row measures, prepared as SeasonAggregator does
+        self.measures = {}
+        for name, source in (('RBI', 'rbi'), ('R', 'runs_scored'), ('SB', 'stolen_bases')):
+            self.measures[name] = pa[source].fillna(0).to_numpy(dtype = np.int16) if source in pa else np.zeros(self.rows, dtype = np.int16)
+        woba_value = pa['woba_value'].to_numpy(dtype = np.float64) if 'woba_value' in pa else np.full(self.rows, np.nan)
+        woba_denom = pa['woba_denom'].to_numpy(dtype = np.float64) if 'woba_denom' in pa else np.full(self.rows, np.nan)
+        expected = pa['estimated_woba_using_speedangle'].to_numpy(dtype = np.float64) if 'estimated_woba_using_speedangle' in pa else np.full(self.rows, np.nan)
+        expected = np.where(np.isnan(expected), woba_value, expected)
+        self.measures['woba_num'] = np.nan_to_num(woba_value).astype(np.float32)
+        self.measures['woba_den'] = np.where(np.isnan(woba_value), 0.0, np.nan_to_num(woba_denom)).astype(np.float32)
+        self.measures['xwoba_num'] = np.nan_to_num(expected).astype(np.float32)
+        self.measures['xwoba_den'] = np.where(np.isnan(expected), 0.0, np.nan_to_num(woba_denom)).astype(np.float32)
+
+        # dimension -> sorted values, per-row value codes (-1 where missing) and one bitmap per value
+        self.values = {}
+        self.codes = {}
+        self.bitmaps = {}
+        self.lookup = {}
+        for dimension, column in SPLIT_DIMENSIONS.items():
+            column_values = self._dimension_column(pa, dimension, column)
+            if column_values is None:
+                continue
+            codes, values = pd.factorize(column_values, sort = True)
+            if dimension in NUMERIC_DIMENSIONS:
+                values = values.astype(np.int64)
+            codes = codes.astype(np.int16 if len(values) < 2**15 else np.int32)
+            self.values[dimension] = np.asarray(values)
+            self.codes[dimension] = codes
+            self.bitmaps[dimension] = self._index(codes, len(values))
+            self.lookup[dimension] = {value: i for i, value in enumerate(self.values[dimension].tolist())}
+        self.all_rows = RowBitmap.from_rows(np.arange(self.rows))
+
+    @staticmethod
+    def _dimension_column(pa: pd.DataFrame, dimension: str, column: str):
+        if dimension == 'bases':
+            if not all(base in pa for base in ('on_1b', 'on_2b', 'on_3b')):
+                return None
+            return pa['on_1b'].notna().to_numpy(dtype = np.int8) + 2 * pa['on_2b'].notna().to_numpy(dtype = np.int8) + 4 * pa['on_3b'].notna().to_numpy(dtype = np.int8)
+        if column not in pa:
+            return None
+        values = pa[column]
+        if dimension in NUMERIC_DIMENSIONS:
+            # Whole numbers may have been read as floats to allow for missing values
+            return values.astype('Int64')
+        return values.astype(object).where(values.notna(), None)
+
+    @staticmethod
+    def _index(codes: np.ndarray, n_values: int) -> list:
+        '''
+
+        Builds one bitmap per value code; a stable sort groups the rows by value while keeping
+        each group in row order
+
+        '''
+        order = np.argsort(codes, kind = 'stable')
+        bounds = np.searchsorted(codes[order], np.arange(n_values + 1))
+        return [RowBitmap.from_rows(order[bounds[v]:bounds[v + 1]]) for v in range(n_values)]
+
+    def dimensions(self) -> list:
+        return list(self.bitmaps)
+
+    def _value_code(self, dimension: str, value):
+        if dimension == 'bases' and isinstance(value, str):
+            return self.lookup[dimension].get(BASE_STATES.index(value)) if value in BASE_STATES else None
+        if dimension in NUMERIC_DIMENSIONS:
+            try:
+                value = int(value)
+            except (TypeError, ValueError):
+                return None
+        return self.lookup[dimension].get(value)
+
+    def bitmap(self, dimension: str, value) -> RowBitmap:
+        '''
+
+        Returns the rows whose dimension equals value (an empty bitmap for a value never seen).
+        A list, tuple, set or range of values selects the rows matching any of them
+
+        '''
+        if dimension not in self.bitmaps:
+            raise ValueError(f"Unknown split dimension '{dimension}', expected one of {self.dimensions()}")
+        if isinstance(value, (list, tuple, set, frozenset, range)):
+            bitmaps = [self.bitmap(dimension, item) for item in value]
+            return RowBitmap.union_all(bitmaps) if bitmaps else RowBitmap()
+        code = self._value_code(dimension, value)
+        return self.bitmaps[dimension][code] if code is not None else RowBitmap()
+
+    def select(self, **filters) -> RowBitmap:
+        '''
+
+        Returns the rows matching every filter, given as dimension = value(s); with no filters
+        every row matches
+
+        '''
+        filters = {dimension: value for dimension, value in filters.items() if value is not None}
+        if not filters:
+            return self.all_rows
+        return RowBitmap.intersect_all([self.bitmap(dimension, value) for dimension, value in filters.items()])
+
+    def count(self, **filters) -> int:
+        return len(self.select(**filters))
+
+    def _totals(self, rows: np.ndarray, groups: np.ndarray, n_groups: int) -> pd.DataFrame:
+        '''
+
+        Sums the plate-appearance counts of the given rows per group, in the layout
+        derive_stats reads
+
+        '''
+        n_outcomes = len(self.outcomes)
+        outcome_counts = np.bincount(groups * n_outcomes + self.outcome[rows], minlength = n_groups * n_outcomes).reshape(n_groups, n_outcomes)
+        totals = {'PA': outcome_counts.sum(axis = 1)}
+        for i, name in enumerate(OUTCOMES):
+            totals[name] = outcome_counts[:, i]
+        for name in MEASURES:
+            measure = self.measures[name]
+            summed = np.bincount(groups, weights = measure[rows], minlength = n_groups)
+            totals[name] = summed.astype(np.int64) if measure.dtype.kind == 'i' else summed
+        # Distinct games per group
+        games = np.unique(groups * self.n_games + self.game[rows])
+        totals['G'] = np.bincount(games // max(self.n_games, 1), minlength = n_groups)
+        return pd.DataFrame(totals)
+
+    def aggregate(self, **filters) -> pd.Series:
+        '''
+
+        Returns the batting line over the plate appearances matching the filters (G, PA, HR,
+        R, RBI, SB, BB%, K%, ISO, BABIP, AVG, OBP, SLG, wOBA, xwOBA)
+
+        '''
+        rows = self.select(**filters).to_rows()
+        totals = self._totals(rows, np.zeros(len(rows), dtype = np.int64), 1)
+        return derive_stats(totals)[SPLIT_STATS].iloc[0]
+
+    def split(self, by: str, **filters) -> pd.DataFrame:
+        '''
+
+        Returns the batting line for each value of the by dimension over the plate
+        appearances matching the filters, one row per value that has any
+
+        '''
+        if by not in self.codes:
+            raise ValueError(f"Unknown split dimension '{by}', expected one of {self.dimensions()}")
+        rows = self.select(**filters).to_rows()
+        codes = self.codes[by][rows]
+        # Rows with no value for the dimension are left out
+        rows, codes = rows[codes >= 0], codes[codes >= 0].astype(np.int64)
+        values = self.values[by]
+        stats = derive_stats(self._totals(rows, codes, len(values)))[SPLIT_STATS]
+        index = [BASE_STATES[v] for v in values] if by == 'bases' else values
+        stats.index = pd.Index(index, name = by)
+        return stats[stats['PA'] > 0]
+
+    def memory(self) -> dict:
+        '''
+
+        Returns the bytes held by each dimension's bitmaps, and by the per-row codes and
+        measures the aggregates read
+
+        '''
+        return {
+            'rows': self.rows,
+            'bitmaps': {dimension: sum(b.nbytes for b in bitmaps) for dimension, bitmaps in self.bitmaps.items()},
+            'codes': sum(c.nbytes for c in self.codes.values()),
+            'measures': sum(m.nbytes for m in self.measures.values()) + self.outcome.nbytes + self.game.nbytes
+        }
+
+def read_plate_appearances(file_paths: list, chunksize: int = DEFAULT_CHUNKSIZE) -> pd.DataFrame:
+    '''
+
+    Reads the columns splits need from play-by-play CSV files, in chunks, keeping only the rows
+    that end a plate appearance
+
+    '''
+    schema = {**PA_SCHEMA, **PA_SPLIT_SCHEMA}
+    parts = []
+    for file_path in file_paths:
+        header = pd.read_csv(file_path, nrows = 0).columns
+        missing = [col for col in REQUIRED_PA_COLUMNS if col not in header]
+        if missing:
+            print(f'Error: {file_path} is missing required columns {missing}, skipping it.')
+            continue
+        usecols = [col for col in schema if col in header]
+        dtype = {col: schema[col] for col in usecols}
+        dtype.update({col: 'float32' for col in ('rbi', 'runs_scored', 'stolen_bases') if col in dtype})
+        for chunk in pd.read_csv(file_path, usecols = usecols, dtype = dtype, chunksize = chunksize):
+            parts.append(chunk[chunk['events'].notna() & chunk['batter_name'].notna()])
+    if not parts:
+        return pd.DataFrame(columns = list(schema))
+    # Each chunk has its own categories; concat falls back to object columns when they differ
+    return pd.concat(parts, ignore_index = True)
+
+def load_splits(file_paths: list, chunksize: int = DEFAULT_CHUNKSIZE) -> SplitsEngine:
+    return SplitsEngine(read_plate_appearances(file_paths, chunksize))
+
+# Synthetic plate appearances: outcome probabilities for a batter with and without the platoon
+# advantage (facing a pitcher of the other hand), roughly league-wide rates
+_EVENTS = ['single', 'double', 'triple', 'home_run', 'walk', 'hit_by_pitch', 'strikeout', 'sac_fly', 'sac_bunt', 'field_out', 'grounded_into_double_play']
+_EVENT_RATES = {
+    True: [0.145, 0.047, 0.005, 0.033, 0.088, 0.011, 0.210, 0.007, 0.003, 0.431, 0.020],
+    False: [0.135, 0.041, 0.004, 0.027, 0.075, 0.012, 0.240, 0.006, 0.003, 0.437, 0.020]
+}
+_WOBA_WEIGHTS = {'single': 0.89, 'double': 1.27, 'triple': 1.62, 'home_run': 2.10, 'walk': 0.69, 'hit_by_pitch': 0.72}
+PLATE_APPEARANCES_PER_GAME = 76
+
+def generate_plate_appearances(n_rows: int, seasons: tuple = (2015, 2024), n_batters: int = 1200, n_pitchers: int = 900, seed: int = 0) -> pd.DataFrame:
+    '''
+
+    Generates n_rows synthetic plate appearances in Statcast column layout, ordered by game as
+    real exports are, with every column the ingest and splits code read. Batters and pitchers
+    keep one team and one hand; outcomes favor the batter with the platoon advantage. Meant for
+    exercising the splits engine at scale, not for modelling baseball
+
+    '''
+    rng = np.random.default_rng(seed)
+    teams = np.array(list(TEAM_NAME_MAPPING))
+    first_season, last_season = seasons
+    n_seasons = last_season - first_season + 1
+
+    n_games = max(n_rows // PLATE_APPEARANCES_PER_GAME, 1)
+    game = np.sort(rng.integers(0, n_games, n_rows))
+    game_season = first_season + (np.arange(n_games) * n_seasons) // n_games
+    home = rng.integers(0, len(teams), n_games)
+    away = (home + rng.integers(1, len(teams), n_games)) % len(teams)
+
+    # The home team bats in the bottom half of each inning
+    bottom = rng.random(n_rows) < 0.5
+    batting = np.where(bottom, home[game], away[game])
+    fielding = np.where(bottom, away[game], home[game])
+    # Players belong to team (id % teams)
+    batter = batting + len(teams) * rng.integers(0, max(n_batters // len(teams), 1), n_rows)
+    pitcher = fielding + len(teams) * rng.integers(0, max(n_pitchers // len(teams), 1), n_rows)
+    batter_hand = np.where(rng.random(n_batters + len(teams)) < 0.4, 'L', 'R')[batter]
+    pitcher_hand = np.where(rng.random(n_pitchers + len(teams)) < 0.28, 'L', 'R')[pitcher]
+
+    events = np.empty(n_rows, dtype = object)
+    advantage = batter_hand != pitcher_hand
+    for platoon, rates in _EVENT_RATES.items():
+        rows = np.flatnonzero(advantage == platoon)
+        events[rows] = np.array(_EVENTS, dtype = object)[rng.choice(len(_EVENTS), len(rows), p = np.asarray(rates) / sum(rates))]
+
+    inning = np.minimum(rng.geometric(1 / 5.0, n_rows), 12)
+    inning = np.where(rng.random(n_rows) < 0.9, (rng.integers(1, 10, n_rows)), inning)
+    runners = rng.random((n_rows, 3)) < [0.3, 0.18, 0.09]
+    runner_ids = rng.integers(100000, 700000, (n_rows, 3)).astype(np.float64)
+    on_bases = np.where(runners, runner_ids, np.nan)
+
+    woba_value = pd.Series(events).map(_WOBA_WEIGHTS).fillna(0.0).to_numpy()
+    woba_denom = (~np.isin(events, ['sac_bunt'])).astype(np.float64)
+    in_play = np.isin(events, ['single', 'double', 'triple', 'home_run', 'sac_fly', 'field_out', 'grounded_into_double_play'])
+    expected = np.where(in_play, np.clip(woba_value + rng.normal(0, 0.25, n_rows), 0, 2.1), np.nan)
+
+    home_run = events == 'home_run'
+    scoring = np.isin(events, ['single', 'double', 'triple', 'sac_fly'])
+    rbi = np.where(home_run, 1 + runners.sum(axis = 1), np.where(scoring, runners[:, 2] + (events != 'single') * runners[:, 1], 0))
+    runs_scored = home_run | (rng.random(n_rows) < np.where(np.isin(events, ['single', 'double', 'triple', 'walk', 'hit_by_pitch']), 0.3, 0.0))
+
+    return pd.DataFrame({
+        'game_pk': 500000 + game,
+        'game_year': game_season[game].astype(np.int16),
+        'batter_name': np.char.add('Batter ', np.char.zfill(batter.astype(str), 4)),
+        'pitcher_name': np.char.add('Pitcher ', np.char.zfill(pitcher.astype(str), 4)),
+        'team': teams[batting],
+        'home_team': teams[home[game]],
+        'inning': inning.astype(np.int8),
+        'outs_when_up': rng.integers(0, 3, n_rows).astype(np.int8),
+        'on_1b': on_bases[:, 0],
+        'on_2b': on_bases[:, 1],
+        'on_3b': on_bases[:, 2],
+        'stand': batter_hand,
+        'p_throws': pitcher_hand,
+        'events': events,
+        'rbi': rbi.astype(np.int8),
+        'runs_scored': runs_scored.astype(np.int8),
+        'stolen_bases': (rng.random(n_rows) < 0.01).astype(np.int8),
+        'woba_value': woba_value.astype(np.float32),
+        'woba_denom': woba_denom.astype(np.float32),
+        'estimated_woba_using_speedangle': expected.astype(np.float32)
+    })
+
+def parse_filter(text: str) -> tuple:
+    '''
+
+    Parses 'dimension=value' into (dimension, value); 'a,b' gives a list of values and 'lo-hi'
+    a range for the numeric dimensions
+
+    '''
+    dimension, _, value = text.partition('=')
+    dimension = dimension.strip()
+    if not value:
+        raise argparse.ArgumentTypeError(f"Expected dimension=value, got '{text}'")
+    if dimension in NUMERIC_DIMENSIONS and dimension != 'bases' and '-' in value.strip('-'):
+        low, high = value.split('-', 1)
+        return dimension, range(int(low), int(high) + 1)
+    values = [item.strip() for item in value.split(',')]
+    return dimension, values if len(values) > 1 else values[0]
+
+def random_filters(engine: SplitsEngine, rng: np.random.Generator) -> dict:
+    '''
+
+    Picks a random combination of two to four filters, one value each, as a query benchmark
+
+    '''
+    dimensions = engine.dimensions()
+    chosen = rng.choice(len(dimensions), size = min(int(rng.integers(2, 5)), len(dimensions)), replace = False)
+    filters = {}
+    for i in chosen:
+        values = engine.values[dimensions[i]]
+        value = values[rng.integers(len(values))]
+        filters[dimensions[i]] = value.item() if isinstance(value, np.generic) else value
+    return filters
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description = 'Situational batting splits from play-by-play data')
+    commands = parser.add_subparsers(dest = 'command', required = True)
+    generate = commands.add_parser('generate', help = 'write synthetic plate appearances to a CSV')
+    generate.add_argument('-n', '--rows', type = int, default = 1_000_000, help = 'plate appearances to generate')
+    generate.add_argument('--seasons', default = '2015-2024', metavar = 'START-END')
+    generate.add_argument('--seed', type = int, default = 0)
+    generate.add_argument('-o', '--output', default = 'plate_appearances.csv', help = 'CSV to write')
+    query = commands.add_parser('query', help = 'aggregate the plate appearances matching some filters')
+    query.add_argument('files', nargs = '+', help = 'play-by-play CSV files')
+    query.add_argument('-f', '--filter', type = parse_filter, action = 'append', default = [], metavar = 'DIMENSION=VALUE',
+                       help = f"e.g. pitcher_hand=L, inning=7-9 or bases=_2_,_23; dimensions: {', '.join(SPLIT_DIMENSIONS)}")
+    query.add_argument('--by', help = 'split the result by this dimension')
+    query.add_argument('--chunksize', type = int, default = DEFAULT_CHUNKSIZE, help = 'rows read per chunk')
+    bench = commands.add_parser('bench', help = 'time random filter combinations over synthetic data')
+    bench.add_argument('-n', '--rows', type = int, default = 1_000_000, help = 'plate appearances to generate')
+    bench.add_argument('--queries', type = int, default = 200)
+    bench.add_argument('--seed', type = int, default = 0)
+    args = parser.parse_args()
+
+    if args.command == 'generate':
+        first_season, last_season = map(int, args.seasons.split('-'))
+        start = time.perf_counter()
+        generate_plate_appearances(args.rows, (first_season, last_season), seed = args.seed).to_csv(args.output, index = False)
+        print(f'{args.rows:,} plate appearances in {time.perf_counter() - start:.2f}s -> {args.output}', file = sys.stderr)
+    elif args.command == 'query':
+        engine = load_splits(args.files, args.chunksize)
+        filters = dict(args.filter)
+        start = time.perf_counter()
+        result = engine.split(args.by, **filters) if args.by else engine.aggregate(**filters).to_frame('Split').T
+        elapsed = time.perf_counter() - start
+        print(result.to_string())
+        print(f'{engine.count(**filters):,} of {engine.rows:,} plate appearances in {elapsed * 1000:.1f} ms', file = sys.stderr)
+    else:
+        from src.statswing_instrument import LatencyHistogram
+        start = time.perf_counter()
+        plate_appearances = generate_plate_appearances(args.rows, seed = args.seed)
+        generated = time.perf_counter() - start
+        start = time.perf_counter()
+        engine = SplitsEngine(plate_appearances)
+        built = time.perf_counter() - start
+        memory = engine.memory()
+        print(f'{engine.rows:,} plate appearances: generated in {generated:.2f}s, indexed in {built:.2f}s, '
+              f"bitmaps {sum(memory['bitmaps'].values()) / 2**20:.1f} MB", file = sys.stderr)
+
+        rng = np.random.default_rng(args.seed)
+        selects, aggregates = LatencyHistogram(), LatencyHistogram()
+        matched = 0
+        for _ in range(args.queries):
+            filters = random_filters(engine, rng)
+            start = time.perf_counter()
+            matched += engine.count(**filters)
+            selects.record(time.perf_counter() - start)
+            start = time.perf_counter()
+            engine.aggregate(**filters)
+            aggregates.record(time.perf_counter() - start)
+        for label, histogram in (('select', selects), ('select + aggregate', aggregates)):
+            summary = histogram.summary()
+            print(f"{label}: p50 {summary['p50_ms']:.2f} ms, p95 {summary['p95_ms']:.2f} ms, max {summary['max_ms']:.2f} ms", file = sys.stderr)
+        print(f'{matched / max(args.queries, 1):,.0f} rows matched per query on average', file = sys.stderr)
@@ -0,0 +1,693 @@
+from collections.abc import Mapping
+import numpy as np
+import pandas as pd
+from src.config import STAT_MAPPING, RATE_WEIGHT_COLUMN
+
+def is_average_row(names: pd.Series) -> pd.Series:
+    '''
+
+    Flags the derived 'Career Average' and 'Season N Average' rows
+
+    '''
+    return names.astype(str).str.fullmatch(r'Career Average|Season \d+ Average')
+
+def average_row_name(season: int) -> str:
+    return 'Career Average' if season == 0 else f'Season {season} Average'
+
+class NameRanges(Mapping):
+    '''
+
+    Name -> (start, stop) range of each player's block of rows in the sorted frame
+
+    The ranges live in arrays indexed by a block number that never changes, so rows inserted
+    into the frame shift every later block with one vectorized addition instead of rewriting an
+    entry per player
+
+    '''
+    def __init__(self, names: np.ndarray, starts: np.ndarray, stops: np.ndarray, keys: np.ndarray):
+        self.blocks = {name: i for i, name in enumerate(names)}
+        self.starts = starts.astype(np.int64)
+        self.stops = stops.astype(np.int64)
+        # Each block's sort key (category code or name), as ordered in the frame
+        self.sort_keys = keys
+
+    def __getitem__(self, name) -> tuple:
+        block = self.blocks[name]
+        return int(self.starts[block]), int(self.stops[block])
+
+    def __contains__(self, name) -> bool:
+        return name in self.blocks
+
+    def __iter__(self):
+        return iter(self.blocks)
+
+    def __len__(self) -> int:
+        return len(self.blocks)
+
+    def insert(self, names, keys: np.ndarray, positions: np.ndarray) -> None:
+        '''
+
+        Accounts for rows inserted at the given frame positions, sorted by key; rows for names
+        without a block start a new one
+
+        '''
+        self.starts += np.searchsorted(keys, self.sort_keys, side = 'left')
+        self.stops += np.searchsorted(keys, self.sort_keys, side = 'right')
+        new = {}
+        for name, key, position in zip(names, keys, positions):
+            if name in self.blocks:
+                continue
+            if name in new:
+                new[name][1] = position + 1
+            else:
+                new[name] = [position, position + 1, key]
+        if new:
+            for name in new:
+                self.blocks[name] = len(self.blocks)
+            starts, stops, new_keys = zip(*new.values())
+            self.starts = np.concatenate([self.starts, starts])
+            self.stops = np.concatenate([self.stops, stops])
+            # Codes of new categories may not fit the old codes' integer type
+            self.sort_keys = np.concatenate([self.sort_keys, np.array(new_keys, dtype = object if self.sort_keys.dtype.kind == 'O' else np.int64)])
+
+
+class PlayerStore:
+    '''
+
+    In-memory index over the player dataset, built once at load time
+
+    Rows are sorted by name and season so every player occupies one contiguous
+    block of rows; lookups by name, team and season then avoid scanning the
+    whole frame
+
+    '''
+    def __init__(self, data: pd.DataFrame):
+        # Dropdown order follows the order players first appear in the source file
+        self.player_names = list(pd.unique(data['Name']))
+        first_seen = data.drop_duplicates(['Team', 'Name'])
+        self.team_to_players = {
+            team: list(names) for team, names in first_seen.groupby('Team', sort = True)['Name']
+        }
+        self.teams = list(self.team_to_players)
+
+        self.data = data.sort_values(['Name', 'Season Year'], kind = 'mergesort').reset_index(drop = True)
+        self._build_index()
+        self.cube = SeasonCube(self.data)
+        self.averages = SeasonAverages(self.data, self.cube.stats)
+
+        # Bumped by every merge_rows(); listeners are called with the players and seasons touched
+        self.version = 0
+        self._listeners = []
+
+    @staticmethod
+    def _name_keys(names: pd.Series) -> np.ndarray:
+        # Categorical names are compared by integer code instead of by string
+        return names.cat.codes.to_numpy() if isinstance(names.dtype, pd.CategoricalDtype) else names.to_numpy()
+
+    def _build_index(self) -> None:
+        '''
+
+        Builds the name -> row range and season -> row slice lookups over the sorted frame
+
+        '''
+        names = self.data['Name'].to_numpy()
+        keys = self._name_keys(self.data['Name'])
+        if len(names):
+            boundaries = np.flatnonzero(keys[1:] != keys[:-1]) + 1
+            starts = np.concatenate(([0], boundaries))
+            stops = np.concatenate((boundaries, [len(names)]))
+        else:
+            starts = stops = np.empty(0, dtype = np.int64)
+        self.name_ranges = NameRanges(names[starts], starts, stops, keys[starts])
+        self._build_season_index()
+
+    def _build_season_index(self) -> None:
+        '''
+
+        Builds the season -> row slice lookup over the frame's current row order
+
+        '''
+        self._seasons = self.data['Season Year'].to_numpy()
+        # Secondary ordering of row positions by season, so a season range is one slice of it
+        self.season_order = np.argsort(self._seasons, kind = 'stable')
+        self._sorted_seasons = self._seasons[self.season_order]
+        unique_seasons, season_starts = np.unique(self._sorted_seasons, return_index = True)
+        season_stops = np.append(season_starts[1:], len(self._sorted_seasons))
+        self.season_slices = {
+            int(season): slice(int(start), int(stop))
+            for season, start, stop in zip(unique_seasons, season_starts, season_stops)
+        }
+
+    def player_rows(self, name: str) -> pd.DataFrame:
+        '''
+
+        Returns every row for a player (career row first, then seasons in ascending order)
+
+        '''
+        start, stop = self.name_ranges.get(name, (0, 0))
+        return self.data.iloc[start:stop]
+
+    def player_range(self, name: str, start_season: int, end_season: int) -> pd.DataFrame:
+        '''
+
+        Returns a player's rows with start_season <= Season Year <= end_season
+
+        '''
+        start, stop = self.name_ranges.get(name, (0, 0))
+        seasons = self._seasons[start:stop]
+        lo = start + np.searchsorted(seasons, start_season, side = 'left')
+        hi = start + np.searchsorted(seasons, end_season, side = 'right')
+        return self.data.iloc[lo:hi]
+
+    def player_seasons(self, name: str) -> list:
+        '''
+
+        Returns the seasons a player was active in, excluding the career row (Season Year 0)
+
+        '''
+        start, stop = self.name_ranges.get(name, (0, 0))
+        seasons = np.unique(self._seasons[start:stop])
+        return [int(season) for season in seasons if season != 0]
+
+    def career_row(self, name: str):
+        '''
+
+        Returns a player's career row (Season Year 0), or None if there isn't one
+
+        '''
+        start, stop = self.name_ranges.get(name, (0, 0))
+        if start == stop or self._seasons[start] != 0:
+            return None
+        return self.data.iloc[start]
+
+    def latest_season_row(self, name: str):
+        '''
+
+        Returns a player's most recent season row, falling back to the career row
+
+        '''
+        start, stop = self.name_ranges.get(name, (0, 0))
+        if start == stop:
+            return None
+        return self.data.iloc[stop - 1]
+
+    def players_for_team(self, team_abbr: str) -> list:
+        '''
+
+        Returns the players who appeared for a team, in source order
+
+        '''
+        return self.team_to_players.get(team_abbr, [])
+
+    def season_range_rows(self, start_season: int, end_season: int) -> pd.DataFrame:
+        '''
+
+        Returns every row with start_season <= Season Year <= end_season
+
+        '''
+        lo = np.searchsorted(self._sorted_seasons, start_season, side = 'left')
+        hi = np.searchsorted(self._sorted_seasons, end_season, side = 'right')
+        return self.data.iloc[np.sort(self.season_order[lo:hi])]
+
+    def row_position(self, name: str, season: int) -> int:
+        '''
+
+        Returns the frame position of a player's row for a season, or -1 if there isn't one
+
+        '''
+        start, stop = self.name_ranges.get(name, (0, 0))
+        position = start + int(np.searchsorted(self._seasons[start:stop], season))
+        if position < stop and self._seasons[position] == season:
+            return position
+        return -1
+
+    def existing_rows(self, rows: pd.DataFrame) -> pd.DataFrame:
+        '''
+
+        Returns the store's current rows for the (Name, Season Year) keys of rows that it has
+
+        '''
+        positions = self._positions(rows)
+        return self.data.iloc[positions[positions >= 0]]
+
+    def _positions(self, rows: pd.DataFrame) -> np.ndarray:
+        return np.array([self.row_position(name, season) for name, season in zip(rows['Name'], rows['Season Year'])], dtype = np.int64)
+
+    def merge_rows(self, rows: pd.DataFrame, averages: bool = False) -> pd.DataFrame:
+        '''
+
+        Writes rows into the store keyed by (Name, Season Year) and returns the rows they replaced
+
+        Rows replacing existing ones are written in place; rows with new keys are inserted where
+        a binary search puts them in the existing order, so the frame is never re-sorted and the
+        name index is shifted rather than rebuilt. The season cube and the running season
+        averages are adjusted by the difference between old and new rows only, so no stat is
+        recomputed over the full history. With averages set, the average rows of every season
+        the rows touch are rewritten in the same pass. Player career rows are not derived here;
+        see statswing_utils.upsert_rows
+
+        '''
+        rows = self._conform(rows)
+        positions = self._positions(rows)
+        old = self.data.iloc[positions[positions >= 0]]
+        self.averages.apply_rows(old, sign = -1)
+        self.averages.apply_rows(rows, sign = 1)
+        if averages:
+            average_rows = self._conform(self.averages.average_rows(np.unique(rows['Season Year'])))
+            rows = pd.concat([rows, average_rows], ignore_index = True)
+            positions = np.concatenate([positions, self._positions(average_rows)])
+        existing = positions >= 0
+        old = self.data.iloc[positions[existing]]
+
+        self.cube.apply_rows(old, sign = -1)
+        self.cube.apply_rows(rows, sign = 1)
+
+        new_names = [name for name in pd.unique(rows['Name']) if name not in self.name_ranges]
+        for col in self.data.columns:
+            if isinstance(self.data[col].dtype, pd.CategoricalDtype):
+                # Only the incoming values are looked up, not every category the frame has
+                values = pd.unique(rows[col].dropna())
+                missing = sorted(values[self.data[col].cat.categories.get_indexer(values) == -1])
+                if missing:
+                    # Appended categories leave every existing code as it is
+                    dtype = pd.CategoricalDtype(self.data[col].cat.categories.append(pd.Index(missing)))
+                    self.data[col] = pd.Categorical.from_codes(self.data[col].cat.codes.to_numpy(), dtype = dtype)
+                rows[col] = pd.Categorical(rows[col], categories = self.data[col].cat.categories)
+
+        if existing.any():
+            updates = rows[existing]
+            for j, col in enumerate(self.data.columns):
+                self.data.iloc[positions[existing], j] = updates[col].to_numpy()
+        if not existing.all():
+            self._insert_rows(rows[~existing])
+
+        self.player_names.extend(new_names)
+        for team, name in zip(rows['Team'], rows['Name']):
+            if pd.isna(team):
+                continue
+            players = self.team_to_players.setdefault(team, [])
+            if name not in players:
+                players.append(name)
+        if len(self.teams) != len(self.team_to_players):
+            self.teams = sorted(self.team_to_players)
+
+        self.version += 1
+        return old
+
+    def _insert_rows(self, rows: pd.DataFrame) -> None:
+        '''
+
+        Inserts rows whose keys aren't in the frame at their sorted positions
+
+        Each row's place is a binary search for its name's block, then for its season within
+        the block; the columns are copied once with the rows spliced in
+
+        '''
+        rows = rows.sort_values(['Name', 'Season Year'], kind = 'mergesort')
+        keys = self._name_keys(self.data['Name'])
+        new_keys = self._name_keys(rows['Name'])
+        seasons = rows['Season Year'].to_numpy()
+        starts = np.searchsorted(keys, new_keys, side = 'left')
+        stops = np.searchsorted(keys, new_keys, side = 'right')
+        positions = np.array([
+            start + np.searchsorted(self._seasons[start:stop], season) for start, stop, season in zip(starts, stops, seasons)
+        ], dtype = np.int64)
+
+        columns = {}
+        for col in self.data.columns:
+            column = self.data[col]
+            if isinstance(column.dtype, pd.CategoricalDtype):
+                codes = np.insert(column.cat.codes.to_numpy(), positions, rows[col].cat.codes.to_numpy())
+                columns[col] = pd.Categorical.from_codes(codes, dtype = column.dtype)
+            else:
+                columns[col] = pd.Series(np.insert(column.to_numpy(), positions, rows[col].to_numpy()), dtype = column.dtype)
+        self.data = pd.DataFrame(columns)
+
+        # Rows inserted before position p end up after the ones inserted ahead of them
+        self.name_ranges.insert(rows['Name'].to_numpy(), new_keys, positions + np.arange(len(positions)))
+        self._build_season_index()
+
+    def _conform(self, rows: pd.DataFrame) -> pd.DataFrame:
+        '''
+
+        Aligns incoming rows with the frame's columns and numeric types (missing stats become NaN)
+
+        '''
+        missing = [col for col in ('Name', 'Season Year') if col not in rows.columns]
+        if missing:
+            raise ValueError(f'Rows are missing key columns {missing}')
+        rows = rows.drop_duplicates(['Name', 'Season Year'], keep = 'last').reindex(columns = self.data.columns).reset_index(drop = True)
+        for col in rows.columns:
+            dtype = self.data[col].dtype
+            if isinstance(dtype, pd.CategoricalDtype) or dtype.kind not in 'iuf':
+                rows[col] = rows[col].astype(object)
+            elif dtype.kind in 'iu':
+                # NaN counts as 0, as it does in the season cube
+                rows[col] = np.rint(rows[col].to_numpy(dtype = np.float64, na_value = 0.0)).astype(dtype)
+            else:
+                rows[col] = rows[col].to_numpy(dtype = dtype, na_value = np.nan)
+        return rows
+
+    def add_listener(self, callback) -> None:
+        '''
+
+        Registers callback(players, seasons) to be called after the store's rows change
+
+        '''
+        self._listeners.append(callback)
+
+    def remove_listener(self, callback) -> None:
+        if callback in self._listeners:
+            self._listeners.remove(callback)
+
+    def notify(self, players: set, seasons: set) -> None:
+        for callback in list(self._listeners):
+            callback(players, seasons)
+
+    def __len__(self) -> int:
+        return len(self.data)
+
+
+class SeasonAverages:
+    '''
+
+    Running per-season sums and counts of every player row, for the average rows
+
+    'Season N Average' (and 'Career Average' for Season Year 0) is the plain mean of each stat
+    over that season's player rows; keeping the sums lets a changed row update its season's
+    average in constant time instead of re-averaging the season
+
+    '''
+    def __init__(self, data: pd.DataFrame, stats: list):
+        self.stats = stats
+        players = data[~is_average_row(data['Name'])]
+        grouped = players.groupby('Season Year')[stats]
+        sums = grouped.sum()
+        counts = grouped.count()
+        self.sums = {int(season): sums.loc[season].to_numpy(dtype = np.float64) for season in sums.index}
+        self.counts = {int(season): counts.loc[season].to_numpy(dtype = np.float64) for season in counts.index}
+
+    def apply_rows(self, rows: pd.DataFrame, sign: int = 1) -> None:
+        '''
+
+        Adds (sign = 1) or removes (sign = -1) rows' contributions; average rows are ignored
+
+        '''
+        rows = rows[~is_average_row(rows['Name'])]
+        if rows.empty:
+            return
+        values = rows[self.stats].to_numpy(dtype = np.float64, na_value = np.nan)
+        present = ~np.isnan(values)
+        seasons = rows['Season Year'].to_numpy()
+        for season in np.unique(seasons):
+            in_season = seasons == season
+            key = int(season)
+            self.sums[key] = self.sums.get(key, np.zeros(len(self.stats))) + sign * np.where(present[in_season], values[in_season], 0.0).sum(axis = 0)
+            self.counts[key] = self.counts.get(key, np.zeros(len(self.stats))) + sign * present[in_season].sum(axis = 0)
+
+    def average_rows(self, seasons) -> pd.DataFrame:
+        '''
+
+        Returns the average rows for the given seasons, rounded like the FanGraphs export
+
+        '''
+        seasons = [int(season) for season in seasons if int(season) in self.sums]
+        with np.errstate(invalid = 'ignore', divide = 'ignore'):
+            means = [np.where(self.counts[season] > 0, self.sums[season] / self.counts[season], np.nan) for season in seasons]
+        rows = pd.DataFrame(np.round(means, 2).reshape(len(seasons), len(self.stats)), columns = self.stats)
+        rows.insert(0, 'Name', [average_row_name(season) for season in seasons])
+        rows.insert(1, 'Team', 'All Players')
+        rows['Season Year'] = seasons
+        return rows
+
+
+class SeasonCube:
+    '''
+
+    Dense players x seasons x stats array of cumulative season sums
+
+    Slot k along the season axis holds the totals of every season before the k-th one, so the
+    total over any season range is a single subtraction of two slots, for one player or the
+    whole league; PA-weighted sums are kept alongside so rate stats can be averaged properly
+
+    '''
+    def __init__(self, data: pd.DataFrame):
+        self.stats = [col for col in STAT_MAPPING if col in data.columns and col != 'TotalStat']
+        self.stat_index = {stat: i for i, stat in enumerate(self.stats)}
+
+        # Career rows (Season Year 0) aren't part of any season range
+        season_data = data[data['Season Year'] > 0]
+        seasons = season_data['Season Year'].to_numpy()
+        self.first_season = int(seasons.min()) if len(seasons) else 0
+        self.last_season = int(seasons.max()) if len(seasons) else -1
+        n_seasons = self.last_season - self.first_season + 1
+
+        player_codes, self.players = pd.factorize(season_data['Name'])
+        self.player_index = {name: i for i, name in enumerate(self.players)}
+        season_codes = seasons - self.first_season
+
+        values, present, pa = self._row_values(season_data)
+
+        shape = (len(self.players), n_seasons, len(self.stats))
+        self.cum_totals = self._accumulate(shape, player_codes, season_codes, values)
+        self.cum_weighted = self._accumulate(shape, player_codes, season_codes, values * pa)
+        self.cum_weights = self._accumulate(shape, player_codes, season_codes, present * pa)
+        self.cum_counts = self._accumulate(shape[:2], player_codes, season_codes, np.ones(len(season_data)))
+
+        self.league_cum_totals = self.cum_totals.sum(axis = 0)
+
+    def _row_values(self, rows: pd.DataFrame) -> tuple:
+        '''
+
+        Returns rows' stat values (NaN as 0), which of them are present, and their PA weights
+
+        '''
+        # NaN counts as 0, matching how groupby().sum() treats missing values
+        values = rows[self.stats].to_numpy(dtype = np.float64, na_value = np.nan)
+        present = ~np.isnan(values)
+        values = np.where(present, values, 0.0)
+        if RATE_WEIGHT_COLUMN in rows.columns:
+            pa = rows[RATE_WEIGHT_COLUMN].to_numpy(dtype = np.float64, na_value = 0.0)[:, None]
+        else:
+            pa = np.ones((len(rows), 1))
+        return values, present, pa
+
+    def apply_rows(self, rows: pd.DataFrame, sign: int = 1) -> None:
+        '''
+
+        Adds (sign = 1) or removes (sign = -1) rows' contributions to the cumulative sums
+
+        Only the affected players' slots are rewritten; new players and seasons outside the
+        current span grow the arrays first
+
+        '''
+        rows = rows[rows['Season Year'] > 0]
+        if rows.empty:
+            return
+        seasons = rows['Season Year'].to_numpy(dtype = np.int64)
+        self._extend_seasons(int(seasons.min()), int(seasons.max()))
+        self._extend_players(rows['Name'])
+
+        player_codes = np.array([self.player_index[name] for name in rows['Name']])
+        affected, local = np.unique(player_codes, return_inverse = True)
+        season_codes = seasons - self.first_season
+        n_seasons = self.cum_totals.shape[1] - 1
+
+        values, present, pa = self._row_values(rows)
+        for cumulative, contribution in (
+            (self.cum_totals, values),
+            (self.cum_weighted, values * pa),
+            (self.cum_weights, present * pa),
+            (self.cum_counts, np.ones(len(rows)))
+        ):
+            grid = np.zeros((len(affected), n_seasons) + cumulative.shape[2:])
+            np.add.at(grid, (local, season_codes), sign * contribution)
+            delta = np.cumsum(grid, axis = 1)
+            cumulative[affected, 1:] += delta
+            if cumulative is self.cum_totals:
+                self.league_cum_totals[1:] += delta.sum(axis = 0)
+
+    def _extend_seasons(self, first_season: int, last_season: int) -> None:
+        '''
+
+        Widens the season axis to cover first_season..last_season
+
+        '''
+        if self.last_season < self.first_season:
+            self.first_season, self.last_season = first_season, first_season - 1
+        before = max(self.first_season - first_season, 0)
+        after = max(last_season - self.last_season, 0)
+        if not before and not after:
+            return
+
+        def widen(cumulative, axis):
+            # Earlier seasons add empty slots after the zero slot; later ones repeat the last total
+            leading = np.zeros(cumulative.shape[:axis] + (before,) + cumulative.shape[axis + 1:])
+            trailing = np.repeat(np.take(cumulative, [-1], axis = axis), after, axis = axis)
+            return np.concatenate([leading, cumulative, trailing], axis = axis)
+
+        self.cum_totals = widen(self.cum_totals, 1)
+        self.cum_weighted = widen(self.cum_weighted, 1)
+        self.cum_weights = widen(self.cum_weights, 1)
+        self.cum_counts = widen(self.cum_counts, 1)
+        self.league_cum_totals = widen(self.league_cum_totals, 0)
+        self.first_season -= before
+        self.last_season += after
+
+    def _extend_players(self, names: pd.Series) -> None:
+        '''
+
+        Adds empty player slots for names the cube hasn't seen yet
+
+        '''
+        new = [name for name in pd.unique(names) if name not in self.player_index]
+        if not new:
+            return
+        for name in new:
+            self.player_index[name] = len(self.player_index)
+        self.players = self.players.append(pd.Index(new))
+        n_players = len(self.player_index)
+
+        def grow(cumulative):
+            # Arrays are views over a buffer with spare rows, so a run of new players doesn't copy
+            # the whole cube each time; the spare rows are still zero
+            buffer = cumulative if cumulative.base is None else cumulative.base
+            if len(buffer) < n_players:
+                buffer = np.zeros((n_players + n_players // 4,) + cumulative.shape[1:])
+                buffer[:len(cumulative)] = cumulative
+            return buffer[:n_players]
+
+        self.cum_totals = grow(self.cum_totals)
+        self.cum_weighted = grow(self.cum_weighted)
+        self.cum_weights = grow(self.cum_weights)
+        self.cum_counts = grow(self.cum_counts)
+
+    @staticmethod
+    def _accumulate(shape: tuple, player_codes: np.ndarray, season_codes: np.ndarray, values: np.ndarray) -> np.ndarray:
+        '''
+
+        Scatters row values into a players x seasons grid and takes cumulative sums over seasons
+
+        '''
+        grid = np.zeros(shape)
+        np.add.at(grid, (player_codes, season_codes), values)
+        cumulative = np.zeros((shape[0], shape[1] + 1) + shape[2:])
+        np.cumsum(grid, axis = 1, out = cumulative[:, 1:])
+        return cumulative
+
+    def _bounds(self, start_season: int, end_season: int) -> tuple:
+        '''
+
+        Converts an inclusive season range to a pair of cumulative slots, clamped to the data
+
+        '''
+        n_seasons = self.cum_totals.shape[1] - 1
+        lo = min(max(int(start_season) - self.first_season, 0), n_seasons)
+        hi = min(max(int(end_season) - self.first_season + 1, lo), n_seasons)
+        return lo, hi
+
+    def range_totals(self, start_season: int, end_season: int) -> np.ndarray:
+        '''
+
+        Returns the players x stats totals for every player over a season range
+
+        '''
+        lo, hi = self._bounds(start_season, end_season)
+        return self.cum_totals[:, hi] - self.cum_totals[:, lo]
+
+    def range_counts(self, start_season: int, end_season: int) -> np.ndarray:
+        '''
+
+        Returns how many rows each player has within a season range
+
+        '''
+        lo, hi = self._bounds(start_season, end_season)
+        return self.cum_counts[:, hi] - self.cum_counts[:, lo]
+
+    def range_weighted(self, start_season: int, end_season: int) -> tuple:
+        '''
+
+        Returns the players x stats PA-weighted sums and the PA they were weighted by
+
+        '''
+        lo, hi = self._bounds(start_season, end_season)
+        return (
+            self.cum_weighted[:, hi] - self.cum_weighted[:, lo],
+            self.cum_weights[:, hi] - self.cum_weights[:, lo]
+        )
+
+    def player_totals(self, name: str, start_season: int, end_season: int) -> pd.Series:
+        '''
+
+        Returns a player's summed stats over a season range (zeros if they weren't active)
+
+        '''
+        lo, hi = self._bounds(start_season, end_season)
+        player = self.player_index.get(name)
+        if player is None:
+            totals = np.zeros(len(self.stats))
+        else:
+            totals = self.cum_totals[player, hi] - self.cum_totals[player, lo]
+        return pd.Series(totals, index = self.stats)
+
+    def player_range_sums(self, name: str, start_season: int, end_season: int):
+        '''
+
+        Returns a player's (totals, weighted sums, weights, row count) over a season range, or None
+
+        '''
+        player = self.player_index.get(name)
+        if player is None:
+            return None
+        lo, hi = self._bounds(start_season, end_season)
+        return (
+            self.cum_totals[player, hi] - self.cum_totals[player, lo],
+            self.cum_weighted[player, hi] - self.cum_weighted[player, lo],
+            self.cum_weights[player, hi] - self.cum_weights[player, lo],
+            np.asarray(self.cum_counts[player, hi] - self.cum_counts[player, lo])
+        )
+
+    def players_range_sums(self, players: np.ndarray, start_season: int, end_season: int) -> tuple:
+        '''
+
+        Returns (totals, weighted sums, weights, row counts) over a season range for the given
+        cube rows at once, one row of each per player
+
+        '''
+        lo, hi = self._bounds(start_season, end_season)
+        players = np.asarray(players, dtype = np.intp)
+        return (
+            self.cum_totals[players, hi] - self.cum_totals[players, lo],
+            self.cum_weighted[players, hi] - self.cum_weighted[players, lo],
+            self.cum_weights[players, hi] - self.cum_weights[players, lo],
+            self.cum_counts[players, hi] - self.cum_counts[players, lo]
+        )
+
+    def player_row_count(self, name: str, start_season: int, end_season: int) -> int:
+        '''
+
+        Returns how many rows a player has within a season range
+
+        '''
+        lo, hi = self._bounds(start_season, end_season)
+        player = self.player_index.get(name)
+        if player is None:
+            return 0
+        return int(self.cum_counts[player, hi] - self.cum_counts[player, lo])
+
+    def league_totals(self, start_season: int, end_season: int) -> pd.Series:
+        '''
+
+        Returns the summed stats of every player over a season range
+
+        '''
+        lo, hi = self._bounds(start_season, end_season)
+        return pd.Series(self.league_cum_totals[hi] - self.league_cum_totals[lo], index = self.stats)
+
+    def active_player_count(self, start_season: int, end_season: int) -> int:
+        '''
+
+        Returns how many players have at least one row within a season range
+
+        '''
+        return int(np.count_nonzero(self.range_counts(start_season, end_season)))
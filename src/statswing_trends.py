@@ -0,0 +1,309 @@
+import argparse
+import sys
+import threading
+import time
+import weakref
+from collections import OrderedDict
+import numpy as np
+import pandas as pd
+from src.config import RATE_WEIGHT_COLUMN
+from src.statswing_store import PlayerStore, is_average_row
+from src.statswing_utils import aggregate_windows, get_stat_type
+
+DEFAULT_WINDOW = 3
+# Rolling windows wider than one season are built on first use; this many (stat, window) are kept
+MAX_CACHED_WINDOWS = 16
+
+class TrendEngine:
+    '''
+
+    Season-over-season trends for every player at once
+
+    Every player's season lines are laid out as one players x seasons x stats array (from the
+    store's season cube, NaN where a player has no row), so year-over-year deltas, rolling
+    k-season windows and values relative to the league are whole-array operations per stat.
+    The league value for a season is its 'Season N Average' row (the plain mean over that
+    season's player rows). Aging curves are fitted by season index, a player's 1st, 2nd, ...
+    season in the data. The engine rebuilds itself when the store's version changes
+
+    '''
+    def __init__(self, store: PlayerStore):
+        self.store = store
+        self._lock = threading.Lock()
+        self._build()
+
+    def _build(self) -> None:
+        self.version = self.store.version
+        cube = self.store.cube
+        self.stats = list(cube.stats)
+        self.stat_index = {stat: i for i, stat in enumerate(self.stats)}
+        self.seasons = np.arange(cube.first_season, cube.last_season + 1)
+
+        # The cube also holds the Season N Average rows; only real players are kept
+        names = pd.Series(np.asarray(cube.players, dtype = object))
+        self._rows = np.flatnonzero(~is_average_row(names).to_numpy())
+        self.players = names.to_numpy()[self._rows]
+        self.player_index = {name: i for i, name in enumerate(self.players)}
+
+        # Each player has one row per season, so the season lines are the rows themselves,
+        # scattered into the grid in one pass (rolling windows come from the cube's sums instead)
+        data = self.store.data
+        player = self._player_rows(data['Name'])
+        seasons = data['Season Year'].to_numpy()
+        keep = (player >= 0) & (seasons > 0)
+        rows = data.loc[keep, self.stats].to_numpy(dtype = np.float32, na_value = np.nan, copy = True)
+        # As in the cube, a missing counting stat counts as 0
+        counting = [k for k, stat in enumerate(self.stats) if get_stat_type(stat) == 'counting']
+        rows[:, counting] = np.nan_to_num(rows[:, counting])
+        self.values = np.full((len(self.players), len(self.seasons), len(self.stats)), np.nan, dtype = np.float32)
+        self.values[player[keep], seasons[keep] - cube.first_season] = rows
+        self.present = ~np.isnan(self.values[:, :, self.stat_index[RATE_WEIGHT_COLUMN]]) if RATE_WEIGHT_COLUMN in self.stat_index else np.ones(self.values.shape[:2], dtype = bool)
+        self.pa = np.nan_to_num(self.values[:, :, self.stat_index[RATE_WEIGHT_COLUMN]]) if RATE_WEIGHT_COLUMN in self.stat_index else self.present.astype(np.float32)
+        # 1 for a player's first season in the data, 2 for the second and so on; 0 where absent
+        self.season_index = np.where(self.present, np.cumsum(self.present, axis = 1), 0).astype(np.int16)
+
+        averages = self.store.averages
+        self.league = np.full((len(self.seasons), len(self.stats)), np.nan)
+        for i, season in enumerate(self.seasons):
+            sums, counts = averages.sums.get(int(season)), averages.counts.get(int(season))
+            if sums is not None:
+                with np.errstate(invalid = 'ignore', divide = 'ignore'):
+                    self.league[i] = np.where(counts > 0, sums / counts, np.nan)
+        self._windows = OrderedDict()
+        self._curves = {}
+
+    def _player_rows(self, names: pd.Series) -> np.ndarray:
+        '''
+
+        Returns each name's row in the engine, -1 for names it doesn't hold (the average rows)
+
+        '''
+        index = pd.Index(self.players)
+        if isinstance(names.dtype, pd.CategoricalDtype):
+            # Matched once per category rather than once per row
+            return index.get_indexer(names.cat.categories)[names.cat.codes.to_numpy()]
+        return index.get_indexer(names)
+
+    def _current(self) -> None:
+        if self.version != self.store.version:
+            self._build()
+
+    def season_values(self, stat: str) -> np.ndarray:
+        '''
+
+        Returns every player's value of stat in each season (players x seasons)
+
+        '''
+        with self._lock:
+            self._current()
+            return self._season_values(stat)
+
+    def deltas(self, stat: str) -> np.ndarray:
+        '''
+
+        Returns every player's change in stat from the previous season (players x seasons), NaN
+        unless the player has rows in both seasons
+
+        '''
+        with self._lock:
+            self._current()
+            return self._deltas(stat)
+
+    def rolling(self, stat: str, window: int = DEFAULT_WINDOW) -> np.ndarray:
+        '''
+
+        Returns every player's aggregate of stat over the window seasons ending at each season
+        they played (players x seasons), combined like any season range
+
+        '''
+        with self._lock:
+            self._current()
+            return self._rolling(stat, window)
+
+    def league_values(self, stat: str) -> np.ndarray:
+        '''
+
+        Returns the league value of stat for each season
+
+        '''
+        with self._lock:
+            self._current()
+            return self._league_values(stat)
+
+    def relative(self, stat: str) -> np.ndarray:
+        '''
+
+        Returns every player's stat as a percentage of the league value in the same season
+        (players x seasons; 100 is league average, higher means more of the stat)
+
+        '''
+        with self._lock:
+            self._current()
+            return self._relative(stat)
+
+    # The helpers below read the engine as it is; callers hold the lock and have called _current(),
+    # so everything one query returns comes from the same build
+
+    def _season_values(self, stat: str) -> np.ndarray:
+        return self.values[:, :, self.stat_index[stat]]
+
+    def _deltas(self, stat: str) -> np.ndarray:
+        values = self._season_values(stat)
+        deltas = np.full(values.shape, np.nan, dtype = np.float32)
+        deltas[:, 1:] = values[:, 1:] - values[:, :-1]
+        return deltas
+
+    def _rolling(self, stat: str, window: int) -> np.ndarray:
+        if window <= 1:
+            return self._season_values(stat)
+        key = (stat, int(window))
+        rolled = self._windows.get(key)
+        if rolled is None:
+            rolled = self._windows[key] = aggregate_windows(self.store, [stat], window)[self._rows, :, 0].astype(np.float32)
+            while len(self._windows) > MAX_CACHED_WINDOWS:
+                self._windows.popitem(last = False)
+        self._windows.move_to_end(key)
+        return rolled
+
+    def _league_values(self, stat: str) -> np.ndarray:
+        return self.league[:, self.stat_index[stat]]
+
+    def _relative(self, stat: str) -> np.ndarray:
+        values, league = self._season_values(stat), self._league_values(stat)
+        with np.errstate(invalid = 'ignore', divide = 'ignore'):
+            return (100 * values / np.where(league != 0, league, np.nan)).astype(np.float32)
+
+    def aging_curve(self, stat: str) -> pd.DataFrame:
+        '''
+
+        Fits the league-wide aging curve of stat by season index, with the delta method
+
+        Each pair of back-to-back seasons contributes the player's change, weighted by the
+        harmonic mean of the two seasons' PA; the mean change into each season index is chained
+        from the mean first-season level into the curve, and a PA-weighted quadratic is fitted
+        to it. Players already active in the first season of the data are left out, since their
+        true season index isn't known. Returns Players, Mean, Delta, Curve and Fit per index
+
+        '''
+        with self._lock:
+            self._current()
+            curve = self._curves.get(stat)
+            if curve is not None:
+                return curve
+            values = self.values[:, :, self.stat_index[stat]].astype(np.float64)
+            rookies = ~self.present[:, 0]
+            index = np.where(rookies[:, None], self.season_index, 0).astype(np.int64)
+            pa = self.pa.astype(np.float64)
+            n_index = int(index.max()) + 1 if index.size else 1
+
+            # Season levels: PA-weighted for rate stats, per player-season for counting stats
+            level_weights = pa if get_stat_type(stat) == 'rate' else self.present.astype(np.float64)
+            seen = index > 0
+            players = np.bincount(index[seen], minlength = n_index)
+            weight_sums = np.bincount(index[seen], level_weights[seen], minlength = n_index)
+            with np.errstate(invalid = 'ignore', divide = 'ignore'):
+                mean = np.bincount(index[seen], (level_weights * np.nan_to_num(values))[seen], minlength = n_index) / weight_sums
+
+                # Back-to-back seasons, keyed by the later season's index
+                pairs = seen[:, 1:] & seen[:, :-1]
+                changes = (values[:, 1:] - values[:, :-1])[pairs]
+                pair_weights = (2 / (1 / pa[:, 1:] + 1 / pa[:, :-1]))[pairs]
+                pair_index = index[:, 1:][pairs]
+                delta = np.bincount(pair_index, pair_weights * changes, minlength = n_index) / np.bincount(pair_index, pair_weights, minlength = n_index)
+
+            delta[:2] = np.nan
+            chained = mean[1] + np.concatenate(([0.0], np.cumsum(np.nan_to_num(delta[2:])))) if n_index > 1 else np.empty(0)
+            curve = pd.DataFrame({
+                'Players': players[1:],
+                'Mean': mean[1:],
+                'Delta': delta[1:],
+                'Curve': np.where(players[1:] > 0, chained, np.nan)
+            }, index = pd.Index(np.arange(1, n_index), name = 'Season Index'))
+
+            fit = curve['Curve'].notna().to_numpy() & (weight_sums[1:] > 0)
+            curve['Fit'] = np.nan
+            if fit.sum() >= 3:
+                x = curve.index.to_numpy(dtype = np.float64)
+                coefficients = np.polyfit(x[fit], curve['Curve'].to_numpy()[fit], 2, w = np.sqrt(weight_sums[1:][fit]))
+                curve['Fit'] = np.polyval(coefficients, x)
+            self._curves[stat] = curve
+            return curve
+
+    def player_trend(self, name: str, stat: str, window: int = DEFAULT_WINDOW):
+        '''
+
+        Returns one player's trend in stat as a frame over the seasons they played (Season,
+        Season Index, Value, Delta, Rolling, League, Relative), or None if they have none
+
+        '''
+        with self._lock:
+            self._current()
+            player = self.player_index.get(name)
+            if player is None:
+                return None
+            present = self.present[player]
+            if not present.any():
+                return None
+            return pd.DataFrame({
+                'Season': self.seasons[present],
+                'Season Index': self.season_index[player, present],
+                'Value': self._season_values(stat)[player, present],
+                'Delta': self._deltas(stat)[player, present],
+                'Rolling': self._rolling(stat, window)[player, present],
+                'League': self._league_values(stat)[present],
+                'Relative': self._relative(stat)[player, present]
+            })
+
+    def trend_frame(self, stat: str, window: int = DEFAULT_WINDOW) -> pd.DataFrame:
+        '''
+
+        Returns every player's trend in stat in long form, one row per player-season
+
+        '''
+        with self._lock:
+            self._current()
+            players, seasons = np.nonzero(self.present)
+            return pd.DataFrame({
+                'Name': self.players[players],
+                'Season': self.seasons[seasons],
+                'Season Index': self.season_index[players, seasons],
+                'Value': self._season_values(stat)[players, seasons],
+                'Delta': self._deltas(stat)[players, seasons],
+                'Rolling': self._rolling(stat, window)[players, seasons],
+                'League': self._league_values(stat)[seasons],
+                'Relative': self._relative(stat)[players, seasons]
+            })
+
+_engines = weakref.WeakKeyDictionary()
+_engines_lock = threading.Lock()
+
+def trend_engine(store: PlayerStore) -> TrendEngine:
+    '''
+
+    Returns the store's TrendEngine, building it on first use
+
+    '''
+    with _engines_lock:
+        engine = _engines.get(store)
+        if engine is None:
+            engine = _engines[store] = TrendEngine(store)
+        return engine
+
+if __name__ == '__main__':
+    from src.statswing_query import DEFAULT_DATA_PATH, load
+    from src.statswing_utils import get_dataset_column
+    parser = argparse.ArgumentParser(description = "Write every player's season-over-season trend in a stat, or the league aging curve")
+    parser.add_argument('stat', help = 'stat column or display name, e.g. wOBA')
+    parser.add_argument('-d', '--data', default = DEFAULT_DATA_PATH, help = 'player data CSV')
+    parser.add_argument('-w', '--window', type = int, default = DEFAULT_WINDOW, help = 'rolling window in seasons')
+    parser.add_argument('--aging', action = 'store_true', help = 'write the aging curve instead of player trends')
+    parser.add_argument('-o', '--output', default = 'trends.csv', help = 'CSV to write')
+    args = parser.parse_args()
+
+    stat = get_dataset_column(args.stat)
+    start = time.perf_counter()
+    engine = trend_engine(load(args.data))
+    table = engine.aging_curve(stat) if args.aging else engine.trend_frame(stat, args.window)
+    elapsed = time.perf_counter() - start
+    table.to_csv(args.output, index = args.aging)
+    print(f'{len(engine.players):,} players x {len(engine.seasons)} seasons in {elapsed:.2f}s -> {args.output}', file = sys.stderr)
@@ -1,26 +1,84 @@
+import numpy as np
 import pandas as pd
-from src.config import TEAM_NAME_MAPPING, STAT_MAPPING, STAT_DESCRIPTIONS
+from src.config import TEAM_NAME_MAPPING, STAT_MAPPING, STAT_DESCRIPTIONS, STAT_TYPES, PLAYER_DATA_SCHEMA, RATE_WEIGHT_COLUMN
+from src.statswing_store import PlayerStore, is_average_row, average_row_name
+from src.statswing_cache import read_cached_frame, write_cached_frame, source_key
 
-def load_data(file_path: str) -> pd.DataFrame:
+def load_data(file_path: str, use_cache: bool = True) -> PlayerStore:
     '''
 
-    Loads the player data from a CSV file
+    Loads the player data from a CSV file and indexes it for lookups
+
+    A columnar cache is kept next to the CSV; when it matches the file's path, size, mtime and
+    header it is memory-mapped instead of re-parsing the CSV
     
     '''
     try:
-        data = pd.read_csv(file_path)
-        return data
+        data = read_cached_frame(file_path) if use_cache else None
+        if data is None:
+            key = source_key(file_path)
+            data = read_player_csv(file_path)
+            if use_cache:
+                write_cached_frame(file_path, data, key)
+        return PlayerStore(data)
     except FileNotFoundError:
         print(f'Error: The file {file_path} could not be found.')
         return
     
-def find_player(data: pd.DataFrame, name: str) -> pd.DataFrame:
+def apply_schema(data: pd.DataFrame, schema: dict = PLAYER_DATA_SCHEMA) -> pd.DataFrame:
+    '''
+
+    Casts a player table to the compact column types in schema and drops columns it doesn't list
+
+    An integer column is only narrowed when every value is whole; one with missing or fractional
+    values stays float32, because NumPy integers can't hold NaN and rounding would change the data
+
+    '''
+    columns = {}
+    for col in data.columns:
+        dtype = schema.get(col)
+        if dtype is None:
+            continue
+        if dtype == 'category':
+            columns[col] = data[col].astype('category')
+        elif np.dtype(dtype).kind == 'i':
+            values = data[col].to_numpy(dtype = np.float64, na_value = np.nan)
+            whole = not np.isnan(values).any() and np.array_equal(values, np.trunc(values))
+            columns[col] = values.astype(dtype) if whole else values.astype(np.float32)
+        else:
+            columns[col] = data[col].to_numpy(dtype = dtype, na_value = np.nan)
+    return pd.DataFrame(columns)
+
+def read_player_csv(file_path: str, schema: dict = PLAYER_DATA_SCHEMA) -> pd.DataFrame:
+    '''
+
+    Parses a player CSV straight into the compact schema, skipping the columns it doesn't list
+
+    '''
+    dtype = {col: 'category' for col, col_type in schema.items() if col_type == 'category'}
+    data = pd.read_csv(file_path, usecols = lambda col: col in schema, dtype = dtype)
+    return apply_schema(data, schema)
+
+def memory_report(file_path: str) -> pd.DataFrame:
+    '''
+
+    Compares bytes per column for a plain pd.read_csv of a file against the compact schema
+
+    '''
+    before = pd.read_csv(file_path).memory_usage(index = False, deep = True)
+    after = read_player_csv(file_path).memory_usage(index = False, deep = True)
+    report = pd.DataFrame({'before': before, 'after': after.reindex(before.index)}).fillna(0).astype(np.int64)
+    report.loc['Total'] = report.sum()
+    report['ratio'] = (report['before'] / report['after'].where(report['after'] > 0)).round(1)
+    return report
+
+def find_player(store: PlayerStore, name: str) -> pd.DataFrame:
     '''
     
     Finds a player in the dataset by name
 
     '''
-    return data[data["Name"] == name]
+    return store.player_rows(name)
 
 def get_dataset_column(stat_name: str) -> str:
     '''
@@ -29,4 +87,251 @@ def get_dataset_column(stat_name: str) -> str:
     
     '''
     alias_to_col = {alias: column for column, alias in STAT_MAPPING.items()}
-    return alias_to_col.get(stat_name, stat_name)
\ No newline at end of file
+    return alias_to_col.get(stat_name, stat_name)
+
+def build_average_rows(data: pd.DataFrame) -> pd.DataFrame:
+    '''
+
+    Builds the 'Career Average' (Season Year 0) and 'Season N Average' rows as the plain mean of
+    every player row for that season, rounded like the FanGraphs export
+
+    '''
+    stat_cols = [col for col in STAT_MAPPING if col in data.columns and col != 'TotalStat']
+    players = data[~is_average_row(data['Name'])]
+    means = players.groupby('Season Year')[stat_cols].mean().round(2).sort_index(ascending = False)
+
+    # Career Average first, then seasons newest to oldest, as in the source file
+    means = pd.concat([means.loc[means.index == 0], means.loc[means.index != 0]])
+    averages = means.reset_index()
+    averages['Name'] = [average_row_name(season) for season in averages['Season Year']]
+    averages['Team'] = 'All Players'
+    return averages.reindex(columns = data.columns)
+
+def _career_team(current, season_teams: list) -> str:
+    '''
+
+    Labels a career's team after new seasons: the one team played for, or 'N Tms'
+
+    '''
+    teams = {str(team) for team in season_teams if pd.notna(team) and not str(team).endswith(' Tms')}
+    if current is None or pd.isna(current):
+        return teams.pop() if len(teams) == 1 else f'{len(teams)} Tms'
+    current = str(current)
+    if current.endswith(' Tms'):
+        # The teams behind an existing 'N Tms' label aren't known, so the count can't be updated
+        return current
+    teams.add(current)
+    return current if len(teams) == 1 else f'{len(teams)} Tms'
+
+def career_rows_for(store: PlayerStore, new_rows: pd.DataFrame, old_rows: pd.DataFrame) -> pd.DataFrame:
+    '''
+
+    Updates players' career rows (Season Year 0) for changed season rows without re-reading
+    their history: the existing career row plus the new season rows minus the ones they
+    replaced, with counting stats summed and rate stats PA-weighted as in aggregate_player
+
+    Career rows cover seasons the dataset may not include, so they can't simply be rebuilt
+    from the stored seasons
+
+    '''
+    stats = store.cube.stats
+    new_rows = new_rows[new_rows['Season Year'] > 0]
+    old_rows = old_rows[old_rows['Season Year'] > 0]
+    names = list(pd.unique(new_rows['Name']))
+    if not names:
+        return pd.DataFrame()
+
+    bases = {name: store.career_row(name) for name in names}
+    base_rows = pd.DataFrame([row for row in bases.values() if row is not None], columns = store.data.columns)
+    parts = []
+    for part, sign in ((base_rows, 1), (new_rows, 1), (old_rows, -1)):
+        values, present, pa = store.cube._row_values(part)
+        parts.append(pd.DataFrame(np.hstack([sign * values, sign * values * pa, sign * present * pa]), index = np.asarray(part['Name'], dtype = object)))
+    sums = pd.concat(parts).groupby(level = 0).sum().reindex(names).fillna(0).to_numpy()
+
+    n = len(stats)
+    values = _combine_stats(stats, sums[:, :n], sums[:, n:2 * n], sums[:, 2 * n:], np.ones(len(names)))
+    careers = pd.DataFrame(values, columns = stats)
+    careers.insert(0, 'Name', names)
+    careers.insert(1, 'Team', [
+        _career_team(None if bases[name] is None else bases[name]['Team'], list(new_rows.loc[new_rows['Name'] == name, 'Team']))
+        for name in names
+    ])
+    careers['Season Year'] = 0
+    return careers
+
+def upsert_rows(store: PlayerStore, rows: pd.DataFrame) -> dict:
+    '''
+
+    Merges new or corrected player rows into a loaded store and refreshes the rows derived from them
+
+    Rows are keyed by (Name, Season Year) and replace any existing row with the same key. Players
+    whose career row (Season Year 0) isn't part of the update get it rebuilt from their seasons,
+    and the average rows of every touched season are recomputed from running sums. Average rows
+    in the input are ignored. Listeners registered on the store (such as open StatSwingApp
+    windows) are notified once at the end; returns a summary of what changed
+
+    '''
+    rows = rows[~is_average_row(rows['Name'])].drop_duplicates(['Name', 'Season Year'], keep = 'last')
+    replaced = store.existing_rows(rows)
+    players = set(rows['Name'])
+    seasons = set(int(season) for season in rows['Season Year'])
+
+    with_career = set(rows.loc[rows['Season Year'] == 0, 'Name'])
+    careers = career_rows_for(store, rows[~rows['Name'].isin(with_career)], replaced)
+    if not careers.empty:
+        seasons.add(0)
+
+    # The rows, the rebuilt career rows and the touched seasons' average rows go in as one merge
+    store.merge_rows(pd.concat([rows, careers], ignore_index = True), averages = True)
+    store.notify(players, seasons)
+    return {
+        'rows': len(rows),
+        'replaced': len(replaced),
+        'inserted': len(rows) - len(replaced),
+        'careers_rebuilt': len(careers),
+        'players': players,
+        'seasons': seasons,
+        'version': store.version
+    }
+
+def append_rows(store: PlayerStore, rows: pd.DataFrame) -> dict:
+    '''
+
+    Like upsert_rows, but refuses rows whose (Name, Season Year) is already in the store
+
+    '''
+    duplicates = [(name, season) for name, season in zip(rows['Name'], rows['Season Year']) if store.row_position(name, season) >= 0]
+    if duplicates:
+        raise ValueError(f'{len(duplicates)} rows already exist, e.g. {duplicates[0]}; use upsert_rows to replace them')
+    return upsert_rows(store, rows)
+
+def get_stat_type(column: str) -> str:
+    '''
+
+    Returns how a dataset column combines across seasons: 'counting', 'rate' or 'non-additive'
+
+    '''
+    return STAT_TYPES.get(column, 'non-additive')
+
+def _combine_stats(stats: list, totals: np.ndarray, weighted: np.ndarray, weights: np.ndarray, counts: np.ndarray) -> np.ndarray:
+    '''
+
+    Turns range sums into aggregates: counting stats keep their sums, rate stats become
+    PA-weighted means and non-additive stats are only kept when the range holds a single row
+
+    '''
+    stat_types = np.array([get_stat_type(stat) for stat in stats])
+    with np.errstate(invalid = 'ignore', divide = 'ignore'):
+        rates = np.where(weights > 0, weighted / weights, np.nan)
+    single_row = np.where(counts[..., None] == 1, totals, np.nan)
+    return np.select(
+        [stat_types == 'counting', stat_types == 'rate'],
+        [totals, rates],
+        default = single_row
+    )
+
+def aggregate_seasons(store: PlayerStore, start_season: int, end_season: int) -> pd.DataFrame:
+    '''
+
+    Aggregates every player's stats over a season range in one batched pass over the season cube
+
+    Players with no rows in the range are left out. The 'Season N Average' rows are cube rows too
+    and come back like players; callers comparing players drop them with is_average_row
+
+    '''
+    cube = store.cube
+    totals = cube.range_totals(start_season, end_season)
+    weighted, weights = cube.range_weighted(start_season, end_season)
+    counts = cube.range_counts(start_season, end_season)
+
+    values = _combine_stats(cube.stats, totals, weighted, weights, counts)
+    active = counts > 0
+    return pd.DataFrame(values[active], index = pd.Index(np.asarray(cube.players)[active], name = 'Name'), columns = cube.stats)
+
+def aggregate_windows(store: PlayerStore, stats: list, window: int = 1) -> np.ndarray:
+    '''
+
+    Aggregates every cube player's stats over the window seasons ending at each season, as a
+    players x seasons x stats array (NaN where the player has no row in that season)
+
+    window = 1 gives each player's season lines; wider windows are rolling aggregates over
+    calendar seasons, so a skipped season shortens a window rather than stretching it
+
+    '''
+    cube = store.cube
+    columns = [cube.stat_index[stat] for stat in stats]
+    # A run of adjacent columns is sliced as a view instead of gathered
+    if columns == list(range(columns[0], columns[0] + len(columns))):
+        columns = slice(columns[0], columns[0] + len(columns))
+    n_seasons = cube.cum_totals.shape[1] - 1
+    window = min(max(int(window), 1), n_seasons)
+    if not n_seasons:
+        return np.empty((cube.cum_totals.shape[0], 0, len(stats)))
+
+    def span(cumulative):
+        # Season i covers slots (i + 1 - window, i + 1]; the first window - 1 seasons start at slot 0
+        spans = np.empty((cumulative.shape[0], n_seasons) + cumulative.shape[2:])
+        np.subtract(cumulative[:, window:], cumulative[:, :-window], out = spans[:, window - 1:])
+        np.subtract(cumulative[:, 1:window], cumulative[:, :1], out = spans[:, :window - 1])
+        return spans
+
+    totals, weighted, weights = (span(cumulative[:, :, columns]) for cumulative in (cube.cum_totals, cube.cum_weighted, cube.cum_weights))
+    values = _combine_stats(stats, totals, weighted, weights, span(cube.cum_counts))
+    values[cube.cum_counts[:, 1:] == cube.cum_counts[:, :-1]] = np.nan
+    return values
+
+def aggregate_rows(rows: pd.DataFrame, stats: list) -> pd.DataFrame:
+    '''
+
+    Aggregates arbitrary season rows per player with the same rules as aggregate_seasons, for
+    rows that didn't come from a store (e.g. a partitioned scan)
+
+    '''
+    values = rows[stats].to_numpy(dtype = np.float64, na_value = np.nan)
+    present = ~np.isnan(values)
+    values = np.where(present, values, 0.0)
+    pa = rows[RATE_WEIGHT_COLUMN].to_numpy(dtype = np.float64, na_value = 0.0)[:, None] if RATE_WEIGHT_COLUMN in rows.columns else np.ones((len(rows), 1))
+
+    codes, names = pd.factorize(rows['Name'].astype(str), sort = True)
+    def group_sum(block):
+        out = np.zeros((len(names),) + block.shape[1:])
+        np.add.at(out, codes, block)
+        return out
+    totals = group_sum(values)
+    weighted = group_sum(values * pa)
+    weights = group_sum(present * pa)
+    counts = np.bincount(codes, minlength = len(names)).astype(np.float64)
+    return pd.DataFrame(_combine_stats(stats, totals, weighted, weights, counts), index = pd.Index(names, name = 'Name'), columns = stats)
+
+def aggregate_players(store: PlayerStore, names: list, start_season: int, end_season: int) -> pd.DataFrame:
+    '''
+
+    Aggregates several players' stats over a season range in one batched pass over the season
+    cube, in the order given; players with no rows in the range are left out
+
+    '''
+    cube = store.cube
+    names = list(dict.fromkeys(names))
+    players = np.array([cube.player_index.get(name, -1) for name in names], dtype = np.intp)
+    known = players >= 0
+    totals, weighted, weights, counts = cube.players_range_sums(players[known], start_season, end_season)
+    values = _combine_stats(cube.stats, totals, weighted, weights, counts)
+    active = counts > 0
+    return pd.DataFrame(values[active], index = pd.Index(np.asarray(names, dtype = object)[known][active], name = 'Name'), columns = cube.stats)
+
+def aggregate_player(store: PlayerStore, name: str, start_season: int, end_season: int) -> pd.Series:
+    '''
+
+    Aggregates one player's stats over a season range, using the same rules as aggregate_seasons
+
+    '''
+    cube = store.cube
+    sums = cube.player_range_sums(name, start_season, end_season)
+    if sums is None:
+        return pd.Series(np.nan, index = cube.stats)
+    return pd.Series(_combine_stats(cube.stats, *sums), index = cube.stats)
+
+if __name__ == '__main__':
+    import sys
+    print(memory_report(sys.argv[1] if len(sys.argv) > 1 else 'data/player_data.csv').to_string())
@@ -0,0 +1,121 @@
+from PyQt5.QtCore import QObject, QRunnable, QThreadPool, pyqtSignal
+
+class _QueryTask(QRunnable):
+    '''
+
+    Runs one query on a pool thread and reports back through the owning WorkerPool's signals
+
+    '''
+    def __init__(self, pool: 'WorkerPool', key: str, generation: int, fn, args: tuple):
+        super().__init__()
+        self.pool = pool
+        self.key = key
+        self.generation = generation
+        self.fn = fn
+        self.args = args
+
+    def run(self) -> None:
+        # A newer request for the same key was submitted while this one sat in the queue
+        if not self.pool.is_current(self.key, self.generation):
+            self.pool.task_skipped.emit(self.key, self.generation)
+            return
+        try:
+            result = self.fn(*self.args)
+        except Exception as e:
+            self.pool.task_failed.emit(self.key, self.generation, e)
+            return
+        self.pool.task_finished.emit(self.key, self.generation, result)
+
+class WorkerPool(QObject):
+    '''
+
+    Runs queries off the GUI thread and hands results back to it through queued signals
+
+    Every submit() for a key bumps that key's generation token; results carrying an older token
+    were made stale by a newer selection and are dropped instead of being shown, and stale
+    tasks that haven't started yet skip their work entirely
+
+    '''
+    task_finished = pyqtSignal(str, int, object)
+    task_failed = pyqtSignal(str, int, object)
+    task_skipped = pyqtSignal(str, int)
+
+    def __init__(self, parent: QObject = None, max_threads: int = None):
+        super().__init__(parent)
+        self.thread_pool = QThreadPool(self)
+        if max_threads is not None:
+            self.thread_pool.setMaxThreadCount(max_threads)
+        self._generations = {}
+        self._callbacks = {}
+        self.submitted = 0
+        self.delivered = 0
+        self.stale = 0
+        self.cancelled = 0
+        self.task_finished.connect(self._deliver)
+        self.task_failed.connect(self._fail)
+        self.task_skipped.connect(self._skip)
+
+    def submit(self, key: str, fn, *args, on_result = None, on_error = None) -> int:
+        '''
+
+        Runs fn(*args) on a pool thread; on_result(result) is called on the GUI thread only if no
+        newer request for the same key was submitted in the meantime
+
+        '''
+        generation = self._generations.get(key, 0) + 1
+        self._generations[key] = generation
+        self._callbacks[key] = (on_result, on_error)
+        self.submitted += 1
+
+        # The pool owns and deletes the task once it has run
+        self.thread_pool.start(_QueryTask(self, key, generation, fn, args))
+        return generation
+
+    def cancel(self, key: str) -> None:
+        '''
+
+        Invalidates any outstanding request for key so its result is never delivered
+
+        '''
+        self._generations[key] = self._generations.get(key, 0) + 1
+
+    def is_current(self, key: str, generation: int) -> bool:
+        return self._generations.get(key) == generation
+
+    def _deliver(self, key: str, generation: int, result) -> None:
+        if not self.is_current(key, generation):
+            self.stale += 1
+            return
+        self.delivered += 1
+        on_result, _ = self._callbacks.get(key, (None, None))
+        if on_result is not None:
+            on_result(result)
+
+    def _fail(self, key: str, generation: int, error: Exception) -> None:
+        if not self.is_current(key, generation):
+            self.stale += 1
+            return
+        _, on_error = self._callbacks.get(key, (None, None))
+        if on_error is not None:
+            on_error(error)
+        else:
+            print(f'Error in background task {key}: {error}')
+
+    def _skip(self, key: str, generation: int) -> None:
+        self.cancelled += 1
+
+    def wait_for_done(self, msecs: int = -1) -> bool:
+        '''
+
+        Blocks until every queued task has run (results are delivered on the next event-loop turn)
+
+        '''
+        return self.thread_pool.waitForDone(msecs)
+
+    def stats(self) -> dict:
+        return {
+            'submitted': self.submitted,
+            'delivered': self.delivered,
+            'stale': self.stale,
+            'cancelled': self.cancelled
+        }